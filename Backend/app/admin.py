@@ -0,0 +1,23 @@
+import hmac
+from fastapi import HTTPException, Request
+from app.config import ADMIN_TOKEN
+
+
+def is_admin(request: Request):
+    """ True when the request carries the configured X-Admin-Token """
+    token = request.headers.get("x-admin-token", "")
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode())
+
+
+async def require_admin(request: Request):
+    """
+    Dependency for operator-only routes
+
+    Raises:
+        HTTPException: 404 when no ADMIN_TOKEN is configured, so the routes
+            don't exist; 403 when the token is missing or wrong
+    """
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not is_admin(request):
+        raise HTTPException(status_code=403, detail="Admin token required")
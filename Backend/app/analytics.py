@@ -0,0 +1,145 @@
+"""
+Request analytics for the generation cache.
+
+Every cacheable generation request adds to a per-day counter for its
+parameter combination, noting whether the cache answered it. These give
+the popularity ranking the pre-warmer works from and the daily hit-rate
+report. Counters expire after ANALYTICS_WINDOW_DAYS.
+
+Requests are counted in memory and written every ANALYTICS_FLUSH_SECONDS
+(flush_periodically), so a generation request, cache hit or not, never
+waits on Mongo.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from pymongo import UpdateOne
+from pymongo.errors import PyMongoError
+from app.database import request_stats_collection
+from app.config import ANALYTICS_WINDOW_DAYS, ANALYTICS_FLUSH_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Counts not written yet, by (day, key); only used from the event loop
+_pending = {}
+
+
+def _day(offset=0):
+    return (datetime.utcnow() - timedelta(days=offset)).strftime("%Y-%m-%d")
+
+
+def _expires_at():
+    return datetime.utcnow() + timedelta(days=ANALYTICS_WINDOW_DAYS + 1)
+
+
+def record_request(kind, key, params, hit):
+    """ Count one generation request for its parameter combination, written by the next flush """
+    counts = _pending.setdefault((_day(), key), {"kind": kind, "params": params, "count": 0, "hits": 0})
+    counts["count"] += 1
+    counts["hits"] += int(hit)
+
+
+async def flush():
+    """
+    Write the counts recorded since the last flush
+
+    Failures are logged and those counts dropped; analytics never fail a request.
+    """
+    global _pending
+    if not _pending:
+        return
+    pending, _pending = _pending, {}
+    operations = [
+        UpdateOne(
+            {"_id": f"{day}:{key}"},
+            {
+                "$inc": {"count": counts["count"], "hits": counts["hits"]},
+                "$setOnInsert": {"day": day, "kind": counts["kind"], "key": key, "params": counts["params"],
+                                 "expires_at": _expires_at()},
+            },
+            upsert=True,
+        )
+        for (day, key), counts in pending.items()
+    ]
+    try:
+        await request_stats_collection.bulk_write(operations, ordered=False)
+    except PyMongoError as e:
+        logger.warning(f"Error recording request analytics: {e}")
+
+
+async def flush_periodically():
+    """ Flush every ANALYTICS_FLUSH_SECONDS until cancelled, then once more """
+    try:
+        while True:
+            await asyncio.sleep(ANALYTICS_FLUSH_SECONDS)
+            await flush()
+    finally:
+        await flush()
+
+
+async def record_prewarm(generated):
+    """ Note that a pre-warming run generated this many responses today """
+    day = _day()
+    await request_stats_collection.update_one(
+        {"_id": f"{day}:prewarm"},
+        {"$inc": {"generated": generated}, "$setOnInsert": {"day": day, "kind": "prewarm", "expires_at": _expires_at()}},
+        upsert=True,
+    )
+
+
+async def popular(top_k, days=ANALYTICS_WINDOW_DAYS):
+    """
+    The most requested parameter combinations over the last days
+
+    Returns:
+        list: dicts with key, kind, params and count, most requested first
+    """
+    await flush()
+    rows = request_stats_collection.aggregate([
+        {"$match": {"day": {"$gte": _day(days - 1)}, "kind": {"$ne": "prewarm"}}},
+        {"$group": {"_id": "$key", "kind": {"$first": "$kind"}, "params": {"$first": "$params"}, "count": {"$sum": "$count"}}},
+        {"$sort": {"count": -1}},
+        {"$limit": top_k},
+    ])
+    return [{"key": row["_id"], "kind": row["kind"], "params": row["params"], "count": row["count"]} async for row in rows]
+
+
+def _summary(days):
+    requests = sum(day["requests"] for day in days)
+    hits = sum(day["hits"] for day in days)
+    return {"days": len(days), "requests": requests, "hits": hits, "hit_rate": round(hits / requests, 4) if requests else None}
+
+
+async def hit_rate_report(days=ANALYTICS_WINDOW_DAYS):
+    """
+    Generation cache hit rate per day, and before and after pre-warming
+    started within the window
+
+    Returns:
+        dict: daily (day, requests, hits, hit_rate, prewarmed), before_prewarm
+            and after_prewarm summaries
+    """
+    await flush()
+    daily = {}
+    rows = request_stats_collection.aggregate([
+        {"$match": {"day": {"$gte": _day(days - 1)}}},
+        {"$group": {
+            "_id": "$day",
+            "requests": {"$sum": "$count"},
+            "hits": {"$sum": "$hits"},
+            "prewarmed": {"$sum": "$generated"},
+        }},
+    ])
+    async for row in rows:
+        daily[row["_id"]] = {
+            "day": row["_id"],
+            "requests": row["requests"],
+            "hits": row["hits"],
+            "hit_rate": round(row["hits"] / row["requests"], 4) if row["requests"] else None,
+            "prewarmed": row["prewarmed"],
+        }
+    daily = [daily[day] for day in sorted(daily)]
+    first_prewarm = next((day["day"] for day in daily if day["prewarmed"]), None)
+    before = [day for day in daily if first_prewarm is None or day["day"] < first_prewarm]
+    after = [day for day in daily if first_prewarm is not None and day["day"] >= first_prewarm]
+    return {"daily": daily, "before_prewarm": _summary(before), "after_prewarm": _summary(after)}
@@ -0,0 +1,62 @@
+import hashlib
+import time
+import jwt
+from fastapi import HTTPException, Request
+from app.cache import TTLCache
+from app.metrics import cache_lookup
+from app.config import SECRET_KEY, JWT_ALGORITHM, AUTH_TOKEN_CACHE_SIZE, AUTH_TOKEN_CACHE_SECONDS
+
+# Decoded claims keyed by the token's hash, so raw tokens are not kept in memory
+_claims_cache = TTLCache(AUTH_TOKEN_CACHE_SIZE, AUTH_TOKEN_CACHE_SECONDS)
+
+
+def _unauthorized(detail):
+    return HTTPException(status_code=401, detail=detail, headers={"WWW-Authenticate": "Bearer"})
+
+
+def verify_token(token):
+    """
+    Verify one of our access tokens locally, with no database lookup
+
+    Args:
+        token: The encoded JWT
+
+    Returns:
+        dict: The token's claims
+
+    Raises:
+        HTTPException: 401 when the token is invalid or has expired
+    """
+    key = hashlib.sha256(token.encode()).digest()
+    claims = _claims_cache.get(key)
+    cache_lookup("auth_token", claims is not None)
+    if claims is not None:
+        return claims
+
+    try:
+        claims = jwt.decode(token, SECRET_KEY, algorithms=[JWT_ALGORITHM])
+    except jwt.ExpiredSignatureError:
+        raise _unauthorized("Token expired")
+    except jwt.InvalidTokenError:
+        raise _unauthorized("Invalid token")
+
+    # Never serve cached claims past the token's own expiry
+    ttl = claims["exp"] - time.time() if "exp" in claims else None
+    _claims_cache.put(key, claims, ttl)
+    return claims
+
+
+async def require_user(request: Request):
+    """
+    Dependency for routes that need a logged-in user
+
+    Expects "Authorization: Bearer <token>" with a token from /auth/login
+    or the Google callback.
+
+    Returns:
+        dict: The token's claims (email, first_name, last_name, exp)
+    """
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        raise _unauthorized("Not authenticated")
+    return verify_token(token.strip())
@@ -0,0 +1,53 @@
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Small in-process LRU whose entries also expire after a time limit.
+
+    Not thread-safe; it is meant to be used from the event loop.
+    """
+
+    def __init__(self, max_entries, ttl_seconds):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        """ Cached value for key, or None if missing or expired """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key, value, ttl_seconds=None):
+        """
+        Store a value, evicting the least recently used entry when full
+
+        Args:
+            key: Cache key
+            value: Value to store
+            ttl_seconds: Lifetime for this entry, capped at the cache's TTL
+        """
+        ttl = self.ttl_seconds if ttl_seconds is None else min(ttl_seconds, self.ttl_seconds)
+        if ttl <= 0:
+            return
+        self._entries[key] = (value, time.monotonic() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def pop(self, key):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,186 @@
+"""
+Stopping generation work nobody is waiting for anymore.
+
+A generation route watches for its client disconnecting. Once no client
+is left waiting for a pipeline run (coalesced requests share one), the
+run's CancelToken is cancelled: the pipeline's thread stops at its next
+check (raise_if_cancelled) and an LLM stream in progress is closed, which
+drops the upstream connection so the provider stops generating.
+"""
+import asyncio
+import contextvars
+import logging
+import threading
+from contextlib import contextmanager
+from fastapi import Request
+from fastapi.responses import Response
+from starlette.concurrency import run_in_threadpool
+from app.metrics import CLIENT_DISCONNECTS, GENERATIONS_CANCELLED
+from app.deadline import DeadlineExceeded, remaining
+
+logger = logging.getLogger(__name__)
+
+# Status logged for requests whose client went away (nginx's convention);
+# the client never sees it
+CLIENT_CLOSED_REQUEST = 499
+
+# How long past the request's deadline to wait for the pipeline: its
+# stages give up at the deadline themselves and say where; this only
+# catches one that doesn't
+DEADLINE_GRACE_SECONDS = 0.5
+
+_token = contextvars.ContextVar("cancel_token", default=None)
+
+
+class Cancelled(Exception):
+    """ Raised in a pipeline whose clients have all gone away """
+
+
+class CancelToken:
+    """
+    Cancellation flag shared by the event loop and a pipeline's thread
+
+    Callbacks registered with on_cancel run in the cancelling thread, to
+    interrupt blocking I/O the pipeline is waiting on.
+    """
+
+    def __init__(self):
+        self.cancelled = False
+        self._reported = False
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    def cancel(self):
+        with self._lock:
+            if self.cancelled:
+                return
+            self.cancelled = True
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.debug(f"Cancel callback failed: {e}")
+
+    @contextmanager
+    def on_cancel(self, callback):
+        """ Run callback if the token is cancelled while in the block """
+        with self._lock:
+            already = self.cancelled
+            if not already:
+                self._callbacks.append(callback)
+        if already:
+            callback()
+        try:
+            yield
+        finally:
+            with self._lock:
+                if callback in self._callbacks:
+                    self._callbacks.remove(callback)
+
+    def report(self, endpoint, stage):
+        """ Count the cancellation once, for the stage the pipeline stopped in """
+        with self._lock:
+            reported, self._reported = self._reported, True
+        if not reported:
+            GENERATIONS_CANCELLED.labels(endpoint, stage).inc()
+
+
+def use_cancel_token(token):
+    """ Make token the current context's (and its threads') cancellation token """
+    _token.set(token)
+
+
+def raise_if_cancelled(endpoint, stage):
+    """
+    Stop the pipeline here if its clients have all gone away
+
+    Raises:
+        Cancelled: When the current token was cancelled
+    """
+    token = _token.get()
+    if token is not None and token.cancelled:
+        token.report(endpoint, stage)
+        raise Cancelled(f"{endpoint} cancelled during {stage}")
+
+
+@contextmanager
+def close_on_cancel(resource):
+    """ Close resource (e.g. an LLM stream) from the cancelling thread if cancelled while in the block """
+    token = _token.get()
+    if token is None:
+        yield
+        return
+    with token.on_cancel(resource.close):
+        yield
+
+
+async def wait_for_disconnect(http_request: Request):
+    """ Return once the client has disconnected """
+    # The body has been read by now, so the next message is the disconnect
+    while True:
+        message = await http_request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+async def wait_or_disconnect(http_request: Request, future, endpoint):
+    """
+    Wait for future unless the client disconnects or the request's
+    deadline passes first
+
+    Returns:
+        bool: True when future finished, False when the client went away
+
+    Raises:
+        DeadlineExceeded: When the deadline passed with future still running
+    """
+    left = remaining()
+    watcher = asyncio.ensure_future(wait_for_disconnect(http_request))
+    try:
+        await asyncio.wait(
+            {future, watcher},
+            timeout=None if left is None else max(left, 0) + DEADLINE_GRACE_SECONDS,
+            return_when=asyncio.FIRST_COMPLETED,
+        )
+    finally:
+        watcher.cancel()
+    if future.done():
+        return True
+    if watcher.done():
+        CLIENT_DISCONNECTS.labels(endpoint).inc()
+        return False
+    raise DeadlineExceeded("generation")
+
+
+def client_closed_response():
+    return Response(status_code=CLIENT_CLOSED_REQUEST)
+
+
+async def run_cancellable(http_request: Request, endpoint, func, *args):
+    """
+    Run a blocking pipeline in the thread pool, cancelling it if the
+    client disconnects or the request's deadline passes first
+
+    Returns:
+        The pipeline's result, or a 499 response when the client went away
+
+    Raises:
+        DeadlineExceeded: When the deadline passed first
+    """
+    token = CancelToken()
+
+    async def run():
+        use_cancel_token(token)
+        return await run_in_threadpool(func, *args)
+
+    task = asyncio.ensure_future(run())
+    try:
+        if await wait_or_disconnect(http_request, task, endpoint):
+            return task.result()
+        return client_closed_response()
+    finally:
+        if not task.done():
+            token.cancel()
+            # The error it ends with has nobody left to see it
+            task.add_done_callback(lambda done: done.cancelled() or done.exception())
@@ -15,11 +15,192 @@ FRONTEND_URL = os.getenv("FRONTEND_URL")
 
 # JWT Configuration
 SECRET_KEY = os.getenv("SECRET_KEY")
-JWT_ALGORITHM = os.getenv("JWT_ALGORITHM")
+JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
 
 # MongoDB Configuration
 MONGO_URI = os.getenv("MONGO_URI")
 DATABASE_NAME = os.getenv("DATABASE_NAME")
 
-SESSION_SECRET_KEY = os.getenv("SESSION_SECRET_KEY")
\ No newline at end of file
+SESSION_SECRET_KEY = os.getenv("SESSION_SECRET_KEY")
+
+# PDF Cache Configuration
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR", "./app/pdf_cache")
+PDF_CACHE_MEMORY_BYTES = int(os.getenv("PDF_CACHE_MEMORY_BYTES", 32 * 1024 * 1024))
+PDF_CACHE_DISK_BYTES = int(os.getenv("PDF_CACHE_DISK_BYTES", 512 * 1024 * 1024))
+
+# Bulk PDF Export Configuration
+PDF_RENDER_PROCESSES = int(os.getenv("PDF_RENDER_PROCESSES", min(4, os.cpu_count() or 1)))
+PDF_EXPORT_MAX_DOCUMENTS = int(os.getenv("PDF_EXPORT_MAX_DOCUMENTS", 200))
+
+# PDF Fonts Configuration
+PDF_FONTS_DIR = os.getenv("PDF_FONTS_DIR", "./app/fonts")
+
+# Password Hashing Configuration
+# Changing the cost re-hashes each password on its owner's next login
+PASSWORD_BCRYPT_ROUNDS = int(os.getenv("PASSWORD_BCRYPT_ROUNDS", 12))
+PASSWORD_HASH_THREADS = int(os.getenv("PASSWORD_HASH_THREADS", min(4, os.cpu_count() or 1)))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", 32))
+
+# Login Session Configuration
+SESSION_EXPIRE_MINUTES = int(os.getenv("SESSION_EXPIRE_MINUTES", 7 * 24 * 60))
+
+# Access Token Verification Cache
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", 4096))
+AUTH_TOKEN_CACHE_SECONDS = int(os.getenv("AUTH_TOKEN_CACHE_SECONDS", 300))
+
+# Google OAuth Endpoints (override to point at a local stand-in)
+GOOGLE_AUTH_URL = os.getenv("GOOGLE_AUTH_URL", "https://accounts.google.com/o/oauth2/auth")
+GOOGLE_TOKEN_URL = os.getenv("GOOGLE_TOKEN_URL", "https://oauth2.googleapis.com/token")
+GOOGLE_JWKS_URL = os.getenv("GOOGLE_JWKS_URL", "https://www.googleapis.com/oauth2/v3/certs")
+GOOGLE_USERINFO_URL = os.getenv("GOOGLE_USERINFO_URL", "https://www.googleapis.com/oauth2/v2/userinfo")
+GOOGLE_ISSUERS = os.getenv("GOOGLE_ISSUERS", "https://accounts.google.com,accounts.google.com").split(",")
+
+# Rate Limiting Configuration
+# Limits are "<requests>/<seconds>"; an empty value disables that limit
+# "memory" counts per process, so only suits a single worker; gunicorn.conf.py
+# defaults to "mongo" when it runs several
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")  # "memory" or "mongo"
+RATE_LIMIT_GENERATION_USER = os.getenv("RATE_LIMIT_GENERATION_USER", "20/3600")
+# Per-IP limits are shared by everyone behind one address (a school's NAT,
+# or a proxy when RATE_LIMIT_TRUST_PROXY is off), so they are set well
+# above the per-user ones
+RATE_LIMIT_GENERATION_IP = os.getenv("RATE_LIMIT_GENERATION_IP", "300/3600")
+RATE_LIMIT_PDF_USER = os.getenv("RATE_LIMIT_PDF_USER", "120/3600")
+RATE_LIMIT_PDF_IP = os.getenv("RATE_LIMIT_PDF_IP", "1500/3600")
+# Sign-in and sign-up attempts only
+RATE_LIMIT_AUTH_IP = os.getenv("RATE_LIMIT_AUTH_IP", "30/300")
+RATE_LIMIT_PREFETCH_USER = os.getenv("RATE_LIMIT_PREFETCH_USER", "600/3600")
+RATE_LIMIT_PREFETCH_IP = os.getenv("RATE_LIMIT_PREFETCH_IP", "1800/3600")
+# Items (LLM generations) a user's bulk runs may queue
+RATE_LIMIT_BULK_ITEMS_USER = os.getenv("RATE_LIMIT_BULK_ITEMS_USER", "1000/86400")
+# Take the client IP from X-Forwarded-For, as appended by the proxy in
+# front; enable whenever the backend is only reachable through a reverse
+# proxy or load balancer, or every user shares the proxy's address
+RATE_LIMIT_TRUST_PROXY = os.getenv("RATE_LIMIT_TRUST_PROXY", "false").lower() == "true"
+
+# Multi-worker Serving Configuration (gunicorn.conf.py)
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1))
+# Native threads each worker may use for torch / BLAS / tokenizers
+WORKER_THREADS = int(os.getenv("WORKER_THREADS", 1))
+
+# Embedding Service Configuration
+# With EMBEDDING_SOCKET set, workers send query embeddings to the shared
+# embedding server (python -m app.embedding_server) over this Unix socket;
+# left empty, each process loads the model and embeds in-process
+EMBEDDING_SOCKET = os.getenv("EMBEDDING_SOCKET", "")
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+# How long the server waits for more requests to join a batch, and the batch cap
+EMBEDDING_BATCH_WAIT_MS = float(os.getenv("EMBEDDING_BATCH_WAIT_MS", 5))
+EMBEDDING_MAX_BATCH = int(os.getenv("EMBEDDING_MAX_BATCH", 64))
+# Native threads the embedding server gives to torch
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", os.cpu_count() or 1))
+EMBEDDING_TIMEOUT_SECONDS = float(os.getenv("EMBEDDING_TIMEOUT_SECONDS", 10))
+
+# Sampling Profiler Configuration
+# A profile is kept for this fraction of requests, and for every request
+# slower than PROFILE_SLOW_SECONDS; set both to 0 to turn the sampler off
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0.01))
+PROFILE_SLOW_SECONDS = float(os.getenv("PROFILE_SLOW_SECONDS", 30))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", 20))
+# Longest stretch of a request a profile covers
+PROFILE_WINDOW_SECONDS = float(os.getenv("PROFILE_WINDOW_SECONDS", 180))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "./app/profiles")
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", 200))
+
+# Admin endpoints (/admin/...) expect this in the X-Admin-Token header;
+# left empty, they are disabled
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# Logging Configuration
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# "json" (one object per line, for the log pipeline) or "text" (for a terminal)
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+# Longest value a log field may carry before it is cut
+LOG_FIELD_MAX_CHARS = int(os.getenv("LOG_FIELD_MAX_CHARS", 1000))
+# Fraction of generation requests whose full contexts, prompt and output are
+# logged; the rest log only their sizes. An admin can ask for one request's
+# payloads with X-Debug-Payloads: 1
+LOG_PAYLOAD_SAMPLE_RATE = float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE", 0))
+LOG_PAYLOAD_MAX_CHARS = int(os.getenv("LOG_PAYLOAD_MAX_CHARS", 65536))
+# Records waiting for the writer thread; past this, new records are dropped
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+
+# Generation Job Queue Configuration
+# With ?mode=job, generation routes queue the request in Mongo and return 202;
+# worker processes (python -m app.worker) claim and run the jobs
+# A claimed job is handed to another worker if its lease runs out without
+# a heartbeat, e.g. because its worker crashed
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", 120))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", 3))
+# Finished jobs (and their results) are kept this long
+JOB_RETENTION_SECONDS = int(os.getenv("JOB_RETENTION_SECONDS", 86400))
+# Jobs each worker process runs at once, and how often an idle worker looks for work
+JOB_WORKER_CONCURRENCY = int(os.getenv("JOB_WORKER_CONCURRENCY", 2))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", 1))
+# Longest a GET /jobs/{id}?wait=... long-poll is held open
+JOB_WAIT_MAX_SECONDS = float(os.getenv("JOB_WAIT_MAX_SECONDS", 30))
+
+# Bulk Curriculum Generation Configuration
+# The frontend's dropdown data: grades, strands, topics and subtopics
+CURRICULUM_FILE = os.getenv("CURRICULUM_FILE", "../Frontend/src/data/dropdownData.json")
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", 1000))
+# Most items of one bulk run generating at once; halved while the LLM
+# provider is rate limiting and raised again as items succeed
+BULK_CONCURRENCY = int(os.getenv("BULK_CONCURRENCY", 6))
+# Tries per item before it is marked failed (rate-limited tries don't count)
+BULK_ITEM_ATTEMPTS = int(os.getenv("BULK_ITEM_ATTEMPTS", 2))
+# Bulk runs' items and results are kept this long
+BULK_RETENTION_SECONDS = int(os.getenv("BULK_RETENTION_SECONDS", 7 * 86400))
+
+# Generation Cache and Pre-warming Configuration
+# Lesson plan and assessment responses are cached by their request
+# parameters, in Mongo (shared) with a small in-process front. Requests
+# get pre-warmed responses unless they send Cache-Control: no-cache, and
+# responses generated for other requests only with max-stale
+GENERATION_CACHE_TTL_SECONDS = int(os.getenv("GENERATION_CACHE_TTL_SECONDS", 86400))
+GENERATION_CACHE_MEMORY_ENTRIES = int(os.getenv("GENERATION_CACHE_MEMORY_ENTRIES", 256))
+# Days of request parameters kept for the popularity ranking and hit-rate report
+ANALYTICS_WINDOW_DAYS = int(os.getenv("ANALYTICS_WINDOW_DAYS", 7))
+# Request counts are buffered in memory and written this often
+ANALYTICS_FLUSH_SECONDS = float(os.getenv("ANALYTICS_FLUSH_SECONDS", 10))
+# Workers pre-generate the PREWARM_TOP_K most requested combinations once a
+# day, during the off-peak UTC hours PREWARM_HOURS ("start-end"); 0 disables
+PREWARM_TOP_K = int(os.getenv("PREWARM_TOP_K", 50))
+PREWARM_HOURS = os.getenv("PREWARM_HOURS", "2-5")
+# Low-priority LLM calls (pre-warming): at most this many at once per
+# process, each waiting for the process's interactive calls to finish
+LLM_BACKGROUND_CONCURRENCY = int(os.getenv("LLM_BACKGROUND_CONCURRENCY", 2))
+# OpenAI service tier for low-priority calls (e.g. "flex"); empty for the default
+LLM_BACKGROUND_SERVICE_TIER = os.getenv("LLM_BACKGROUND_SERVICE_TIER", "")
+
+# Speculative Prefetch Configuration
+# Retrieval started by /prefetch while the form is filled in is kept this
+# long for the session's submit
+PREFETCH_TTL_SECONDS = int(os.getenv("PREFETCH_TTL_SECONDS", "120"))
+# Prefetches running at once per process; later ones wait and are dropped
+# if superseded while waiting
+PREFETCH_CONCURRENCY = int(os.getenv("PREFETCH_CONCURRENCY", "4"))
+# Prefetch slots (one per session and form) per process; the least recently
+# used is evicted. Slots aren't shared between gunicorn workers, so a submit
+# landing on another worker than its prefetch retrieves again
+PREFETCH_MAX_SLOTS = int(os.getenv("PREFETCH_MAX_SLOTS", "2000"))
+
+# Request Deadline Configuration
+# Time a request may take before it is answered with 504, per endpoint; a
+# client can ask for another with X-Request-Timeout (seconds), up to the max
+DEADLINE_LESSON_PLAN_SECONDS = float(os.getenv("DEADLINE_LESSON_PLAN_SECONDS", "120"))
+DEADLINE_ASSESSMENT_SECONDS = float(os.getenv("DEADLINE_ASSESSMENT_SECONDS", "90"))
+DEADLINE_ICEBREAKER_SECONDS = float(os.getenv("DEADLINE_ICEBREAKER_SECONDS", "60"))
+DEADLINE_PDF_SECONDS = float(os.getenv("DEADLINE_PDF_SECONDS", "30"))
+DEADLINE_MAX_SECONDS = float(os.getenv("DEADLINE_MAX_SECONDS", "300"))
+# Retrieval stops this long before the deadline so the LLM call has time to
+# run, but never keeps more than this fraction of the time left, so a short
+# X-Request-Timeout still leaves retrieval a share instead of failing at once
+DEADLINE_LLM_RESERVE_SECONDS = float(os.getenv("DEADLINE_LLM_RESERVE_SECONDS", "15"))
+DEADLINE_LLM_RESERVE_FRACTION = float(os.getenv("DEADLINE_LLM_RESERVE_FRACTION", "0.5"))
+# The OpenAI client retries failed calls only while this much time is left
+LLM_RETRY_MIN_SECONDS = float(os.getenv("LLM_RETRY_MIN_SECONDS", "30"))
+# Threads running Chroma queries for requests with a deadline; a query past
+# its time is abandoned to its thread
+CHROMA_QUERY_THREADS = int(os.getenv("CHROMA_QUERY_THREADS", "8"))
@@ -1,6 +1,56 @@
+import logging
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import ConnectionFailure, PyMongoError
 from app.config import MONGO_URI, DATABASE_NAME
 
-client = AsyncIOMotorClient(MONGO_URI)
+logger = logging.getLogger(__name__)
+
+# connect=False: no monitor threads until first use, so a preloaded master forks cleanly
+client = AsyncIOMotorClient(MONGO_URI, connect=False)
 database = client[DATABASE_NAME]
-users_collection = database["users"]
\ No newline at end of file
+users_collection = database["users"]
+sessions_collection = database["sessions"]
+rate_limits_collection = database["rate_limits"]
+jobs_collection = database["jobs"]
+bulk_items_collection = database["bulk_items"]
+generation_cache_collection = database["generation_cache"]
+request_stats_collection = database["request_stats"]
+
+# (collection, keys, options), each created on its own so one failing
+# (e.g. the unique email index with duplicate emails already stored)
+# doesn't leave the others, like the TTL indexes, missing
+INDEXES = [
+    (users_collection, "email", {"unique": True}),
+    (sessions_collection, "token_hash", {"unique": True}),
+    # Mongo removes each session once its expires_at has passed
+    (sessions_collection, "expires_at", {"expireAfterSeconds": 0}),
+    # Rate limit windows are dropped once they no longer affect any count
+    (rate_limits_collection, "expires_at", {"expireAfterSeconds": 0}),
+    # Workers claim the highest-priority, oldest queued job first
+    (jobs_collection, [("status", 1), ("priority", -1), ("created_at", 1)], {}),
+    # Finished jobs are dropped once their retention has passed
+    (jobs_collection, "expires_at", {"expireAfterSeconds": 0}),
+    # A bulk run's items, in order, and the ones still to generate
+    (bulk_items_collection, [("run_id", 1), ("index", 1)], {}),
+    (bulk_items_collection, "expires_at", {"expireAfterSeconds": 0}),
+    (generation_cache_collection, "expires_at", {"expireAfterSeconds": 0}),
+    # Daily request counts, ranked over the analytics window
+    (request_stats_collection, "day", {}),
+    (request_stats_collection, "expires_at", {"expireAfterSeconds": 0}),
+]
+
+async def init_indexes():
+    """
+    Create the indexes lookups, the job queue and expiry rely on; safe to
+    run on every startup
+    """
+    for collection, keys, options in INDEXES:
+        try:
+            await collection.create_index(keys, **options)
+        except ConnectionFailure as e:
+            # The rest would each wait out the same timeout
+            logger.error(f"Error creating database indexes: {e}")
+            return
+        except PyMongoError as e:
+            # Lookups still work, just unindexed
+            logger.error(f"Error creating index {keys} on {collection.name}: {e}")
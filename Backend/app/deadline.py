@@ -0,0 +1,201 @@
+"""
+Per-request deadlines for the generation and PDF routes.
+
+A request gets its deadline when it starts: the endpoint's default
+(DEADLINE_*_SECONDS), or the X-Request-Timeout the client sent, capped at
+DEADLINE_MAX_SECONDS. The deadline travels in a context variable into
+the pipeline's threads, where every stage asks how long it may take
+(stage_budget): embedding and Chroma queries leave
+DEADLINE_LLM_RESERVE_SECONDS for the LLM (at most
+DEADLINE_LLM_RESERVE_FRACTION of the time left), the LLM call drops its retries
+when time is short and its stream is closed at the deadline, and PDF
+rendering is abandoned when its time is up. A stage with nothing left
+raises DeadlineExceeded, answered with 504; optional work (executive-skill
+strategies) is skipped instead, with what was found so far.
+"""
+import contextvars
+import logging
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from contextlib import contextmanager
+from typing import Optional
+from fastapi import Header, HTTPException, Request
+from fastapi.responses import JSONResponse
+from app.config import (
+    DEADLINE_LESSON_PLAN_SECONDS,
+    DEADLINE_ASSESSMENT_SECONDS,
+    DEADLINE_ICEBREAKER_SECONDS,
+    DEADLINE_PDF_SECONDS,
+    DEADLINE_MAX_SECONDS,
+    DEADLINE_LLM_RESERVE_FRACTION,
+    CHROMA_QUERY_THREADS,
+)
+from app.logs import fields
+from app.metrics import DEADLINE_EVENTS
+
+logger = logging.getLogger(__name__)
+
+# Default time per endpoint class
+DEADLINES = {
+    "lesson_plan": DEADLINE_LESSON_PLAN_SECONDS,
+    "assessment": DEADLINE_ASSESSMENT_SECONDS,
+    "icebreaker": DEADLINE_ICEBREAKER_SECONDS,
+    "pdf": DEADLINE_PDF_SECONDS,
+}
+
+_deadline = contextvars.ContextVar("deadline", default=None)
+_query_pool = None
+_pool_lock = threading.Lock()
+
+
+class Deadline:
+    """ When a request's time runs out, on the monotonic clock """
+
+    def __init__(self, endpoint, seconds):
+        self.endpoint = endpoint
+        self.at = time.monotonic() + seconds
+
+    def remaining(self):
+        return self.at - time.monotonic()
+
+    def extend(self, other):
+        """ Push the deadline out to other's (None: no deadline at all) """
+        self.at = max(self.at, other.at if other is not None else math.inf)
+
+
+class DeadlineExceeded(HTTPException):
+    """ A stage ran out of the request's time; answered with 504 """
+
+    def __init__(self, stage):
+        deadline = _deadline.get()
+        self.endpoint = deadline.endpoint if deadline is not None else "unknown"
+        self.stage = stage
+        super().__init__(
+            status_code=504,
+            detail={"message": "The request did not finish in time", "stage": stage},
+        )
+
+
+def request_deadline(endpoint):
+    """
+    Dependency starting the request's deadline
+
+    Args:
+        endpoint: Key of DEADLINES for the routes it guards
+    """
+    default = DEADLINES[endpoint]
+
+    async def start_deadline(
+        x_request_timeout: Optional[float] = Header(None, gt=0, description="Seconds the client will wait for the response"),
+    ):
+        _deadline.set(Deadline(endpoint, min(x_request_timeout or default, DEADLINE_MAX_SECONDS)))
+
+    return start_deadline
+
+
+def current_deadline():
+    return _deadline.get()
+
+
+def use_deadline(deadline):
+    """ Make deadline the current context's (and its threads') deadline """
+    _deadline.set(deadline)
+
+
+def remaining():
+    """ Seconds left before the request's deadline, or None without one """
+    deadline = _deadline.get()
+    return None if deadline is None else deadline.remaining()
+
+
+def stage_budget(stage, default=None, reserve=0.0):
+    """
+    Seconds a stage may take: what is left of the deadline after keeping
+    reserve seconds for the stages after it, and at most default
+
+    The reserve shrinks with the time left, to at most
+    DEADLINE_LLM_RESERVE_FRACTION of it, so a short deadline is shared
+    between the stages rather than spent entirely on the reserve.
+
+    Returns:
+        float | None: The budget, or default when the request has no deadline
+
+    Raises:
+        DeadlineExceeded: When no time is left for the stage
+    """
+    deadline = _deadline.get()
+    if deadline is None:
+        return default
+    left = deadline.remaining()
+    budget = left - min(reserve, max(left, 0) * DEADLINE_LLM_RESERVE_FRACTION)
+    if budget <= 0:
+        raise DeadlineExceeded(stage)
+    return budget if default is None else min(budget, default)
+
+
+def check_deadline(stage):
+    """ Raise DeadlineExceeded if the request is out of time """
+    stage_budget(stage)
+
+
+def degraded(stage, **details):
+    """ Record that a stage went on with less because time was short """
+    deadline = _deadline.get()
+    endpoint = deadline.endpoint if deadline is not None else "unknown"
+    DEADLINE_EVENTS.labels(endpoint, stage, "degraded").inc()
+    logger.info("Stage cut short by the deadline", extra=fields(endpoint=endpoint, stage=stage, **details))
+
+
+@contextmanager
+def close_at_deadline(resource):
+    """ Close resource (e.g. an LLM stream) from a timer thread when the deadline passes while in the block """
+    left = remaining()
+    if left is None:
+        yield
+        return
+    timer = threading.Timer(max(left, 0), resource.close)
+    timer.daemon = True
+    timer.start()
+    try:
+        yield
+    finally:
+        timer.cancel()
+
+
+def _get_query_pool():
+    global _query_pool
+    if _query_pool is None:
+        with _pool_lock:
+            if _query_pool is None:
+                _query_pool = ThreadPoolExecutor(max_workers=CHROMA_QUERY_THREADS, thread_name_prefix="chroma-query")
+    return _query_pool
+
+
+def call_within(stage, func, reserve=0.0, **kwargs):
+    """
+    Call func(**kwargs) and give up on it when the stage's budget runs out
+
+    Without a deadline the call runs directly. With one it runs on the
+    query pool; a call past its time is left to finish in its thread.
+
+    Raises:
+        DeadlineExceeded: When the call didn't finish within the budget
+    """
+    budget = stage_budget(stage, reserve=reserve)
+    if budget is None:
+        return func(**kwargs)
+    future = _get_query_pool().submit(contextvars.copy_context().run, func, **kwargs)
+    try:
+        return future.result(timeout=budget)
+    except FutureTimeout:
+        future.cancel()
+        raise DeadlineExceeded(stage)
+
+
+async def deadline_exceeded_handler(request: Request, exc: DeadlineExceeded):
+    """ 504 for a request that ran out of time, counted by endpoint and stage """
+    DEADLINE_EVENTS.labels(exc.endpoint, exc.stage, "exceeded").inc()
+    logger.warning("Request deadline exceeded", extra=fields(endpoint=exc.endpoint, stage=exc.stage))
+    return JSONResponse(status_code=exc.status_code, content={"detail": exc.detail})
@@ -0,0 +1,194 @@
+"""
+Shared embedding server with dynamic micro-batching.
+
+One process per node holds the embedding model. API workers connect over a
+Unix socket (see app.services.embedding_client) and send the query strings
+they need embedded. Requests arriving within EMBEDDING_BATCH_WAIT_MS of the
+first waiting one are run through the model as a single batch, and requests
+that queue up while a batch is running join the next one without waiting,
+so batches grow with load instead of every request paying for its own
+forward pass.
+
+gunicorn.conf.py starts this automatically. To run it by hand, from the
+Backend directory:
+    EMBEDDING_SOCKET=/tmp/embedding.sock python -m app.embedding_server
+and start the API with the same EMBEDDING_SOCKET.
+"""
+import asyncio
+import json
+import logging
+import os
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from app.config import (
+    EMBEDDING_SOCKET,
+    EMBEDDING_MODEL,
+    EMBEDDING_BATCH_WAIT_MS,
+    EMBEDDING_MAX_BATCH,
+    EMBEDDING_THREADS,
+)
+from app.services.embedding_client import HEADER, SHAPE, ERROR_ROWS
+from app.logs import setup_logging
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """
+    Collects embed requests and runs them through the model in batches
+
+    Args:
+        model: Object with a sentence-transformers style encode(texts)
+        max_batch: Stop collecting once a batch has this many strings
+        max_wait: Seconds a request may wait for others to join its batch
+    """
+
+    def __init__(self, model, max_batch=EMBEDDING_MAX_BATCH, max_wait=EMBEDDING_BATCH_WAIT_MS / 1000):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.queue = asyncio.Queue()
+        # One inference at a time; torch already uses EMBEDDING_THREADS inside it
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.batches = 0
+        self.texts = 0
+
+    async def embed(self, texts):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((time.monotonic(), texts, future))
+        return await future
+
+    async def _collect(self):
+        first = await self.queue.get()
+        batch = [first]
+        size = len(first[1])
+        # The window starts when the first request arrived, so requests that
+        # queued during the previous batch go straight in
+        deadline = first[0] + self.max_wait
+        while size < self.max_batch:
+            if self.queue.empty():
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            else:
+                item = self.queue.get_nowait()
+            batch.append(item)
+            size += len(item[1])
+        return batch
+
+    def _encode(self, texts):
+        return np.asarray(self.model.encode(texts, batch_size=self.max_batch), dtype="<f4")
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            texts = [text for _, item_texts, _ in batch for text in item_texts]
+            try:
+                vectors = await loop.run_in_executor(self.executor, self._encode, texts)
+            except Exception as e:
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.texts += len(texts)
+            offset = 0
+            for _, item_texts, future in batch:
+                if not future.done():
+                    future.set_result(vectors[offset:offset + len(item_texts)])
+                offset += len(item_texts)
+
+
+def encode_response(vectors):
+    rows, dim = vectors.shape
+    return SHAPE.pack(rows, dim) + vectors.tobytes()
+
+
+def encode_error(message):
+    return SHAPE.pack(ERROR_ROWS, 0) + message.encode()
+
+
+def make_handler(batcher, connections):
+    async def handle(reader, writer):
+        connections.add(writer)
+        try:
+            while True:
+                header = await reader.readexactly(HEADER.size)
+                payload = await reader.readexactly(HEADER.unpack(header)[0])
+                try:
+                    texts = json.loads(payload)
+                    if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+                        raise ValueError("expected a JSON list of strings")
+                    body = encode_response(await batcher.embed(texts))
+                except Exception as e:
+                    body = encode_error(f"{type(e).__name__}: {e}")
+                writer.write(HEADER.pack(len(body)) + body)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            connections.discard(writer)
+            writer.close()
+
+    return handle
+
+
+def load_model():
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    torch.set_num_threads(EMBEDDING_THREADS)
+    model = SentenceTransformer(EMBEDDING_MODEL, device="cpu")
+    # First call builds kernels and caches; keep that off the first request
+    model.encode(["warm up"])
+    return model
+
+
+async def serve(model, path):
+    batcher = MicroBatcher(model)
+    if os.path.exists(path):
+        os.unlink(path)
+    connections = set()
+    server = await asyncio.start_unix_server(make_handler(batcher, connections), path=path)
+    batch_task = asyncio.create_task(batcher.run())
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+
+    logger.info(f"Embedding server ready on {path} (model {EMBEDDING_MODEL}, "
+                f"batch <= {batcher.max_batch}, wait {batcher.max_wait * 1000:g} ms)")
+    async with server:
+        await stop.wait()
+        # Closing the clients' connections ends their handlers cleanly
+        for writer in list(connections):
+            writer.close()
+        await asyncio.sleep(0.1)
+    batch_task.cancel()
+    if os.path.exists(path):
+        os.unlink(path)
+    if batcher.batches:
+        logger.info(f"Embedding server stopped: {batcher.texts} texts in {batcher.batches} batches "
+                    f"({batcher.texts / batcher.batches:.1f} per batch)")
+
+
+def main():
+    if not EMBEDDING_SOCKET:
+        raise SystemExit("Set EMBEDDING_SOCKET to the Unix socket path to listen on")
+    setup_logging()
+    asyncio.run(serve(load_model(), EMBEDDING_SOCKET))
+
+
+if __name__ == "__main__":
+    main()
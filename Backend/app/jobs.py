@@ -0,0 +1,227 @@
+"""
+Mongo-backed queue of generation jobs.
+
+API processes insert jobs; worker processes (python -m app.worker, on any
+node that can reach the database) claim them with an atomic
+find_one_and_update that moves a job to "running" under a lease. A worker
+extends its lease while it works; a job whose lease ran out (the worker
+crashed or lost the database) is claimed again by the next worker, up to
+JOB_MAX_ATTEMPTS times.
+
+Job states: queued -> running -> done | failed.
+"""
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+from fastapi import HTTPException, status
+from fastapi.responses import JSONResponse
+from pymongo import ReturnDocument
+from app.database import jobs_collection
+from app.config import (
+    JOB_LEASE_SECONDS,
+    JOB_MAX_ATTEMPTS,
+    JOB_RETENTION_SECONDS,
+    JOB_WAIT_MAX_SECONDS,
+)
+
+# Higher runs first; interactive requests go ahead of bulk work
+PRIORITY_INTERACTIVE = 10
+PRIORITY_BULK = 0
+
+FINISHED = ("done", "failed")
+
+
+async def enqueue(kind, params, owner, priority=PRIORITY_INTERACTIVE, job_id=None):
+    """
+    Queue a generation job
+
+    Args:
+        kind: Job type, one of the worker's handlers (e.g. "lesson_plan")
+        params: The request body, as a dict
+        owner: Email of the user the job belongs to
+        priority: Higher priorities are claimed first
+        job_id: Id to use, when the caller already refers to the job
+
+    Returns:
+        str: The job id
+    """
+    job_id = job_id or uuid.uuid4().hex
+    await jobs_collection.insert_one({
+        "_id": job_id,
+        "kind": kind,
+        "params": params,
+        "owner": owner,
+        "priority": priority,
+        "status": "queued",
+        "attempts": 0,
+        "created_at": datetime.utcnow(),
+    })
+    return job_id
+
+
+async def claim(worker_id, kinds):
+    """
+    Atomically take the next runnable job
+
+    A job is runnable when it is queued, or running under a lease that has
+    expired and it has attempts left.
+
+    Returns:
+        dict | None: The claimed job, or None when there is nothing to do
+    """
+    now = datetime.utcnow()
+    return await jobs_collection.find_one_and_update(
+        {
+            "kind": {"$in": list(kinds)},
+            "$or": [
+                {"status": "queued"},
+                {"status": "running", "lease_until": {"$lt": now}, "attempts": {"$lt": JOB_MAX_ATTEMPTS}},
+            ],
+        },
+        {
+            "$set": {
+                "status": "running",
+                "worker": worker_id,
+                "started_at": now,
+                "lease_until": now + timedelta(seconds=JOB_LEASE_SECONDS),
+            },
+            "$inc": {"attempts": 1},
+        },
+        sort=[("priority", -1), ("created_at", 1)],
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+async def renew_lease(job_id, worker_id):
+    """
+    Extend a running job's lease
+
+    Returns:
+        bool: False when the job is no longer this worker's (it was reclaimed)
+    """
+    result = await jobs_collection.update_one(
+        {"_id": job_id, "worker": worker_id, "status": "running"},
+        {"$set": {"lease_until": datetime.utcnow() + timedelta(seconds=JOB_LEASE_SECONDS)}},
+    )
+    return result.matched_count == 1
+
+
+async def finish(job_id, worker_id, result=None, error=None):
+    """
+    Record a job's result or error
+
+    Only the worker holding the job can finish it, so a worker whose lease
+    was reclaimed can't overwrite the new attempt.
+    """
+    now = datetime.utcnow()
+    await jobs_collection.update_one(
+        {"_id": job_id, "worker": worker_id, "status": "running"},
+        {
+            "$set": {
+                "status": "failed" if error else "done",
+                "result": result,
+                "error": error,
+                "finished_at": now,
+                "expires_at": now + timedelta(seconds=JOB_RETENTION_SECONDS),
+            },
+            "$unset": {"lease_until": ""},
+        },
+    )
+
+
+async def fail_abandoned():
+    """
+    Fail jobs whose last attempt's lease has run out
+
+    Returns:
+        int: The number of jobs failed
+    """
+    now = datetime.utcnow()
+    result = await jobs_collection.update_many(
+        {"status": "running", "lease_until": {"$lt": now}, "attempts": {"$gte": JOB_MAX_ATTEMPTS}},
+        {
+            "$set": {
+                "status": "failed",
+                "error": {"status_code": 500, "detail": "The job was abandoned by its workers"},
+                "finished_at": now,
+                "expires_at": now + timedelta(seconds=JOB_RETENTION_SECONDS),
+            },
+            "$unset": {"lease_until": ""},
+        },
+    )
+    return result.modified_count
+
+
+async def requeue(job_id, owner):
+    """
+    Queue a finished job to run again, with a fresh set of attempts
+
+    Returns:
+        bool: False when there is no finished job with this id for this user
+    """
+    result = await jobs_collection.update_one(
+        {"_id": job_id, "owner": owner, "status": {"$in": list(FINISHED)}},
+        {
+            "$set": {"status": "queued", "attempts": 0, "created_at": datetime.utcnow()},
+            "$unset": {"result": "", "error": "", "worker": "", "finished_at": "", "expires_at": ""},
+        },
+    )
+    return result.modified_count == 1
+
+
+def job_status(job):
+    """ The client's view of a job """
+    view = {
+        "job_id": job["_id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "created_at": job["created_at"].isoformat() + "Z",
+    }
+    if job["status"] == "done":
+        view["result"] = job["result"]
+    elif job["status"] == "failed":
+        view["error"] = job["error"]
+    return view
+
+
+async def get_job(job_id, owner, wait=0):
+    """
+    Look up a job, optionally waiting for it to finish
+
+    Args:
+        job_id: The job id
+        owner: Email of the requesting user; other users' jobs are not found
+        wait: Seconds to hold the request open until the job is finished
+
+    Raises:
+        HTTPException: 404 when there is no such job for this user
+
+    Returns:
+        dict: The job's status, as returned by job_status
+    """
+    # Polling rather than a change stream, which needs a replica set
+    deadline = asyncio.get_running_loop().time() + min(max(wait, 0), JOB_WAIT_MAX_SECONDS)
+    delay = 0.25
+    while True:
+        job = await jobs_collection.find_one({"_id": job_id, "owner": owner}, {"params": 0})
+        if job is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+        remaining = deadline - asyncio.get_running_loop().time()
+        if job["status"] in FINISHED or remaining <= 0:
+            return job_status(job)
+        await asyncio.sleep(min(delay, remaining))
+        delay = min(delay * 2, 2)
+
+
+async def submit_job(kind, request, user, priority=PRIORITY_INTERACTIVE):
+    """
+    Queue a generation request and answer 202 Accepted
+
+    The response carries the job id and, in Location, the URL to poll.
+    """
+    job_id = await enqueue(kind, request.dict(), user["email"], priority)
+    return JSONResponse(
+        {"job_id": job_id, "status": "queued", "status_url": f"/jobs/{job_id}"},
+        status_code=status.HTTP_202_ACCEPTED,
+        headers={"Location": f"/jobs/{job_id}"},
+    )
@@ -0,0 +1,225 @@
+"""
+Structured, buffered logging for the app.
+
+Records from the "app" logger tree are handed to a queue and written to
+stdout by a background thread, so a request never waits on a stdout write.
+Each record carries the id of the request it was logged for (taken from an
+X-Request-ID header or generated, and echoed back on the response) plus
+any fields passed as extra=fields(...). Field values are cut at
+LOG_FIELD_MAX_CHARS.
+
+Large payloads (retrieved contexts, prompts, LLM output) go through
+log_payloads, which logs only their sizes unless the request was sampled
+(LOG_PAYLOAD_SAMPLE_RATE) or an admin asked for them with
+X-Debug-Payloads: 1.
+"""
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import sys
+import time
+import uuid
+from fastapi import Request
+from app.config import (
+    LOG_LEVEL,
+    LOG_FORMAT,
+    LOG_FIELD_MAX_CHARS,
+    LOG_PAYLOAD_SAMPLE_RATE,
+    LOG_PAYLOAD_MAX_CHARS,
+    LOG_QUEUE_SIZE,
+)
+
+REQUEST_ID_HEADER = "X-Request-ID"
+# Ids accepted from clients or proxies; anything else is replaced
+REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9._:-]{1,64}$")
+
+request_id_var = contextvars.ContextVar("request_id", default=None)
+# Whether the current request logs its full payloads
+_dump_payloads = contextvars.ContextVar("log_dump_payloads", default=False)
+
+
+def fields(**values):
+    """ Structured fields for a record: logger.info("...", extra=fields(a=1)) """
+    return {"fields": values}
+
+
+def truncate(value, limit=LOG_FIELD_MAX_CHARS):
+    if isinstance(value, str) and len(value) > limit:
+        return f"{value[:limit]}...[{len(value) - limit} more chars]"
+    return value
+
+
+def _capped(values, limit):
+    capped = {}
+    for key, value in values.items():
+        if not isinstance(value, (str, int, float, bool, type(None))):
+            value = truncate(json.dumps(value, default=str), limit)
+        capped[key] = truncate(value, limit)
+    return capped
+
+
+class JsonFormatter(logging.Formatter):
+    """ One JSON object per line """
+
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            entry["request_id"] = request_id
+        entry.update(_capped(getattr(record, "fields", {}), getattr(record, "field_limit", LOG_FIELD_MAX_CHARS)))
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """ Human-readable lines with key=value fields, for a terminal """
+
+    def format(self, record):
+        line = (f"{self.formatTime(record)} {record.levelname:<7} "
+                f"[{getattr(record, 'request_id', None) or '-'}] {record.name}: {record.getMessage()}")
+        values = _capped(getattr(record, "fields", {}), getattr(record, "field_limit", LOG_FIELD_MAX_CHARS))
+        if values:
+            line += " " + " ".join(f"{key}={value!r}" for key, value in values.items())
+        if record.exc_text:
+            line += "\n" + record.exc_text
+        return line
+
+
+class BufferedHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that never blocks the caller
+
+    The request id is read here, in the logging thread's context, before
+    the record crosses to the writer thread. When the writer falls behind
+    and the queue is full, records are dropped and counted.
+    """
+
+    def __init__(self, maxsize=LOG_QUEUE_SIZE):
+        super().__init__(queue.Queue(maxsize))
+        self.dropped = 0
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        record.request_id = request_id_var.get()
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_handler = None
+_listener = None
+
+
+def _start_listener():
+    global _listener
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(TextFormatter() if LOG_FORMAT == "text" else JsonFormatter())
+    _listener = logging.handlers.QueueListener(_handler.queue, stream)
+    _listener.start()
+
+
+def _after_fork():
+    # The writer thread doesn't survive a fork; records queued in the parent
+    # before it stay with the parent
+    global _handler
+    _handler.queue = queue.Queue(LOG_QUEUE_SIZE)
+    _start_listener()
+
+
+def stop_logging():
+    """ Write out queued records and stop the writer thread """
+    if _listener is not None:
+        _listener.stop()
+
+
+def setup_logging():
+    """
+    Route the "app" loggers through the buffered handler
+
+    Safe to call more than once; only the first call has an effect.
+    """
+    global _handler
+    if _handler is not None:
+        return
+    _handler = BufferedHandler()
+    logger = logging.getLogger("app")
+    logger.setLevel(LOG_LEVEL)
+    logger.addHandler(_handler)
+    logger.propagate = False
+    _start_listener()
+    os.register_at_fork(after_in_child=_after_fork)
+    import atexit
+    atexit.register(stop_logging)
+
+
+def log_payloads(logger, message, **payloads):
+    """
+    Log a request's large payloads, or only their sizes
+
+    Sizes (in characters) are always logged; the payloads themselves only
+    for requests picked by LOG_PAYLOAD_SAMPLE_RATE or X-Debug-Payloads, and
+    capped at LOG_PAYLOAD_MAX_CHARS each.
+    """
+    values = {f"{name}_chars": len(value or "") for name, value in payloads.items()}
+    extra = {"fields": values}
+    if _dump_payloads.get() and logger.isEnabledFor(logging.INFO):
+        values.update(payloads)
+        extra["field_limit"] = LOG_PAYLOAD_MAX_CHARS
+    logger.info(message, extra=extra)
+
+
+access_logger = logging.getLogger("app.access")
+
+
+async def log_requests(request: Request, call_next):
+    """
+    HTTP middleware assigning a request id and logging one line per request
+
+    The id comes from the X-Request-ID header when it looks like one, so
+    a proxy's id is kept; otherwise a new one is made. Either way it is
+    returned in the response's X-Request-ID header.
+    """
+    from app.admin import is_admin
+    request_id = request.headers.get(REQUEST_ID_HEADER, "")
+    if not REQUEST_ID_PATTERN.match(request_id):
+        request_id = uuid.uuid4().hex
+    request_id_var.set(request_id)
+    _dump_payloads.set(
+        (request.headers.get("x-debug-payloads") == "1" and is_admin(request))
+        or random.random() < LOG_PAYLOAD_SAMPLE_RATE
+    )
+
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+    except Exception:
+        access_logger.exception("Request failed", extra=fields(
+            method=request.method, path=request.url.path,
+            duration_ms=round((time.perf_counter() - start) * 1000, 1)))
+        raise
+    response.headers[REQUEST_ID_HEADER] = request_id
+    access_logger.info("Request", extra=fields(
+        method=request.method, path=request.url.path, status=response.status_code,
+        duration_ms=round((time.perf_counter() - start) * 1000, 1)))
+    return response
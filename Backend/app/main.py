@@ -1,10 +1,46 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
-from app.routers import auth_routes, lesson_plan_routes, assessment_router, icebreaker_routes, pdf_routes
+from app.routers import auth_routes, lesson_plan_routes, assessment_router, icebreaker_routes, pdf_routes, admin_routes, job_routes, bulk_routes, prefetch_routes
 from app.config import FRONTEND_URL, SESSION_SECRET_KEY
+from app.auth import require_user
+from app.rate_limit import rate_limit, add_rate_limit_headers
+from app.oauth import close_http_client
+from app.metrics import record_request_metrics, metrics_response
+from app.profiler import profile_requests
+from app.logs import setup_logging, log_requests
+from app.admin import require_admin
+from app.deadline import DeadlineExceeded, deadline_exceeded_handler, request_deadline
+from app import warmup, analytics
 
-app = FastAPI()
+setup_logging()
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Warm up in the background: the process accepts connections at once,
+    # but /ready stays 503 until stores, embedder and indexes are loaded
+    warmup_task = asyncio.create_task(warmup.warm_up())
+    # Generation cache analytics are written in batches
+    analytics_task = asyncio.create_task(analytics.flush_periodically())
+    yield
+    warmup_task.cancel()
+    analytics_task.cancel()
+    try:
+        await analytics_task
+    except asyncio.CancelledError:
+        pass
+    # Close the pooled connections used for Google sign-in
+    await close_http_client()
+
+
+app = FastAPI(lifespan=lifespan)
+
+# 504 for requests that ran out of time (see app.deadline)
+app.add_exception_handler(DeadlineExceeded, deadline_exceeded_handler)
 
 # Enable CORS for frontend
 app.add_middleware(
@@ -18,12 +54,59 @@ app.add_middleware(
 # Add session middleware for OAuth
 app.add_middleware(SessionMiddleware, secret_key=SESSION_SECRET_KEY)
 
+# X-RateLimit-* headers for requests that passed a rate limit
+app.middleware("http")(add_rate_limit_headers)
+
+# Latency and error counts per route, exported on /metrics
+app.middleware("http")(record_request_metrics)
+
+# Stack profiles of sampled and slow requests, listed under /admin/profiles
+app.middleware("http")(profile_requests)
+
+# Request ids and one structured log line per request; registered last so
+# it runs first and everything below logs with the request's id
+app.middleware("http")(log_requests)
+
+# Generation and PDF routes need a valid access token (verified locally, no DB hit)
+# and are rate limited per user and per IP; sign-in routes per IP only (see
+# auth_routes). Each also gets a deadline: the endpoint's default or the
+# client's X-Request-Timeout
+generation = [Depends(require_user), Depends(rate_limit("generation"))]
+pdf = [Depends(require_user), Depends(rate_limit("pdf")), Depends(request_deadline("pdf"))]
+
 app.include_router(auth_routes.router, prefix="")
-app.include_router(lesson_plan_routes.router, prefix="/lesson-plan")
-app.include_router(assessment_router.router, prefix="/assessment", tags=["assessment"])
-app.include_router(icebreaker_routes.router, prefix="/icebreaker-activity")
-app.include_router(pdf_routes.router, prefix="/pdf", tags=["PDF"])
+app.include_router(lesson_plan_routes.router, prefix="/lesson-plan", dependencies=generation + [Depends(request_deadline("lesson_plan"))])
+app.include_router(assessment_router.router, prefix="/assessment", tags=["assessment"],
+                   dependencies=generation + [Depends(request_deadline("assessment"))])
+app.include_router(icebreaker_routes.router, prefix="/icebreaker-activity",
+                   dependencies=generation + [Depends(request_deadline("icebreaker"))])
+app.include_router(pdf_routes.router, prefix="/pdf", tags=["PDF"], dependencies=pdf)
+# Speculative retrieval while generation forms are filled in; its own, larger budget
+app.include_router(prefetch_routes.router, prefix="/prefetch", tags=["prefetch"],
+                   dependencies=[Depends(require_user), Depends(rate_limit("prefetch"))])
+# Status of generation jobs queued with ?mode=job; polled, so not rate limited
+app.include_router(job_routes.router, prefix="/jobs", tags=["jobs"], dependencies=[Depends(require_user)])
+# Bulk curriculum runs; creating one counts against the generation budget
+app.include_router(bulk_routes.router, prefix="/bulk", tags=["bulk"], dependencies=[Depends(require_user)])
+app.include_router(admin_routes.router, prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin)])
 
 @app.get("/")
 def root():
-    return {"message": "FastAPI Google OAuth with .env Configuration"}
\ No newline at end of file
+    return {"message": "FastAPI Google OAuth with .env Configuration"}
+
+@app.get("/ready")
+def ready():
+    """
+    Readiness probe: 200 once the startup warm-up has finished, 503 before
+    (or if it failed), with per-step timings in seconds
+    """
+    report = warmup.state.report()
+    return JSONResponse(report, status_code=200 if warmup.state.ready else 503)
+
+@app.get("/metrics")
+def metrics():
+    """
+    Prometheus metrics: per-stage latency, LLM tokens, cache hits and
+    errors per route
+    """
+    return metrics_response()
\ No newline at end of file
@@ -0,0 +1,136 @@
+import os
+import time
+from fastapi import Request
+from fastapi.responses import Response
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+)
+
+# Pipeline stages run from milliseconds (cache, embedding) to a minute (LLM)
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 80)
+
+STAGE_SECONDS = Histogram(
+    "lessonplan_stage_seconds",
+    "Time spent in each stage of a generation or PDF request",
+    ["endpoint", "stage"],
+    buckets=STAGE_BUCKETS,
+)
+LLM_TOKENS = Counter(
+    "lessonplan_llm_tokens_total",
+    "Tokens sent to and received from the LLM",
+    ["endpoint", "kind"],
+)
+CACHE_LOOKUPS = Counter(
+    "lessonplan_cache_lookups_total",
+    "Cache lookups by cache and result",
+    ["cache", "result"],
+)
+REQUEST_SECONDS = Histogram(
+    "lessonplan_request_seconds",
+    "HTTP request latency by route",
+    ["endpoint"],
+    buckets=STAGE_BUCKETS,
+)
+REQUEST_ERRORS = Counter(
+    "lessonplan_request_errors_total",
+    "HTTP responses with an error status by route",
+    ["endpoint", "status"],
+)
+CLIENT_DISCONNECTS = Counter(
+    "lessonplan_client_disconnects_total",
+    "Generation requests whose client went away before the response was ready",
+    ["endpoint"],
+)
+GENERATIONS_CANCELLED = Counter(
+    "lessonplan_generations_cancelled_total",
+    "Generations abandoned once no client was waiting for them, by the stage they stopped in",
+    ["endpoint", "stage"],
+)
+DEADLINE_EVENTS = Counter(
+    "lessonplan_deadline_events_total",
+    "Stages cut short by the request deadline: degraded (went on with less) or exceeded (504)",
+    ["endpoint", "stage", "outcome"],
+)
+
+
+def observe(endpoint, stage, seconds):
+    STAGE_SECONDS.labels(endpoint, stage).observe(seconds)
+
+
+def cache_lookup(cache, hit):
+    CACHE_LOOKUPS.labels(cache, "hit" if hit else "miss").inc()
+
+
+class StageTimer:
+    """
+    Times the stages of one request
+
+    Each lap() charges the time since the previous lap to a stage. A stage
+    lapped more than once (retrieval before and after embedding, say) is
+    summed and observed once by finish(), along with the total.
+    """
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.start = self.last = time.perf_counter()
+        self.stages = {}
+
+    def lap(self, stage):
+        now = time.perf_counter()
+        self.stages[stage] = self.stages.get(stage, 0.0) + now - self.last
+        self.last = now
+
+    def skip(self):
+        """ Don't charge the time since the last lap to any stage """
+        self.last = time.perf_counter()
+
+    def finish(self):
+        for stage, seconds in self.stages.items():
+            observe(self.endpoint, stage, seconds)
+        observe(self.endpoint, "total", time.perf_counter() - self.start)
+
+
+async def record_request_metrics(request: Request, call_next):
+    """
+    HTTP middleware recording latency and error responses per route
+
+    Routes are labelled by their endpoint function's name, so path
+    parameters don't create a new series per value.
+    """
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+    except Exception:
+        REQUEST_ERRORS.labels(_route_label(request), "500").inc()
+        raise
+    endpoint = _route_label(request)
+    REQUEST_SECONDS.labels(endpoint).observe(time.perf_counter() - start)
+    if response.status_code >= 400:
+        REQUEST_ERRORS.labels(endpoint, str(response.status_code)).inc()
+    return response
+
+
+def _route_label(request):
+    endpoint = request.scope.get("endpoint")
+    return getattr(endpoint, "__name__", "unmatched")
+
+
+def metrics_response():
+    """
+    Current metrics in the Prometheus text format
+
+    Under gunicorn every worker writes its samples to PROMETHEUS_MULTIPROC_DIR
+    (set by gunicorn.conf.py), and a scrape of any worker aggregates them all.
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
@@ -1,14 +1,158 @@
-from authlib.integrations.starlette_client import OAuth
-from app.config import GOOGLE_CLIENT_ID, GOOGLE_CLIENT_SECRET, GOOGLE_REDIRECT_URI
-
-oauth = OAuth()
-oauth.register(
-    name="google",
-    client_id=GOOGLE_CLIENT_ID,
-    client_secret=GOOGLE_CLIENT_SECRET,
-    authorize_url="https://accounts.google.com/o/oauth2/auth",
-    authorize_params={"scope": "openid email profile"},
-    access_token_url="https://oauth2.googleapis.com/token",
-    access_token_params=None,
-    client_kwargs={"scope": "openid email profile"},
+import asyncio
+import re
+import time
+import httpx
+import jwt
+from app.config import (
+    GOOGLE_CLIENT_ID,
+    GOOGLE_CLIENT_SECRET,
+    GOOGLE_REDIRECT_URI,
+    GOOGLE_TOKEN_URL,
+    GOOGLE_JWKS_URL,
+    GOOGLE_USERINFO_URL,
+    GOOGLE_ISSUERS,
 )
+
+_MAX_AGE_RE = re.compile(r'max-age=(\d+)')
+
+# Used when the JWKS response has no usable Cache-Control header
+DEFAULT_JWKS_MAX_AGE = 3600
+# An unknown key id triggers a refetch (Google rotated its keys), at most this often
+JWKS_REFRESH_INTERVAL = 60
+
+_http_client = None
+
+
+def get_http_client():
+    """
+    The app-lifetime HTTP client for outbound auth calls
+
+    Connections are pooled and kept alive, so after the first login the
+    token exchange reuses an open TLS connection to Google.
+    """
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(10.0),
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10)
+        )
+    return _http_client
+
+
+async def close_http_client():
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+class GoogleKeySet:
+    """
+    Google's token signing keys, cached for as long as their Cache-Control allows
+    """
+
+    def __init__(self, url):
+        self.url = url
+        self._keys = {}
+        self._expires_at = 0
+        self._fetched_at = 0
+        self._lock = asyncio.Lock()
+
+    async def get_key(self, kid):
+        """
+        Public key for a key id, fetching the key set when stale or when the id is unknown
+
+        Returns:
+            The key object to pass to jwt.decode, or None if Google has no such key
+        """
+        now = time.monotonic()
+        if now < self._expires_at and kid in self._keys:
+            return self._keys[kid]
+
+        async with self._lock:
+            # Another request may have refreshed the keys while we waited
+            now = time.monotonic()
+            stale = now >= self._expires_at
+            unknown = kid not in self._keys and now - self._fetched_at >= JWKS_REFRESH_INTERVAL
+            if stale or unknown:
+                await self._refresh()
+        return self._keys.get(kid)
+
+    async def _refresh(self):
+        response = await get_http_client().get(self.url)
+        response.raise_for_status()
+        self._keys = {
+            jwk["kid"]: jwt.PyJWK(jwk).key
+            for jwk in response.json().get("keys", [])
+            if "kid" in jwk
+        }
+        match = _MAX_AGE_RE.search(response.headers.get("cache-control", ""))
+        max_age = int(match.group(1)) if match else DEFAULT_JWKS_MAX_AGE
+        self._fetched_at = time.monotonic()
+        self._expires_at = self._fetched_at + max_age
+
+
+google_keys = GoogleKeySet(GOOGLE_JWKS_URL)
+
+
+async def exchange_code(code):
+    """
+    Exchange an authorization code for Google's token response
+
+    Returns:
+        dict: The token response (access_token, id_token, expires_in, ...)
+    """
+    response = await get_http_client().post(GOOGLE_TOKEN_URL, data={
+        "client_id": GOOGLE_CLIENT_ID,
+        "client_secret": GOOGLE_CLIENT_SECRET,
+        "code": code,
+        "grant_type": "authorization_code",
+        "redirect_uri": GOOGLE_REDIRECT_URI
+    })
+    return response.json()
+
+
+async def verify_id_token(id_token):
+    """
+    Verify a Google id_token locally against the cached signing keys
+
+    Args:
+        id_token: The id_token from the token response
+
+    Returns:
+        dict: The token's claims
+
+    Raises:
+        jwt.InvalidTokenError: When the signature, audience, issuer or expiry is wrong
+    """
+    kid = jwt.get_unverified_header(id_token).get("kid")
+    key = await google_keys.get_key(kid)
+    if key is None:
+        raise jwt.InvalidTokenError(f"Unknown signing key {kid}")
+
+    claims = jwt.decode(id_token, key=key, algorithms=["RS256"], audience=GOOGLE_CLIENT_ID)
+    if claims.get("iss") not in GOOGLE_ISSUERS:
+        raise jwt.InvalidIssuerError(f"Unexpected issuer {claims.get('iss')}")
+    return claims
+
+
+def profile_from_claims(claims):
+    """ User profile in the same shape as the /oauth2/v2/userinfo response """
+    return {
+        "id": claims["sub"],
+        "email": claims["email"],
+        "verified_email": claims.get("email_verified", False),
+        "name": claims.get("name"),
+        "given_name": claims.get("given_name"),
+        "family_name": claims.get("family_name"),
+        "picture": claims.get("picture"),
+    }
+
+
+async def fetch_userinfo(access_token):
+    """ User profile from Google's userinfo endpoint, for token responses without an id_token """
+    response = await get_http_client().get(
+        GOOGLE_USERINFO_URL,
+        headers={"Authorization": f"Bearer {access_token}"}
+    )
+    return response.json()
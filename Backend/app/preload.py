@@ -0,0 +1,20 @@
+from app.services.pdf_fonts import register_fonts, available_fonts
+from app.services.pdf_common import get_pdf_styles
+
+
+def preload():
+    """
+    Load read-only state into the gunicorn master before workers fork.
+
+    Importing app.main (done by gunicorn's preload_app) already brings in
+    the services and their clients. This adds the lazily built tables, so
+    they live in pages the workers share copy-on-write instead of being
+    built once per worker. The embedding model lives in the embedding
+    server, not here.
+
+    Chroma clients are deliberately not opened here; see
+    app.services.chroma_clients.
+    """
+    register_fonts()
+    for font in available_fonts():
+        get_pdf_styles(font)
@@ -0,0 +1,370 @@
+"""
+Low-overhead sampling profiler for slow or randomly chosen requests.
+
+A single background thread samples the stacks of every thread in the
+process while at least one request is in flight, and keeps the last
+PROFILE_WINDOW_SECONDS of samples in memory. When a request finishes, its
+samples are only written out if it was picked at random
+(PROFILE_SAMPLE_RATE), ran longer than PROFILE_SLOW_SECONDS, or was
+explicitly asked to be profiled by an admin; otherwise they simply age out.
+Nothing runs while the process is idle.
+
+Samples cover the whole process, so work a request hands to thread pools
+(FastAPI's, asyncio.to_thread, the password hasher) shows up under those
+threads' names. Work sent to the PDF render process pool is sampled in the
+child by profiled_call and merged into the request's profile.
+
+Because of that, a profile is process-wide: a request that overlapped
+others also holds their stacks. Each profile says so (scope "process")
+and records concurrent_requests, the most requests in flight at once
+while it ran; only with 1 are all stacks the request's own.
+
+Profiles are stored as gzipped JSON with folded stacks ("a;b;c count"),
+which flamegraph.pl, speedscope and similar tools read directly.
+"""
+import contextvars
+import gzip
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from fastapi import Request
+from starlette.concurrency import run_in_threadpool
+from app.config import (
+    PROFILE_SAMPLE_RATE,
+    PROFILE_SLOW_SECONDS,
+    PROFILE_INTERVAL_MS,
+    PROFILE_WINDOW_SECONDS,
+    PROFILE_DIR,
+    PROFILE_MAX_FILES,
+)
+
+logger = logging.getLogger(__name__)
+
+ENABLED = PROFILE_SAMPLE_RATE > 0 or PROFILE_SLOW_SECONDS > 0
+
+# Leaf functions of a thread that is parked rather than doing work
+IDLE_FUNCTIONS = frozenset({
+    "wait", "select", "poll", "_worker", "accept", "_wait_for_tstate_lock", "serve_forever",
+})
+# Files whose frames, as a leaf, mean a background thread sleeping between
+# runs (pymongo's monitors sit in time.sleep inside their periodic loop)
+IDLE_FILES = frozenset({"periodic_executor.py"})
+
+# Request parameters kept with a profile
+MAX_BODY_BYTES = 16 * 1024
+REDACTED_FIELDS = frozenset({"password", "token", "id_token", "access_token", "code"})
+
+
+class Sampler:
+    """
+    Samples all thread stacks at a fixed interval while requests are active
+
+    Args:
+        interval: Seconds between samples
+        window: Seconds of samples to keep
+    """
+
+    def __init__(self, interval=PROFILE_INTERVAL_MS / 1000, window=PROFILE_WINDOW_SECONDS):
+        self.interval = interval
+        self.window = window
+        self.samples = deque()
+        self._labels = {}
+        self._stacks = {}
+        self._active = 0
+        # Most requests in flight at once, per request in flight
+        self._peaks = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def _label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            label = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+            self._labels[code] = label
+        return label
+
+    def sample(self, thread_ids=None):
+        """
+        Take one sample of the process's busy threads
+
+        Returns:
+            list: Folded stacks, one per busy thread
+        """
+        own = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        stacks = []
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own or (thread_ids is not None and thread_id not in thread_ids):
+                continue
+            code = frame.f_code
+            if code.co_name in IDLE_FUNCTIONS or os.path.basename(code.co_filename) in IDLE_FILES:
+                continue
+            codes = []
+            while frame is not None:
+                codes.append(frame.f_code)
+                frame = frame.f_back
+            key = (names.get(thread_id, "thread"), tuple(codes))
+            # Identical stacks repeat constantly; fold each one only once
+            folded = self._stacks.get(key)
+            if folded is None:
+                folded = ";".join([key[0]] + [self._label(code) for code in reversed(codes)])
+                self._stacks[key] = folded
+            stacks.append(folded)
+        return stacks
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            now = time.monotonic()
+            for folded in self.sample():
+                self.samples.append((now, folded))
+            while self.samples and self.samples[0][0] < now - self.window:
+                self.samples.popleft()
+            time.sleep(self.interval)
+
+    def begin(self):
+        """
+        Start sampling for a request
+
+        Returns:
+            object: Token to pass to end
+        """
+        token = object()
+        with self._lock:
+            # A sampler thread inherited across a fork doesn't exist in the child
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self.samples.clear()
+                self._active = 0
+                self._peaks.clear()
+                self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+                self._thread.start()
+            self._active += 1
+            self._peaks[token] = 0
+            for other in self._peaks:
+                self._peaks[other] = max(self._peaks[other], self._active)
+            self._wake.set()
+        return token
+
+    def end(self, token):
+        """
+        Stop sampling for a request
+
+        Returns:
+            int: The most requests in flight at once while it ran
+        """
+        with self._lock:
+            self._active -= 1
+            if self._active == 0:
+                self._wake.clear()
+            return self._peaks.pop(token, 1)
+
+    def collect(self, start, end):
+        """ Folded stack counts sampled between two monotonic times """
+        return Counter(folded for at, folded in list(self.samples) if start <= at <= end)
+
+
+sampler = Sampler()
+
+# Samples returned by process-pool work done for the current request
+_child_samples = contextvars.ContextVar("profile_child_samples", default=None)
+
+
+def add_child_samples(samples):
+    counts = _child_samples.get()
+    if counts is not None and samples:
+        counts.update(samples)
+
+
+def profiled_call(func, *args):
+    """
+    Run func in a process-pool worker while sampling that process
+
+    Submit this instead of func; the parent unpacks the result with
+    unwrap_profiled.
+
+    Returns:
+        tuple: (func's result, folded stack counts)
+    """
+    if not ENABLED:
+        return func(*args), None
+    main_thread = {threading.get_ident()}
+    samples = Counter()
+    stop = threading.Event()
+    child_sampler = Sampler()
+
+    def run():
+        while not stop.wait(child_sampler.interval):
+            samples.update(f"process-pool;{stack}" for stack in child_sampler.sample(main_thread))
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    try:
+        return func(*args), samples
+    finally:
+        stop.set()
+        thread.join()
+
+
+def unwrap_profiled(result):
+    value, samples = result
+    add_child_samples(samples)
+    return value
+
+
+class ProfileStore:
+    """
+    Bounded ring of profiles on disk, shared by all workers
+
+    Each profile is one file named by its creation time, so the oldest are
+    the first to go once there are more than max_files.
+    """
+
+    def __init__(self, directory=PROFILE_DIR, max_files=PROFILE_MAX_FILES):
+        self.directory = directory
+        self.max_files = max_files
+
+    def _files(self):
+        try:
+            return sorted(name for name in os.listdir(self.directory) if name.endswith(".json.gz"))
+        except FileNotFoundError:
+            return []
+
+    def save(self, profile):
+        os.makedirs(self.directory, exist_ok=True)
+        name = f"{profile['created']:.3f}-{profile['id']}.json.gz"
+        tmp_path = os.path.join(self.directory, f".{name}.tmp")
+        with gzip.open(tmp_path, "wt") as f:
+            json.dump(profile, f)
+        os.replace(tmp_path, os.path.join(self.directory, name))
+
+        files = self._files()
+        for old in files[:max(0, len(files) - self.max_files)]:
+            try:
+                os.remove(os.path.join(self.directory, old))
+            except OSError:
+                pass
+
+    def load(self, profile_id):
+        for name in self._files():
+            if name.endswith(f"-{profile_id}.json.gz"):
+                with gzip.open(os.path.join(self.directory, name), "rt") as f:
+                    return json.load(f)
+        return None
+
+    def list(self):
+        """ Summaries of the stored profiles, newest first """
+        summaries = []
+        for name in reversed(self._files()):
+            try:
+                with gzip.open(os.path.join(self.directory, name), "rt") as f:
+                    profile = json.load(f)
+            except (OSError, ValueError):
+                continue
+            summaries.append({key: value for key, value in profile.items() if key != "stacks"})
+        return summaries
+
+
+profile_store = ProfileStore()
+
+
+def folded_text(profile):
+    """ A profile's stacks in the folded format flame graph tools read """
+    return "".join(f"{stack} {count}\n" for stack, count in sorted(profile["stacks"].items()))
+
+
+async def _request_parameters(request):
+    parameters = {"method": request.method, "path": request.url.path, "query": dict(request.query_params)}
+    if request.headers.get("content-type", "").startswith("application/json"):
+        length = int(request.headers.get("content-length") or 0)
+        if 0 < length <= MAX_BODY_BYTES:
+            try:
+                body = json.loads(await request.body())
+            except ValueError:
+                body = None
+            if isinstance(body, dict):
+                body = {key: "[redacted]" if key in REDACTED_FIELDS else value for key, value in body.items()}
+            parameters["body"] = body
+    return parameters
+
+
+async def profile_requests(request: Request, call_next):
+    """
+    HTTP middleware deciding which requests keep a profile
+
+    The decision is made once the response body has been sent, so streamed
+    responses (the ZIP export) are profiled to the end. An admin can force
+    a profile for one request by sending X-Profile: 1 with a valid
+    X-Admin-Token; stored profiles are listed under /admin/profiles.
+    """
+    if not ENABLED:
+        return await call_next(request)
+
+    from app.admin import is_admin
+    from app.logs import request_id_var
+    forced = request.headers.get("x-profile") == "1" and is_admin(request)
+    parameters = await _request_parameters(request)
+    child_samples = Counter()
+    _child_samples.set(child_samples)
+    token = sampler.begin()
+    start = time.monotonic()
+    try:
+        response = await call_next(request)
+    except Exception:
+        sampler.end(token)
+        raise
+
+    async def finish():
+        end = time.monotonic()
+        concurrent = sampler.end(token)
+        duration = end - start
+        reason = ("forced" if forced
+                  else "slow" if PROFILE_SLOW_SECONDS > 0 and duration >= PROFILE_SLOW_SECONDS
+                  else "sampled" if random.random() < PROFILE_SAMPLE_RATE
+                  else None)
+        if not reason:
+            return
+        stacks = sampler.collect(start, end)
+        stacks.update(child_samples)
+        profile = {
+            "id": uuid.uuid4().hex[:12],
+            "created": time.time(),
+            "reason": reason,
+            "duration": round(duration, 3),
+            "status": response.status_code,
+            "interval_ms": sampler.interval * 1000,
+            "truncated": duration > sampler.window,
+            # Samples are of the whole process, including any concurrent requests
+            "scope": "process",
+            "concurrent_requests": concurrent,
+            "pid": os.getpid(),
+            "request_id": request_id_var.get(),
+            "samples": sum(stacks.values()),
+            **parameters,
+            "stacks": dict(stacks),
+        }
+        try:
+            # gzip and the ring's directory listing are kept off the event loop
+            await run_in_threadpool(profile_store.save, profile)
+        except OSError as e:
+            logger.warning(f"Error saving profile: {e}")
+
+    body = response.body_iterator
+
+    async def profiled_body():
+        try:
+            async for chunk in body:
+                yield chunk
+        finally:
+            await finish()
+
+    response.body_iterator = profiled_body()
+    return response
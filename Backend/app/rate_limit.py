@@ -0,0 +1,263 @@
+import asyncio
+import math
+import time
+from datetime import datetime
+from fastapi import Depends, HTTPException, Request
+from pymongo import ReturnDocument
+from app.auth import require_user
+from app.database import rate_limits_collection
+from app.config import (
+    RATE_LIMIT_BACKEND,
+    RATE_LIMIT_GENERATION_USER,
+    RATE_LIMIT_GENERATION_IP,
+    RATE_LIMIT_PDF_USER,
+    RATE_LIMIT_PDF_IP,
+    RATE_LIMIT_AUTH_IP,
+    RATE_LIMIT_PREFETCH_USER,
+    RATE_LIMIT_PREFETCH_IP,
+    RATE_LIMIT_BULK_ITEMS_USER,
+    RATE_LIMIT_TRUST_PROXY,
+)
+
+
+def parse_limit(value):
+    """
+    Parse a "<requests>/<seconds>" limit
+
+    Returns:
+        tuple | None: (requests, window seconds), or None when disabled
+    """
+    if not value:
+        return None
+    requests, _, seconds = value.partition("/")
+    return int(requests), int(seconds or 60)
+
+
+# Budgets per endpoint class, as (per-user limit, per-IP limit)
+LIMITS = {
+    "generation": (parse_limit(RATE_LIMIT_GENERATION_USER), parse_limit(RATE_LIMIT_GENERATION_IP)),
+    "pdf": (parse_limit(RATE_LIMIT_PDF_USER), parse_limit(RATE_LIMIT_PDF_IP)),
+    # Called as the form changes, so far more often than generation
+    "prefetch": (parse_limit(RATE_LIMIT_PREFETCH_USER), parse_limit(RATE_LIMIT_PREFETCH_IP)),
+    # Items queued by bulk runs, charged per item (see enforce_limit)
+    "bulk": (parse_limit(RATE_LIMIT_BULK_ITEMS_USER), None),
+    # Auth routes are used before there is a user, so only the IP is limited
+    "auth": (None, parse_limit(RATE_LIMIT_AUTH_IP)),
+}
+
+
+def _sliding_count(previous, current, window, now):
+    """
+    Sliding-window estimate from two fixed windows
+
+    The previous window's count is weighted by how much of it still
+    overlaps the sliding window that ends now.
+    """
+    elapsed = now % window
+    return previous * (window - elapsed) / window + current
+
+
+class MemoryRateLimitBackend:
+    """
+    Counters in this process; correct for a single worker
+    """
+
+    # Forget idle keys once this many are tracked
+    MAX_KEYS = 100_000
+
+    def __init__(self):
+        self._windows = {}
+
+    async def hit(self, key, window, now, cost=1):
+        """
+        Count cost requests for key and return (previous count, current count)
+        """
+        start = int(now // window) * window
+        window_start, previous, current = self._windows.get(key, (start, 0, 0))
+        if window_start != start:
+            # Rolled into a new window; the old current becomes previous if adjacent
+            previous = current if window_start == start - window else 0
+            current = 0
+        current += cost
+        self._windows[key] = (start, previous, current)
+
+        if len(self._windows) > self.MAX_KEYS:
+            self._prune(now)
+        return previous, current
+
+    async def uncount(self, key, window, now, cost=1):
+        """ Take back requests counted by hit in the same window """
+        start = int(now // window) * window
+        window_start, previous, current = self._windows.get(key, (None, 0, 0))
+        if window_start == start:
+            self._windows[key] = (start, previous, max(0, current - cost))
+
+    def _prune(self, now):
+        # A key whose last window ended before the previous one contributes nothing
+        for key, (window_start, _, _) in list(self._windows.items()):
+            window = int(key.rsplit(":", 1)[1])
+            if window_start < now - 2 * window:
+                del self._windows[key]
+
+
+class MongoRateLimitBackend:
+    """
+    Counters in Mongo, shared by every worker and node
+
+    One document per key and fixed window, incremented atomically and
+    removed by a TTL index once it can no longer affect the estimate.
+    """
+
+    def __init__(self):
+        self.collection = rate_limits_collection
+
+    async def hit(self, key, window, now, cost=1):
+        start = int(now // window) * window
+        current_id = f"{key}:{start}"
+        previous_id = f"{key}:{start - window}"
+
+        current_doc, previous_doc = await asyncio.gather(
+            self.collection.find_one_and_update(
+                {"_id": current_id},
+                {
+                    "$inc": {"count": cost},
+                    "$setOnInsert": {"expires_at": datetime.utcfromtimestamp(start + 2 * window)}
+                },
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            ),
+            self.collection.find_one({"_id": previous_id}, {"count": 1})
+        )
+        return (previous_doc or {}).get("count", 0), current_doc["count"]
+
+    async def uncount(self, key, window, now, cost=1):
+        start = int(now // window) * window
+        await self.collection.update_one({"_id": f"{key}:{start}"}, {"$inc": {"count": -cost}})
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = MongoRateLimitBackend() if RATE_LIMIT_BACKEND == "mongo" else MemoryRateLimitBackend()
+    return _backend
+
+
+def client_ip(request: Request):
+    if RATE_LIMIT_TRUST_PROXY:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            # The proxy appends the address it saw; entries before it are
+            # whatever the client sent
+            return forwarded.split(",")[-1].strip()
+    return request.client.host if request.client else "unknown"
+
+
+def _key(scope, identity, window):
+    return f"{scope}:{identity}:{window}"
+
+
+async def check_limit(scope, identity, limit, now=None, cost=1):
+    """
+    Count a request (cost units of it) against one limit
+
+    Returns:
+        tuple: (allowed, limit, remaining, seconds until the window resets)
+    """
+    requests, window = limit
+    now = time.time() if now is None else now
+    previous, current = await get_backend().hit(_key(scope, identity, window), window, now, cost)
+    used = _sliding_count(previous, current, window, now)
+    reset = math.ceil(window - now % window)
+    return used <= requests, requests, max(0, math.floor(requests - used)), reset
+
+
+async def uncount_limit(scope, identity, limit, now, cost=1):
+    """ Take back a request check_limit counted at now, e.g. because it was rejected """
+    _, window = limit
+    await get_backend().uncount(_key(scope, identity, window), window, now, cost)
+
+
+def _headers(limit, remaining, reset):
+    return {
+        "X-RateLimit-Limit": str(limit),
+        "X-RateLimit-Remaining": str(remaining),
+        "X-RateLimit-Reset": str(reset),
+    }
+
+
+def rate_limit(endpoint_class):
+    """
+    Dependency enforcing the per-user and per-IP budgets of an endpoint class
+
+    See enforce_limit.
+
+    Args:
+        endpoint_class: "generation", "pdf", "prefetch" or "auth"
+    """
+    user_limit, _ = LIMITS[endpoint_class]
+
+    async def check(request: Request, claims: dict = Depends(require_user)):
+        await enforce_limit(request, endpoint_class, claims.get("email"))
+
+    async def check_anonymous(request: Request):
+        await enforce_limit(request, endpoint_class, None)
+
+    return check if user_limit else check_anonymous
+
+
+async def enforce_limit(request: Request, endpoint_class, user, cost=1):
+    """
+    Count a request against the per-user and per-IP budgets of an endpoint class
+
+    A request over either budget gets a 429 with Retry-After and is not
+    counted against either, so a client retrying while limited still gets
+    back under its budget as the window slides. Otherwise the tighter of
+    the two budgets is reported in X-RateLimit-* headers, added by
+    add_rate_limit_headers.
+
+    Args:
+        request: The route's Request
+        endpoint_class: Key of LIMITS
+        user: The user's email, or None before sign-in
+        cost: Units the request uses, e.g. the items of a bulk run
+
+    Raises:
+        HTTPException: 429 when a budget would be exceeded
+    """
+    user_limit, ip_limit = LIMITS[endpoint_class]
+    checks = []
+    if user_limit and user:
+        checks.append((f"{endpoint_class}:user", user, user_limit))
+    if ip_limit:
+        checks.append((f"{endpoint_class}:ip", client_ip(request), ip_limit))
+    if not checks:
+        return
+
+    now = time.time()
+    results = await asyncio.gather(*(check_limit(*check, now=now, cost=cost) for check in checks))
+    _, limit, remaining, reset = min(results, key=lambda result: result[2])
+    if not all(allowed for allowed, _, _, _ in results):
+        await asyncio.gather(*(uncount_limit(*check, now, cost) for check in checks))
+    for allowed, blocked_limit, _, blocked_reset in results:
+        if not allowed:
+            headers = _headers(blocked_limit, 0, blocked_reset)
+            headers["Retry-After"] = str(blocked_reset)
+            raise HTTPException(status_code=429, detail="Rate limit exceeded, please try again later", headers=headers)
+    request.state.rate_limit_headers = _headers(limit, remaining, reset)
+
+
+async def add_rate_limit_headers(request: Request, call_next):
+    """
+    HTTP middleware copying the quota computed by rate_limit onto the response
+
+    Done in middleware because routes that return a Response directly (the
+    PDF endpoints) bypass headers set on an injected response.
+    """
+    response = await call_next(request)
+    headers = getattr(request.state, "rate_limit_headers", None)
+    if headers:
+        response.headers.update(headers)
+    return response
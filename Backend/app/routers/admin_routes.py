@@ -0,0 +1,69 @@
+import uuid
+from fastapi import APIRouter, HTTPException, Path, Query, status
+from fastapi.responses import JSONResponse, PlainTextResponse
+from starlette.concurrency import run_in_threadpool
+from app import analytics
+from app.config import PREWARM_TOP_K
+from app.jobs import PRIORITY_BULK, enqueue, get_job
+from app.profiler import profile_store, folded_text
+from app.services.prewarm_service import PrewarmJob
+
+router = APIRouter()
+
+
+@router.get("/profiles")
+async def list_profiles():
+    """
+    List stored request profiles, newest first, with the request's
+    parameters, duration and why it was kept
+    """
+    return {"profiles": await run_in_threadpool(profile_store.list)}
+
+
+@router.get("/profiles/{profile_id}")
+async def download_profile(
+    profile_id: str = Path(..., pattern="^[0-9a-f]{12}$"),
+    format: str = Query("folded", pattern="^(folded|json)$"),
+):
+    """
+    Download a profile
+
+    format=folded returns the stacks in the folded format that
+    flamegraph.pl and speedscope read; format=json returns the whole
+    stored profile including the request parameters.
+    """
+    profile = await run_in_threadpool(profile_store.load, profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "json":
+        return JSONResponse(profile)
+    return PlainTextResponse(
+        folded_text(profile),
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.folded"'}
+    )
+
+
+@router.get("/cache-report")
+async def cache_report(top_k: int = Query(PREWARM_TOP_K, ge=1, le=500)):
+    """
+    Generation cache hit rate per day and before/after pre-warming began,
+    with the most requested combinations the pre-warmer works from
+    """
+    return {**await analytics.hit_rate_report(), "popular": await analytics.popular(top_k)}
+
+
+@router.post("/prewarm", status_code=status.HTTP_202_ACCEPTED)
+async def start_prewarm(top_k: int = Query(PREWARM_TOP_K, ge=1, le=500)):
+    """
+    Queue a pre-warming run now instead of waiting for the off-peak hours;
+    follow it at /admin/prewarm/{job_id}
+    """
+    job_id = uuid.uuid4().hex
+    await enqueue("prewarm", PrewarmJob(top_k=top_k).dict(), "system", PRIORITY_BULK, job_id=job_id)
+    return {"job_id": job_id, "top_k": top_k}
+
+
+@router.get("/prewarm/{job_id}")
+async def get_prewarm(job_id: str = Path(..., pattern="^[0-9a-f]{32}$|^prewarm-[0-9-]{10}$")):
+    """ A pre-warming job's status and, once done, its counts """
+    return await get_job(job_id, "system")
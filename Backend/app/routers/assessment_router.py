@@ -1,7 +1,12 @@
-from fastapi import HTTPException, status, APIRouter
+from fastapi import HTTPException, status, APIRouter, Depends, Header, Query, Request
 from typing import Optional, List, Dict, Any
 from pydantic import BaseModel, Field
 from app.services.assesment_service import generate_assesment
+from app.auth import require_user
+from app.jobs import submit_job
+from app.services.generation_cache import cached_generation, cache_reuse
+from app.services.prefetch_service import use_prefetched
+from app.cancellation import Cancelled
 
 router = APIRouter()
 
@@ -20,11 +25,41 @@ class AssessmentResponse(BaseModel):
     gradeLevel: str
     topic: str
 
-@router.post("", response_model=AssessmentResponse, status_code=status.HTTP_200_OK)
-async def get_assessment(request: AssessmentRequest):
+@router.post("", response_model=AssessmentResponse, status_code=status.HTTP_200_OK,
+             responses={202: {"description": "Queued as a job (mode=job); poll /jobs/{job_id}"}})
+async def get_assessment(
+    http_request: Request,
+    request: AssessmentRequest,
+    mode: Optional[str] = Query(None, pattern="^(sync|job)$", description="job: queue the request and return 202 with a job id"),
+    user: dict = Depends(require_user),
+    cache_control: Optional[str] = Header(None),
+    x_prefetch_session: Optional[str] = Header(None),
+):
     """
     Generate an assessment using the RAG pipeline based on the specified skills, 
     topic, grade level, and additional requirements.
+
+    With mode=job the request is queued for a worker and answered with 202
+    and a job id at once. Otherwise a pre-warmed response for the same
+    parameters is returned when there is one, else a new response is
+    generated (and stored in the shared cache); send Cache-Control:
+    no-cache to always generate, or max-stale to also accept a response
+    generated for an earlier request. Retrieval started for the same form by
+    /prefetch (same X-Prefetch-Session) is reused. Generation stops if the
+    client (and any identical request sharing it) disconnects.
+    """
+    if mode == "job":
+        return await submit_job("assessment", request, user)
+    await use_prefetched(user, x_prefetch_session, "assessment", request)
+    return await cached_generation("assessment", request, assessment_response, reuse=cache_reuse(cache_control),
+                                   http_request=http_request)
+
+
+def assessment_response(request: AssessmentRequest):
+    """
+    Run the assessment pipeline and shape its output for the frontend
+
+    Shared by the route and the job worker.
     """
     try:
         subject = request.subject
@@ -62,7 +97,7 @@ async def get_assessment(request: AssessmentRequest):
 
         return response
 
-    except HTTPException:
+    except (HTTPException, Cancelled):
         raise
     except Exception as e:
         raise HTTPException(
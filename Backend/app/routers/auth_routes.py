@@ -1,18 +1,23 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 from starlette.requests import Request
 from starlette.responses import RedirectResponse
 from app.database import users_collection
 from app.models import UserSignup, UserLogin
 from fastapi import HTTPException, Request
 from starlette.responses import RedirectResponse, JSONResponse
-import httpx
-from app.config import GOOGLE_CLIENT_ID, GOOGLE_CLIENT_SECRET, GOOGLE_REDIRECT_URI, SECRET_KEY, JWT_ALGORITHM
-from passlib.context import CryptContext
+from app.config import GOOGLE_CLIENT_ID, GOOGLE_REDIRECT_URI, GOOGLE_AUTH_URL, SECRET_KEY, JWT_ALGORITHM, SESSION_EXPIRE_MINUTES
+from app.oauth import exchange_code, verify_id_token, profile_from_claims, fetch_userinfo
+from pymongo.errors import DuplicateKeyError
 import jwt
+from app.services.password_service import hash_password, verify_password
+from app.services.session_service import create_session, get_session_user, delete_session
 from datetime import datetime, timedelta
+from app.rate_limit import rate_limit
 
 router = APIRouter()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+# Sign-in attempts are limited per IP; reading the session and logging out are not
+SIGN_IN = [Depends(rate_limit("auth"))]
 
 def create_access_token(data: dict, expires_delta: timedelta):
     to_encode = data.copy()
@@ -24,7 +29,7 @@ def create_access_token(data: dict, expires_delta: timedelta):
 async def google_login():
     """ Redirects user to Google OAuth login page """
     google_auth_url = (
-        f"https://accounts.google.com/o/oauth2/auth?"
+        f"{GOOGLE_AUTH_URL}?"
         f"client_id={GOOGLE_CLIENT_ID}&"
         f"redirect_uri={GOOGLE_REDIRECT_URI}&"
         f"response_type=code&"
@@ -34,7 +39,7 @@ async def google_login():
     )
     return RedirectResponse(google_auth_url)
 
-@router.post("/auth/google/callback")
+@router.post("/auth/google/callback", dependencies=SIGN_IN)
 async def google_callback(request: Request):
     """ Handles the OAuth2 callback """
     data = await request.json()
@@ -43,87 +48,107 @@ async def google_callback(request: Request):
     if not code:
         raise HTTPException(status_code=400, detail="Authorization code missing")
     
-    token_url = "https://oauth2.googleapis.com/token"
-    
-    async with httpx.AsyncClient() as client:
-        token_response = await client.post(token_url, data={
-            "client_id": GOOGLE_CLIENT_ID,
-            "client_secret": GOOGLE_CLIENT_SECRET,
-            "code": code,
-            "grant_type": "authorization_code",
-            "redirect_uri": GOOGLE_REDIRECT_URI
-        })
-    
-    token_data = token_response.json()
+    token_data = await exchange_code(code)
     access_token = token_data.get("access_token")
 
     if not access_token:
         raise HTTPException(status_code=400, detail="Failed to obtain access token")
 
-    # Fetch user profile
-    async with httpx.AsyncClient() as client:
-        user_response = await client.get(
-            "https://www.googleapis.com/oauth2/v2/userinfo",
-            headers={"Authorization": f"Bearer {access_token}"}
-        )
-    
-    user_data = user_response.json()
-
-    # Store user in MongoDB
-    existing_user = await users_collection.find_one({"email": user_data["email"]})
-    if not existing_user:
-        await users_collection.insert_one(user_data)
+    # The id_token carries the profile; verifying it locally saves the userinfo round trip
+    id_token = token_data.get("id_token")
+    if id_token:
+        try:
+            user_data = profile_from_claims(await verify_id_token(id_token))
+        except jwt.InvalidTokenError as e:
+            raise HTTPException(status_code=401, detail=f"Invalid id_token: {e}")
+    else:
+        user_data = await fetch_userinfo(access_token)
+
+    # Store user in MongoDB; a single upsert on the unique email index
+    await users_collection.update_one(
+        {"email": user_data["email"]},
+        {"$setOnInsert": dict(user_data)},
+        upsert=True
+    )
 
-    # Set session cookie
-    response = JSONResponse(content={"user": user_data})
-    response.set_cookie(key="access_token", value=access_token, httponly=True)
+    # Set session cookie; it holds our own session token, not Google's access token
+    session_token = await create_session(user_data["email"])
+    token = create_access_token(
+        data={"email": user_data["email"], "first_name": user_data.get("given_name"), "last_name": user_data.get("family_name")},
+        expires_delta=timedelta(hours=1)
+    )
+    response = JSONResponse(content={"user": user_data, "token": token})
+    response.set_cookie(
+        key="access_token",
+        value=session_token,
+        httponly=True,
+        samesite="lax",
+        max_age=SESSION_EXPIRE_MINUTES * 60
+    )
     return response
 
 @router.get("/auth/user")
 async def get_user(request: Request):
     """ Returns user data if authenticated """
-    access_token = request.cookies.get("access_token")
-    if not access_token:
+    session_token = request.cookies.get("access_token")
+    if not session_token:
         raise HTTPException(status_code=401, detail="Unauthorized")
     
-    user = await users_collection.find_one({"access_token": access_token})
+    user = await get_session_user(session_token)
     if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+        raise HTTPException(status_code=401, detail="Session expired")
 
     return JSONResponse(content={"user": user})
 
 @router.get("/auth/logout")
-async def logout():
+async def logout(request: Request):
     """ Logs out the user """
+    session_token = request.cookies.get("access_token")
+    if session_token:
+        await delete_session(session_token)
+
     response = JSONResponse(content={"message": "Logged out"})
     response.delete_cookie("access_token")
     return response
 
-@router.post("/auth/signup")
+@router.post("/auth/signup", dependencies=SIGN_IN)
 async def signup(user: UserSignup):
     """ Signup with First Name, Last Name, Email & Password """
     existing_user = await users_collection.find_one({"email": user.email})
     if existing_user:
         raise HTTPException(status_code=400, detail="User already exists")
 
-    hashed_password = pwd_context.hash(user.password)
-    await users_collection.insert_one({
-        "first_name": user.first_name,
-        "last_name": user.last_name,
-        "email": user.email,
-        "password": hashed_password
-    })
+    hashed_password = await hash_password(user.password)
+    try:
+        await users_collection.insert_one({
+            "first_name": user.first_name,
+            "last_name": user.last_name,
+            "email": user.email,
+            "password": hashed_password
+        })
+    except DuplicateKeyError:
+        # Lost a race with a concurrent signup for the same email
+        raise HTTPException(status_code=400, detail="User already exists")
 
     return {"message": "Signup successful"}
 
-@router.post("/auth/login")
+@router.post("/auth/login", dependencies=SIGN_IN)
 async def login(user: UserLogin):
     """ Login with Email & Password """
     db_user = await users_collection.find_one({"email": user.email})
     
-    if not db_user or not pwd_context.verify(user.password, db_user["password"]):
+    # Google accounts have no password to check against
+    if not db_user or not db_user.get("password"):
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+
+    valid, new_hash = await verify_password(user.password, db_user["password"])
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
+    if new_hash:
+        # Stored hash used a different bcrypt cost; replace it while we have the password
+        await users_collection.update_one({"_id": db_user["_id"]}, {"$set": {"password": new_hash}})
+
     token = create_access_token(
         data={"email": db_user["email"], "first_name": db_user["first_name"], "last_name": db_user["last_name"]},
         expires_delta=timedelta(hours=1)
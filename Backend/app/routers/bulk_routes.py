@@ -0,0 +1,113 @@
+import uuid
+from fastapi import APIRouter, Depends, HTTPException, Path, Request, status
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
+from app.auth import require_user
+from app.rate_limit import rate_limit, enforce_limit
+from app.config import BULK_MAX_ITEMS
+from app.jobs import PRIORITY_BULK, FINISHED, enqueue, get_job, requeue
+from app.services.bulk_service import expand_spec, create_run, reset_failed, run_progress, run_bulk, stream_bundle
+
+router = APIRouter()
+
+RUN_ID = Path(..., pattern="^[0-9a-f]{32}$")
+
+# Request schema
+class BulkGenerationRequest(BaseModel):
+    subject: Literal["Maths", "Science"]
+    grade: str = Field(..., description="Grade as in the dropdowns, e.g. \"4\", \"Algebra I\" or \"K\"")
+    strand: Optional[str] = Field(None, description="Maths strand to restrict to, e.g. \"Number and Number Sense\"; the whole grade when omitted")
+    exec_skill_profiles: List[List[str]] = Field(..., description="Executive-skill sets to generate every lesson for, e.g. [[\"Enhancing Working Memory\"], []]")
+    artifacts: List[Literal["lesson_plan", "assessment"]] = ["lesson_plan", "assessment"]
+
+# Worker job parameters
+class BulkJob(BaseModel):
+    run_id: str
+
+
+async def bulk_job_response(job: BulkJob):
+    """ Worker handler for a bulk run's job """
+    return await run_bulk(job.run_id)
+
+
+@router.post("", status_code=status.HTTP_202_ACCEPTED, dependencies=[Depends(rate_limit("generation"))])
+async def create_bulk_run(http_request: Request, request: BulkGenerationRequest, user: dict = Depends(require_user)):
+    """
+    Generate lesson plans and/or assessments for every lesson of a grade
+    (or one Maths strand) under each executive-skill profile
+
+    The run is queued for a worker behind interactive jobs; follow it at
+    status_url and download the results from bundle_url once it is done.
+    Every item counts against the user's bulk quota
+    (RATE_LIMIT_BULK_ITEMS_USER); a run that doesn't fit gets a 429.
+    """
+    if not request.exec_skill_profiles or not request.artifacts:
+        raise HTTPException(status_code=400, detail="At least one executive-skill profile and one artifact are required")
+    try:
+        items = expand_spec(request.subject, request.grade, request.strand,
+                            request.exec_skill_profiles, list(dict.fromkeys(request.artifacts)))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if len(items) > BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"The run has {len(items)} items; at most {BULK_MAX_ITEMS} are allowed at once"
+        )
+    await enforce_limit(http_request, "bulk", user["email"], cost=len(items))
+
+    run_id = uuid.uuid4().hex
+    await create_run(run_id, items)
+    await enqueue("bulk", {"run_id": run_id}, user["email"], PRIORITY_BULK, job_id=run_id)
+    return JSONResponse(
+        {
+            "run_id": run_id,
+            "items": len(items),
+            "status_url": f"/bulk/{run_id}",
+            "bundle_url": f"/bulk/{run_id}/bundle",
+        },
+        status_code=status.HTTP_202_ACCEPTED,
+        headers={"Location": f"/bulk/{run_id}"},
+    )
+
+
+@router.get("/{run_id}")
+async def get_bulk_run(run_id: str = RUN_ID, user: dict = Depends(require_user)):
+    """
+    A run's status ("queued", "running", "done" or "failed") and item counts
+    """
+    job = await get_job(run_id, user["email"])
+    return {"run_id": run_id, "status": job["status"], "error": job.get("error"), **await run_progress(run_id)}
+
+
+@router.post("/{run_id}/resume", status_code=status.HTTP_202_ACCEPTED)
+async def resume_bulk_run(http_request: Request, run_id: str = RUN_ID, user: dict = Depends(require_user)):
+    """
+    Queue a finished run again to retry its failed items; items already
+    generated are kept. The retried items count against the bulk quota.
+    """
+    job = await get_job(run_id, user["email"])
+    if job["status"] not in FINISHED:
+        raise HTTPException(status_code=409, detail=f"The run is still {job['status']}")
+    failed = (await run_progress(run_id))["failed"]
+    if failed:
+        await enforce_limit(http_request, "bulk", user["email"], cost=failed)
+    await reset_failed(run_id)
+    await requeue(run_id, user["email"])
+    return {"run_id": run_id, "status": "queued", **await run_progress(run_id)}
+
+
+@router.get("/{run_id}/bundle")
+async def download_bulk_bundle(run_id: str = RUN_ID, user: dict = Depends(require_user)):
+    """
+    ZIP of the run's generated Markdown, one folder per artifact, grade and
+    topic, with manifest.json listing every item and its status
+    """
+    job = await get_job(run_id, user["email"])
+    if job["status"] not in FINISHED:
+        raise HTTPException(status_code=409, detail=f"The run is still {job['status']}")
+    return StreamingResponse(
+        stream_bundle(run_id),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="DiverseMind_Bulk_{run_id[:8]}.zip"'},
+    )
@@ -1,10 +1,16 @@
-from fastapi import HTTPException, status, APIRouter
+from fastapi import HTTPException, status, APIRouter, Depends, Query, Request
 from typing import Optional, List, Dict, Any
 from pydantic import BaseModel, Field
 from app.services.ice_breaker_service import generate_icebreaker
+from app.logs import fields
+from app.auth import require_user
+from app.jobs import submit_job
+from app.cancellation import Cancelled, run_cancellable
+import logging
 
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 # Request schema
 class IceBreakerRequest(BaseModel):
@@ -17,10 +23,31 @@ class IceBreakerRequest(BaseModel):
 class IceBreakerResponse(BaseModel):
     activity: str
 
-@router.post("", response_model=IceBreakerResponse, status_code=status.HTTP_200_OK)
-async def get_icebreaker_activity(request: IceBreakerRequest):
+@router.post("", response_model=IceBreakerResponse, status_code=status.HTTP_200_OK,
+             responses={202: {"description": "Queued as a job (mode=job); poll /jobs/{job_id}"}})
+async def get_icebreaker_activity(
+    http_request: Request,
+    request: IceBreakerRequest,
+    mode: Optional[str] = Query(None, pattern="^(sync|job)$", description="job: queue the request and return 202 with a job id"),
+    user: dict = Depends(require_user),
+):
     """
     Generate a lesson plan using the RAG pipeline based on the specified exec_skills, topic, grade level, and additional requirements.
+
+    With mode=job the request is queued for a worker and answered with 202
+    and a job id at once. Otherwise generation stops if the client
+    disconnects.
+    """
+    if mode == "job":
+        return await submit_job("icebreaker", request, user)
+    return await run_cancellable(http_request, "icebreaker", icebreaker_response, request)
+
+
+def icebreaker_response(request: IceBreakerRequest):
+    """
+    Run the icebreaker pipeline and shape its output for the frontend
+
+    Shared by the route and the job worker.
     """
     try:
         # question = "I want a team building activity for a stem group project"
@@ -33,7 +60,8 @@ async def get_icebreaker_activity(request: IceBreakerRequest):
         exec_skills=request.exec_skills
         setting=request.setting
 
-        print(question,materials_filter,exec_skills,setting)
+        logger.info("Icebreaker request", extra=fields(
+            activity=question, materials=materials_filter, exec_skills=exec_skills, setting=setting))
 
         rag_text = generate_icebreaker(
             materials=materials_filter,
@@ -57,7 +85,7 @@ async def get_icebreaker_activity(request: IceBreakerRequest):
         }
         return response
 
-    except HTTPException:
+    except (HTTPException, Cancelled):
         raise
     except Exception as e:
         raise HTTPException(
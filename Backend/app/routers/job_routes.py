@@ -0,0 +1,21 @@
+from fastapi import APIRouter, Depends, Path, Query
+from app.auth import require_user
+from app.jobs import get_job
+
+router = APIRouter()
+
+
+@router.get("/{job_id}")
+async def get_job_status(
+    job_id: str = Path(..., pattern="^[0-9a-f]{32}$"),
+    wait: float = Query(0, ge=0, description="Seconds to wait for the job to finish (long-poll)"),
+    user: dict = Depends(require_user),
+):
+    """
+    Status of a generation job queued with ?mode=job
+
+    Returns "queued" or "running" until the job is finished, then "done"
+    with the same body the synchronous route returns under "result", or
+    "failed" with the error's status_code and detail under "error".
+    """
+    return await get_job(job_id, user["email"], wait)
@@ -1,12 +1,18 @@
-from fastapi import HTTPException, status, APIRouter
+from fastapi import HTTPException, status, APIRouter, Depends, Header, Query, Request
 from typing import Optional, List, Dict, Any
 from pydantic import BaseModel, Field
-from chromadb.config import Settings
-from chromadb import PersistentClient
 from app.services.lesson_plan_service import generate_adaptive_lesson_plan
+from app.logs import fields
+from app.auth import require_user
+from app.jobs import submit_job
+from app.services.generation_cache import cached_generation, cache_reuse
+from app.services.prefetch_service import use_prefetched
+from app.cancellation import Cancelled
+import logging
 
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 # Request schema
 class LessonPlanRequest(BaseModel):
@@ -25,10 +31,40 @@ class LessonPlanResponse(BaseModel):
     concept: str
     lessonPlan: str
 
-@router.post("", response_model=LessonPlanResponse, status_code=status.HTTP_200_OK)
-async def get_lesson_plan(request: LessonPlanRequest):
+@router.post("", response_model=LessonPlanResponse, status_code=status.HTTP_200_OK,
+             responses={202: {"description": "Queued as a job (mode=job); poll /jobs/{job_id}"}})
+async def get_lesson_plan(
+    http_request: Request,
+    request: LessonPlanRequest,
+    mode: Optional[str] = Query(None, pattern="^(sync|job)$", description="job: queue the request and return 202 with a job id"),
+    user: dict = Depends(require_user),
+    cache_control: Optional[str] = Header(None),
+    x_prefetch_session: Optional[str] = Header(None),
+):
     """
     Generate a lesson plan using the RAG pipeline based on the specified disorder, topic, grade level, and additional requirements.
+
+    With mode=job the request is queued for a worker and answered with 202
+    and a job id at once. Otherwise a pre-warmed response for the same
+    parameters is returned when there is one, else a new response is
+    generated (and stored in the shared cache); send Cache-Control:
+    no-cache to always generate, or max-stale to also accept a response
+    generated for an earlier request. Retrieval started for the same form by
+    /prefetch (same X-Prefetch-Session) is reused. Generation stops if the
+    client (and any identical request sharing it) disconnects.
+    """
+    if mode == "job":
+        return await submit_job("lesson_plan", request, user)
+    await use_prefetched(user, x_prefetch_session, "lesson_plan", request)
+    return await cached_generation("lesson_plan", request, lesson_plan_response, reuse=cache_reuse(cache_control),
+                                   http_request=http_request)
+
+
+def lesson_plan_response(request: LessonPlanRequest):
+    """
+    Run the lesson plan pipeline and shape its output for the frontend
+
+    Shared by the route and the job worker.
     """
     try:
         # subject = 'Measurement and Geometry'
@@ -44,7 +80,8 @@ async def get_lesson_plan(request: LessonPlanRequest):
         grade = request.grade
         exec_skills = request.exec_skills
         
-        print("From request param", subject, topic, subtopic, grade, exec_skills)
+        logger.info("Lesson plan request", extra=fields(
+            subject=subject, topic=topic, subtopic=subtopic, grade=grade, exec_skills=exec_skills))
 
         # Call the RAG pipeline
         rag_text = generate_adaptive_lesson_plan(
@@ -78,7 +115,7 @@ async def get_lesson_plan(request: LessonPlanRequest):
 
         return response
 
-    except HTTPException:
+    except (HTTPException, Cancelled):
         raise
     except Exception as e:
         raise HTTPException(
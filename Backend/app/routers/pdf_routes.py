@@ -1,11 +1,20 @@
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import StreamingResponse
-from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
-from io import BytesIO
+import asyncio
+from urllib.parse import quote
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel, Field
+from typing import List, Optional, Dict, Any, Literal
+import random
 from app.services.pdf_lesson_service import generate_lesson_pdf
 from app.services.pdf_quiz_service import generate_quiz_pdf
 from app.services.pdf_icebreaker_service import generate_icebreaker_pdf
+from app.services.pdf_packet_service import generate_packet_pdf
+from app.services.pdf_quiz_versions_service import generate_quiz_versions
+from app.services.pdf_fonts import available_fonts
+from app.services.pdf_cache import cache_key, etag_for, etag_matches
+from app.services.pdf_export_service import stream_pdf_zip, render_pdf, safe_filename
+from app.deadline import DeadlineExceeded, stage_budget
+from app.config import PDF_RENDER_PROCESSES, PDF_EXPORT_MAX_DOCUMENTS
 
 router = APIRouter()
 
@@ -30,12 +39,15 @@ class LessonPlanModel(BaseModel):
 class LessonPlanPDF(BaseModel):
     exec_skills: List[str]
     lessonPlan: LessonPlanModel
+    font: Optional[str] = None  # Font family, see /pdf/fonts
 
 class QuestionModel(BaseModel):
     text: str
     options: Optional[List[str]] = None
     answer: Optional[str] = None
     explanation: Optional[str] = None
+    type: Optional[str] = None  # e.g. "Multiple Choice", shown after the question number
+    strategy: Optional[str] = None  # Executive function strategy for the question
 
 class AssessmentModel(BaseModel):
     title: Optional[str] = None
@@ -49,6 +61,14 @@ class AssessmentModel(BaseModel):
 class AssessmentPDF(BaseModel):
     exec_skills: List[str]
     assessment: AssessmentModel
+    font: Optional[str] = None  # Font family, see /pdf/fonts
+
+class QuizVersionsPDF(AssessmentPDF):
+    versions: int = Field(2, ge=1, le=26)
+    seed: Optional[int] = None  # Random when omitted; printed on the answer key
+    shuffleQuestions: bool = True
+    shuffleOptions: bool = True
+    format: Literal["pdf", "zip"] = "pdf"
 
 class IcebreakerModel(BaseModel):
     title: Optional[str] = None
@@ -67,63 +87,167 @@ class IcebreakerPDF(BaseModel):
     materials: Optional[str] = None
     exec_skills: List[str] = []
     icebreaker: IcebreakerModel
+    font: Optional[str] = None  # Font family, see /pdf/fonts
 
-@router.post("/generate-lesson-pdf")
-async def generate_lesson_pdf_endpoint(lesson_plan_data: LessonPlanPDF):
-    # Generate the PDF using the service function
-    pdf = generate_lesson_pdf(lesson_plan_data)
-    
-    # Create a response with the PDF - include grade level in filename
-    filename = f"Grade{lesson_plan_data.lessonPlan.grade or ''}_{lesson_plan_data.lessonPlan.title or 'Lesson_Plan'}.pdf"
-    filename = filename.replace(' ', '_')
-    
+class UnitPacketPDF(BaseModel):
+    title: Optional[str] = None
+    lesson: Optional[LessonPlanPDF] = None
+    assessment: Optional[AssessmentPDF] = None
+    icebreaker: Optional[IcebreakerPDF] = None
+    font: Optional[str] = None
+
+class BulkExportPDF(BaseModel):
+    lessonPlans: List[LessonPlanPDF] = []
+    assessments: List[AssessmentPDF] = []
+    icebreakers: List[IcebreakerPDF] = []
+
+async def pdf_response(request: Request, kind: str, data: BaseModel, render, filename: str,
+                       media_type: str = "application/pdf"):
+    """
+    Serve a PDF from the content-addressed cache, rendering it only on a miss.
+
+    A request whose If-None-Match matches the document's ETag gets a 304
+    without the PDF being looked up or rendered. Rendering happens in the
+    render pool and is abandoned (504) when the request's deadline passes.
+    """
+    key = cache_key(kind, data)
+    etag = etag_for(key)
     headers = {
-        'Content-Disposition': f'attachment; filename="{filename}"'
+        'ETag': etag,
+        'Cache-Control': 'private, no-cache'
     }
-    
-    return StreamingResponse(
-        BytesIO(pdf), 
-        media_type="application/pdf",
-        headers=headers
-    )
 
-@router.post("/generate-quiz-pdf")
-async def generate_quiz_pdf_endpoint(assessment_data: AssessmentPDF):
-    # Generate the PDF using the service function
-    pdf = generate_quiz_pdf(assessment_data)
-    
-    # Create a response with the PDF
+    if etag_matches(request.headers.get('if-none-match'), etag):
+        return Response(status_code=304, headers=headers)
+
+    budget = stage_budget("pdf_render")
+    try:
+        pdf = await asyncio.wait_for(render_pdf(kind, data, render, key), budget)
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded("pdf_render")
+
+    headers['Content-Disposition'] = content_disposition(filename)
+    return Response(content=pdf, media_type=media_type, headers=headers)
+
+def content_disposition(filename: str):
+    """
+    Attachment header for a file name built from user-supplied titles
+
+    The name is sanitized, with an ASCII fallback in filename and the full
+    name in filename* (RFC 6266) so titles outside Latin-1 still work.
+    """
+    filename = safe_filename(filename)
+    fallback = filename.encode('ascii', 'ignore').decode().strip() or 'download'
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename)}"
+
+def lesson_pdf_filename(lesson_plan_data: LessonPlanPDF):
+    # Include grade level in filename
+    filename = f"Grade{lesson_plan_data.lessonPlan.grade or ''}_{lesson_plan_data.lessonPlan.title or 'Lesson_Plan'}.pdf"
+    return safe_filename(filename).replace(' ', '_')
+
+def quiz_pdf_filename(assessment_data: AssessmentPDF):
     subject = assessment_data.assessment.subject or ''
     topic = assessment_data.assessment.topic or ''
     filename = f"{subject}_{topic}_Assessment.pdf"
-    filename = filename.replace(' ', '_')
-    
-    headers = {
-        'Content-Disposition': f'attachment; filename="{filename}"'
-    }
-    
-    return StreamingResponse(
-        BytesIO(pdf), 
-        media_type="application/pdf",
-        headers=headers
-    )
+    return safe_filename(filename).replace(' ', '_')
 
-@router.post("/generate-icebreaker-pdf")
-async def generate_icebreaker_pdf_endpoint(icebreaker_data: IcebreakerPDF):
-    # Generate the PDF using the service function
-    pdf = generate_icebreaker_pdf(icebreaker_data)
-    
-    # Create a response with the PDF
+def icebreaker_pdf_filename(icebreaker_data: IcebreakerPDF):
     title = icebreaker_data.icebreaker.title or 'Icebreaker_Activity'
     filename = f"{title}.pdf"
-    filename = filename.replace(' ', '_')
-    
+    return safe_filename(filename).replace(' ', '_')
+
+@router.get("/fonts")
+async def list_fonts_endpoint():
+    """ Font families that can be passed as `font` in PDF requests """
+    return {"fonts": available_fonts()}
+
+@router.post("/generate-lesson-pdf")
+async def generate_lesson_pdf_endpoint(lesson_plan_data: LessonPlanPDF, request: Request):
+    return await pdf_response(
+        request,
+        "lesson",
+        lesson_plan_data,
+        generate_lesson_pdf,
+        lesson_pdf_filename(lesson_plan_data)
+    )
+
+@router.post("/generate-quiz-pdf")
+async def generate_quiz_pdf_endpoint(assessment_data: AssessmentPDF, request: Request):
+    return await pdf_response(
+        request,
+        "quiz",
+        assessment_data,
+        generate_quiz_pdf,
+        quiz_pdf_filename(assessment_data)
+    )
+
+@router.post("/generate-quiz-versions")
+async def generate_quiz_versions_endpoint(versions_data: QuizVersionsPDF, request: Request):
+    """
+    Shuffled versions of an assessment plus an answer key, as one PDF or a ZIP
+    """
+    if versions_data.seed is None:
+        # Fix the seed before the cache key is taken so the key describes the output
+        versions_data = versions_data.model_copy(update={'seed': random.randrange(2 ** 31)})
+
+    name = quiz_pdf_filename(versions_data)[:-len('.pdf')] + '_Versions'
+    if versions_data.format == "zip":
+        return await pdf_response(request, "quiz_versions", versions_data, generate_quiz_versions,
+                            f"{name}.zip", media_type="application/zip")
+    return await pdf_response(request, "quiz_versions", versions_data, generate_quiz_versions, f"{name}.pdf")
+
+@router.post("/generate-icebreaker-pdf")
+async def generate_icebreaker_pdf_endpoint(icebreaker_data: IcebreakerPDF, request: Request):
+    return await pdf_response(
+        request,
+        "icebreaker",
+        icebreaker_data,
+        generate_icebreaker_pdf,
+        icebreaker_pdf_filename(icebreaker_data)
+    )
+
+@router.post("/generate-packet-pdf")
+async def generate_packet_pdf_endpoint(packet_data: UnitPacketPDF, request: Request):
+    if not (packet_data.lesson or packet_data.assessment or packet_data.icebreaker):
+        raise HTTPException(status_code=400, detail="A packet needs at least one document")
+
+    title = packet_data.title or (packet_data.lesson and packet_data.lesson.lessonPlan.title) or 'Unit_Packet'
+    filename = safe_filename(f"{title}_Packet.pdf").replace(' ', '_')
+
+    return await pdf_response(
+        request,
+        "packet",
+        packet_data,
+        generate_packet_pdf,
+        filename
+    )
+
+@router.post("/export-zip")
+async def export_zip_endpoint(export_data: BulkExportPDF):
+    """
+    Render many lesson plans, assessments and icebreakers and stream them back
+    as a single ZIP archive, adding each PDF as soon as it is rendered.
+    """
+    jobs = (
+        [("lesson", data, generate_lesson_pdf, lesson_pdf_filename(data)) for data in export_data.lessonPlans]
+        + [("quiz", data, generate_quiz_pdf, quiz_pdf_filename(data)) for data in export_data.assessments]
+        + [("icebreaker", data, generate_icebreaker_pdf, icebreaker_pdf_filename(data)) for data in export_data.icebreakers]
+    )
+
+    if not jobs:
+        raise HTTPException(status_code=400, detail="Nothing to export")
+    if len(jobs) > PDF_EXPORT_MAX_DOCUMENTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {PDF_EXPORT_MAX_DOCUMENTS} documents can be exported at once"
+        )
+
     headers = {
-        'Content-Disposition': f'attachment; filename="{filename}"'
+        'Content-Disposition': 'attachment; filename="DiverseMind_Export.zip"'
     }
-    
+
     return StreamingResponse(
-        BytesIO(pdf), 
-        media_type="application/pdf",
+        stream_pdf_zip(jobs, PDF_RENDER_PROCESSES),
+        media_type="application/zip",
         headers=headers
     )
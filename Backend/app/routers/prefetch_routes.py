@@ -0,0 +1,59 @@
+from fastapi import APIRouter, Depends, Header, status
+from typing import Optional
+from app.auth import require_user
+from app.metrics import StageTimer
+from app.routers.lesson_plan_routes import LessonPlanRequest
+from app.routers.assessment_router import AssessmentRequest
+from app.services import lesson_plan_service, assesment_service
+from app.services.prefetch_service import prefetch_slots, session_key, lesson_of
+
+router = APIRouter()
+
+PREFETCH_SESSION = Header(None, max_length=64, description="Id of the form session; send the same one with the submit")
+
+
+def _retrieve_lesson_plan(request):
+    timer = StageTimer("lesson_plan_prefetch")
+    lesson_plan_service.retrieve_context(request.subject, request.grade, request.topic, request.subtopic, request.exec_skills, timer)
+    timer.finish()
+
+
+def _retrieve_assessment(request):
+    timer = StageTimer("assessment_prefetch")
+    assesment_service.retrieve_context(request.grade, request.subject, request.topic, request.subtopic, request.exec_skills, timer)
+    timer.finish()
+
+
+@router.post("/lesson-plan", status_code=status.HTTP_202_ACCEPTED)
+async def prefetch_lesson_plan(
+    request: LessonPlanRequest,
+    user: dict = Depends(require_user),
+    x_prefetch_session: Optional[str] = PREFETCH_SESSION,
+):
+    """
+    Start retrieval for a lesson plan form that is still being filled in
+
+    Returns at once. A POST /lesson-plan for the same lesson with the same
+    X-Prefetch-Session within PREFETCH_TTL_SECONDS reuses the results;
+    executive skills can still change before then.
+    """
+    reused = prefetch_slots.start(session_key(user, x_prefetch_session), "lesson_plan", lesson_of(request),
+                                  lambda: _retrieve_lesson_plan(request))
+    return {"status": "started", "reused": reused}
+
+
+@router.post("/assessment", status_code=status.HTTP_202_ACCEPTED)
+async def prefetch_assessment(
+    request: AssessmentRequest,
+    user: dict = Depends(require_user),
+    x_prefetch_session: Optional[str] = PREFETCH_SESSION,
+):
+    """
+    Start retrieval for a quiz form that is still being filled in
+
+    Returns at once. A POST /assessment for the same lesson with the same
+    X-Prefetch-Session within PREFETCH_TTL_SECONDS reuses the results.
+    """
+    reused = prefetch_slots.start(session_key(user, x_prefetch_session), "assessment", lesson_of(request),
+                                  lambda: _retrieve_assessment(request))
+    return {"status": "started", "reused": reused}
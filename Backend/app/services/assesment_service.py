@@ -1,20 +1,18 @@
 import os
-import chromadb
-from sentence_transformers import SentenceTransformer
-from openai import OpenAI
 from dotenv import load_dotenv
-from chromadb import PersistentClient
+from .chroma_clients import get_chroma_client, bounded
+from .retrieval_cache import encode_queries, shared_collection
+from .llm import chat_completion
+from app.metrics import StageTimer
+from app.logs import log_payloads
+from app.cancellation import raise_if_cancelled
+from app.deadline import DeadlineExceeded, check_deadline, degraded
 load_dotenv()
+import logging
 import sys
 from . import prompts
 
-openai = OpenAI(
-    api_key=os.getenv('OPENAI_API_KEY')
-)
-
-client = PersistentClient(
-    path="./app/chroma_store"
-)
+logger = logging.getLogger(__name__)
 
 # Get or create collections
 def get_context(client, subject):
@@ -25,7 +23,7 @@ def get_context(client, subject):
     try:
         lesson_collection = client.get_collection(map_subject[subject])
     except Exception as e:
-        print(f"Error getting lesson_plans collection: {e}")
+        logger.warning(f"Error getting lesson_plans collection: {e}")
         # Create the collection
         lesson_collection = client.create_collection(
             name=map_subject[subject],
@@ -39,7 +37,7 @@ def get_context(client, subject):
     try:
         exec_collection = client.get_collection("exec_skills")
     except Exception as e:
-        print(f"Error getting exec_skills collection: {e}")
+        logger.warning(f"Error getting exec_skills collection: {e}")
         # Create the collection
         exec_collection = client.create_collection(
             name="exec_skills",
@@ -49,16 +47,43 @@ def get_context(client, subject):
 
     return lesson_collection, exec_collection
     
-# FUNCTION: Generate the augmented lesson plan
-def generate_assesment(grade, subject, topic, subtopic, exec_skills):
-    client = PersistentClient(
-    path="./app/chroma_store"
-)
+def retrieve_context(grade, subject, topic, subtopic, exec_skills, timer):
+    """
+    Retrieve the lesson content, its original assessment and the
+    executive-skill strategies for an assessment
+
+    Also run ahead of the request by the prefetch route, under a retrieval
+    cache the request then reuses.
+
+    Returns:
+        tuple: (lesson_context, lesson_assessment, exec_context)
+    """
+    client = get_chroma_client()
     lesson_collection, exec_collection = get_context(client, subject)
+    # Items of a bulk run share query results; queries give up at the deadline
+    lesson_collection, exec_collection = shared_collection(bounded(lesson_collection)), shared_collection(bounded(exec_collection))
+    timer.lap("retrieval")
+    # Embed every query of this request in one call, so the embedding
+    # server can batch them together
+    if subject == "Maths":
+        queries = [
+            f"Assesment in {subject} for {subtopic} for grade {grade}",
+            f"assessment for {subtopic} in {subject} for grade {grade}",
+        ]
+    elif subject == "Science":
+        queries = [
+            f"Assesment in {subject} for {topic} for {grade}",
+            f"assessment for {topic} in {subject} for {grade}",
+        ]
+    skill_queries = [f"Strategies for {skill}" for skill in exec_skills]
+    lesson_embedding, assessment_embedding, *skill_embeddings = encode_queries(queries + skill_queries)
+    timer.lap("embedding")
+    raise_if_cancelled("assessment", "retrieval")
+
     # Get lesson chunks
     if subject == "Maths":
         lesson_results = lesson_collection.query(
-        query_texts=[f"Assesment in {subject} for {subtopic} for grade {grade}"],  # semantic hint
+        query_embeddings=[lesson_embedding],  # semantic hint
         n_results=5,
         where={
             "$and": [
@@ -72,7 +97,7 @@ def generate_assesment(grade, subject, topic, subtopic, exec_skills):
         lesson_context = "\n\n".join(lesson_results["documents"][0])
 
         lesson_results_assessment = lesson_collection.query(
-        query_texts=[f"assessment for {subtopic} in {subject} for grade {grade}"],
+        query_embeddings=[assessment_embedding],
         n_results=5,
         where={
             "$and": [
@@ -85,10 +110,9 @@ def generate_assesment(grade, subject, topic, subtopic, exec_skills):
     )
 
         lesson_assessment = "\n\n".join(lesson_results_assessment["documents"][0]) if lesson_results_assessment["documents"] else "No assessment found."
-        print(f'lesson assesment:------------------------------------------------------------------->\n{lesson_assessment}')
     elif subject == "Science":
         lesson_results = lesson_collection.query(
-        query_texts=[f"Assesment in {subject} for {topic} for {grade}"],  # semantic hint
+        query_embeddings=[lesson_embedding],  # semantic hint
         n_results=5,
         where={
             "$and": [
@@ -102,7 +126,7 @@ def generate_assesment(grade, subject, topic, subtopic, exec_skills):
         lesson_context = "\n\n".join(lesson_results["documents"][0])
 
         lesson_results_assessment = lesson_collection.query(
-        query_texts=[f"assessment for {topic} in {subject} for {grade}"],
+        query_embeddings=[assessment_embedding],
         n_results=5,
         where={
             "$and": [
@@ -116,27 +140,41 @@ def generate_assesment(grade, subject, topic, subtopic, exec_skills):
         lesson_assessment = "\n\n".join(lesson_results_assessment["documents"][0]) if lesson_results_assessment["documents"] else "No assessment found."
 
     
-    print(f'lesson context:------------------------------------------------------------------->\n{lesson_context}')
-    print(f'lesson assesment:------------------------------------------------------------------->\n{lesson_assessment}')
     # Get exec strategy chunks
     exec_contexts = []
-    for skill in exec_skills:
-        results = exec_collection.query(
-            query_texts=[f"Strategies for {skill}"],
-            n_results=2,
-            where={"executive_skill": skill},
-            include=["documents"]
-        )
+    for index, (skill, skill_embedding) in enumerate(zip(exec_skills, skill_embeddings)):
+        try:
+            results = exec_collection.query(
+                query_embeddings=[skill_embedding],
+                n_results=2,
+                where={"executive_skill": skill},
+                include=["documents"]
+            )
+        except DeadlineExceeded:
+            # Out of retrieval time: go on with the strategies found so far
+            degraded("retrieval", skipped_skills=exec_skills[index:])
+            break
         exec_contexts.extend(results["documents"][0])
     exec_context = "\n\n".join(exec_contexts)
+    timer.lap("retrieval")
+    return lesson_context, lesson_assessment, exec_context
+
+
+# FUNCTION: Generate the augmented lesson plan
+def generate_assesment(grade, subject, topic, subtopic, exec_skills):
+    timer = StageTimer("assessment")
+    lesson_context, lesson_assessment, exec_context = retrieve_context(grade, subject, topic, subtopic, exec_skills, timer)
 
     #print(f'exec_context:{exec_context}')
 
     # Prompt template
     prompt = prompts.get_prompt_quiz(subject, lesson_context, lesson_assessment, exec_context, exec_skills)
+    timer.lap("context_packing")
+    check_deadline("context_packing")
 
     # LLM call to OpenRouter
-    response = openai.chat.completions.create(
+    llm_output = chat_completion(
+        "assessment",
         model="gpt-4o",   # <- GPT-4o model name
         messages=[
             {"role": "system", "content": "You are a supportive and creative educational assistant."},
@@ -145,8 +183,11 @@ def generate_assesment(grade, subject, topic, subtopic, exec_skills):
         temperature=0.7,
         max_tokens=2000
     )
-    llm_output = response.choices[0].message.content
+    timer.finish()
 
-    # print("\n===== LLM OUTPUT =====\n")
-    # print(llm_output)
-    return response.choices[0].message.content
\ No newline at end of file
+    log_payloads(
+        logger, "Assessment generated",
+        lesson_context=lesson_context, lesson_assessment=lesson_assessment,
+        exec_context=exec_context, prompt=prompt, llm_output=llm_output,
+    )
+    return llm_output
\ No newline at end of file
@@ -0,0 +1,240 @@
+"""
+Bulk curriculum generation.
+
+A bulk run expands a (subject, grade or strand, executive-skill profiles,
+artifacts) spec into one item per lesson, profile and artifact, stored in
+the bulk_items collection. A single job worker runs the whole set:
+
+- items share retrieval (query embeddings and Chroma results) through one
+  RetrievalCache, so a topic is retrieved once for all of its profiles;
+- generation runs under an adaptive concurrency cap, halved while the LLM
+  provider answers 429 and raised again as items succeed;
+- every finished item is written back at once, so a run picked up again
+  after a crash (the job's lease ran out) only generates what is missing.
+
+The bundle is a ZIP of the generated Markdown plus a manifest, streamed
+from the stored items.
+"""
+import asyncio
+import json
+import logging
+import zipfile
+from datetime import datetime, timedelta
+from app.database import bulk_items_collection
+from app.config import BULK_CONCURRENCY, BULK_ITEM_ATTEMPTS, BULK_RETENTION_SECONDS
+from app.logs import fields
+from .curriculum import expand_curriculum
+from .retrieval_cache import RetrievalCache, use_retrieval_cache
+from .lesson_plan_service import generate_adaptive_lesson_plan
+from .assesment_service import generate_assesment
+from .pdf_export_service import safe_filename, stream_zip
+
+logger = logging.getLogger(__name__)
+
+GENERATORS = {
+    "lesson_plan": generate_adaptive_lesson_plan,
+    "assessment": generate_assesment,
+}
+
+# Longest pause after the LLM provider rate limits an item
+MAX_THROTTLE_SECONDS = 30
+
+
+def expand_spec(subject, grade, strand, exec_skill_profiles, artifacts):
+    """
+    One item per lesson, executive-skill profile and artifact
+
+    Items of the same lesson are adjacent, so they run close together and
+    find its retrieval already cached.
+
+    Raises:
+        ValueError: For an unknown subject, grade or strand
+    """
+    return [
+        {"artifact": artifact, "subject": subject, **lesson, "exec_skills": list(profile)}
+        for lesson in expand_curriculum(subject, grade, strand)
+        for profile in exec_skill_profiles
+        for artifact in artifacts
+    ]
+
+
+async def create_run(run_id, items):
+    """ Store a run's items, all pending """
+    expires_at = datetime.utcnow() + timedelta(seconds=BULK_RETENTION_SECONDS)
+    await bulk_items_collection.insert_many([
+        {
+            "_id": f"{run_id}:{index:05d}",
+            "run_id": run_id,
+            "index": index,
+            **item,
+            "status": "pending",
+            "attempts": 0,
+            "expires_at": expires_at,
+        }
+        for index, item in enumerate(items)
+    ])
+
+
+async def reset_failed(run_id):
+    """ Make a run's failed items pending again, for a resumed run """
+    await bulk_items_collection.update_many(
+        {"run_id": run_id, "status": "failed"},
+        {"$set": {"status": "pending", "attempts": 0}, "$unset": {"error": ""}},
+    )
+
+
+async def run_progress(run_id):
+    """
+    Item counts of a run by status
+
+    Returns:
+        dict: total, pending, done and failed counts
+    """
+    counts = {"pending": 0, "done": 0, "failed": 0}
+    async for row in bulk_items_collection.aggregate([
+        {"$match": {"run_id": run_id}},
+        {"$group": {"_id": "$status", "count": {"$sum": 1}}},
+    ]):
+        counts[row["_id"]] = row["count"]
+    return {"total": sum(counts.values()), **counts}
+
+
+class AdaptiveLimit:
+    """
+    Concurrency cap for calls to a rate-limited provider
+
+    Starts at the maximum. A throttled call halves the cap; each cap's worth
+    of successful calls raises it by one, back up to the maximum (AIMD).
+    """
+
+    def __init__(self, maximum):
+        self.maximum = maximum
+        self.limit = maximum
+        self.in_flight = 0
+        self._successes = 0
+        self._changed = asyncio.Condition()
+
+    async def acquire(self):
+        async with self._changed:
+            await self._changed.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+
+    async def release(self, throttled=False):
+        async with self._changed:
+            self.in_flight -= 1
+            if throttled:
+                self.limit = max(1, self.limit // 2)
+                self._successes = 0
+            else:
+                self._successes += 1
+                if self._successes >= self.limit and self.limit < self.maximum:
+                    self.limit += 1
+                    self._successes = 0
+            self._changed.notify_all()
+
+
+async def _checkpoint(item, **values):
+    await bulk_items_collection.update_one({"_id": item["_id"]}, {"$set": values})
+
+
+async def run_bulk(run_id):
+    """
+    Generate a run's pending items
+
+    Returns:
+        dict: The run's final item counts
+    """
+    items = await bulk_items_collection.find({"run_id": run_id, "status": "pending"}).sort("index", 1).to_list(None)
+    logger.info("Bulk run started", extra=fields(run_id=run_id, pending=len(items)))
+    # Shared by every item's thread, which copies this context
+    use_retrieval_cache(RetrievalCache())
+    limit = AdaptiveLimit(BULK_CONCURRENCY)
+    queue = asyncio.Queue()
+    for item in items:
+        queue.put_nowait(item)
+    throttles = 0
+
+    async def run_items():
+        nonlocal throttles
+        while True:
+            item = await queue.get()
+            await limit.acquire()
+            throttled = False
+            try:
+                generate = GENERATORS[item["artifact"]]
+                text = await asyncio.to_thread(
+                    generate,
+                    subject=item["subject"], grade=item["grade"], topic=item["topic"],
+                    subtopic=item["subtopic"], exec_skills=item["exec_skills"],
+                )
+                if not text:
+                    raise ValueError("The model returned no text")
+            except Exception as e:
+                throttled = getattr(e, "status_code", None) == 429
+                if throttled:
+                    throttles += 1
+                    queue.put_nowait(item)
+                else:
+                    item["attempts"] += 1
+                    if item["attempts"] < BULK_ITEM_ATTEMPTS:
+                        await _checkpoint(item, attempts=item["attempts"])
+                        queue.put_nowait(item)
+                    else:
+                        await _checkpoint(item, status="failed", attempts=item["attempts"], error=str(e),
+                                          finished_at=datetime.utcnow())
+                        logger.warning("Bulk item failed", extra=fields(run_id=run_id, index=item["index"], error=str(e)))
+            else:
+                throttles = 0
+                await _checkpoint(item, status="done", result=text, finished_at=datetime.utcnow())
+            finally:
+                await limit.release(throttled)
+                queue.task_done()
+            if throttled:
+                await asyncio.sleep(min(2 ** throttles, MAX_THROTTLE_SECONDS))
+
+    slots = [asyncio.create_task(run_items()) for _ in range(max(1, BULK_CONCURRENCY))]
+    finished = asyncio.create_task(queue.join())
+    try:
+        done, _ = await asyncio.wait([finished, *slots], return_when=asyncio.FIRST_COMPLETED)
+        # A slot only ends by raising (e.g. checkpointing failed); fail the run,
+        # and resuming it picks up from the last checkpoint
+        for task in done:
+            task.result()
+    finally:
+        for task in [finished, *slots]:
+            task.cancel()
+
+    progress = await run_progress(run_id)
+    logger.info("Bulk run finished", extra=fields(run_id=run_id, **progress))
+    return progress
+
+
+def _bundle_path(item):
+    skills = " + ".join(item["exec_skills"]) or "No skills"
+    lesson = item["subtopic"] or item["topic"]
+    return (f"{item['artifact']}s/{safe_filename(item['grade'])}/{safe_filename(item['topic'])}/"
+            f"{item['index']:05d} {safe_filename(lesson)} - {safe_filename(skills)}.md")
+
+
+async def _bundle_entries(run_id):
+    manifest = []
+    async for item in bulk_items_collection.find({"run_id": run_id}).sort("index", 1):
+        entry = {key: item.get(key) for key in (
+            "index", "artifact", "subject", "grade", "topic", "subtopic", "exec_skills", "status", "error",
+        )}
+        if item["status"] == "done":
+            entry["file"] = _bundle_path(item)
+            yield entry["file"], item["result"].encode()
+        manifest.append(entry)
+    yield "manifest.json", json.dumps(manifest, indent=2).encode()
+
+
+def stream_bundle(run_id):
+    """
+    Stream a run's results as a ZIP: one Markdown file per generated item
+    and manifest.json listing every item with its status
+
+    Yields:
+        bytes: Successive chunks of the ZIP archive
+    """
+    return stream_zip(_bundle_entries(run_id), compression=zipfile.ZIP_DEFLATED)
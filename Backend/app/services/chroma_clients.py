@@ -0,0 +1,58 @@
+import os
+import threading
+from app.config import DEADLINE_LLM_RESERVE_SECONDS
+from app.deadline import call_within
+
+SERVICES_DIR = os.path.dirname(os.path.abspath(__file__))
+CHROMA_STORE_PATH = os.path.join(os.path.dirname(SERVICES_DIR), "chroma_store")
+ICEBREAKER_STORE_PATH = os.path.join(SERVICES_DIR, "icebreakers")
+
+_clients = {}
+# Opening the same store from two threads at once breaks Chroma's shared state
+_lock = threading.Lock()
+
+def get_chroma_client(path=CHROMA_STORE_PATH):
+    """
+    Chroma client for a store, opened on first use in each process
+
+    Clients hold SQLite connections and background threads, neither of
+    which survive a fork. Keying by pid means a preloaded master never
+    hands its client to a worker; each worker opens its own on first use
+    and then reuses it for every request.
+
+    Args:
+        path: Directory of the persistent Chroma store
+
+    Returns:
+        PersistentClient: The client for this process and store
+    """
+    key = (os.getpid(), path)
+    client = _clients.get(key)
+    if client is None:
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                # chromadb is heavy to import; only processes that query load it
+                from chromadb import PersistentClient
+                client = PersistentClient(path=path)
+                _clients[key] = client
+    return client
+
+
+class _BoundedCollection:
+    def __init__(self, collection):
+        self.collection = collection
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+    def query(self, **kwargs):
+        return call_within("retrieval", self.collection.query, reserve=DEADLINE_LLM_RESERVE_SECONDS, **kwargs)
+
+
+def bounded(collection):
+    """
+    The collection, with query() giving up (DeadlineExceeded) once the
+    request's retrieval time is used up; unchanged without a deadline
+    """
+    return _BoundedCollection(collection)
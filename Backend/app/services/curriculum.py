@@ -0,0 +1,69 @@
+import json
+from functools import lru_cache
+from app.config import CURRICULUM_FILE
+
+# Science lessons are stored under the grade's name, as the frontend sends it
+SCIENCE_GRADES = {
+    "K": "Kindergarten",
+    "1": "First Grade",
+    "2": "Second Grade",
+    "3": "Third Grade",
+    "4": "Fourth Grade",
+    "5": "Fifth Grade",
+    "6": "Sixth Grade",
+}
+
+
+@lru_cache(maxsize=1)
+def load_curriculum():
+    """ The frontend's dropdown data (CURRICULUM_FILE), read once per process """
+    with open(CURRICULUM_FILE, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def expand_curriculum(subject, grade, strand=None):
+    """
+    Every lesson of a grade, or of one strand of it
+
+    Maths lessons are the subtopics of each strand (the "topic" of a
+    lesson plan request) in the grade; Science lessons are the grade's
+    topics, which have no subtopics.
+
+    Args:
+        subject: "Maths" or "Science"
+        grade: Grade value as in the dropdowns ("4", "Algebra I", "K", ...)
+        strand: Maths strand to restrict to, e.g. "Number and Number Sense"
+
+    Raises:
+        ValueError: For an unknown subject, grade or strand
+
+    Returns:
+        list: dicts with the grade, topic and subtopic of a generation request
+    """
+    data = load_curriculum()
+    if subject == "Maths":
+        strands = data["topics"].get(grade)
+        if strands is None:
+            raise ValueError(f"Unknown Maths grade: {grade}")
+        if strand is not None:
+            if strand not in strands:
+                raise ValueError(f"Unknown strand for grade {grade}: {strand}")
+            strands = {strand: strands[strand]}
+        return [
+            {"grade": grade, "topic": name, "subtopic": subtopic["value"]}
+            for name, subtopics in strands.items()
+            for subtopic in subtopics
+        ]
+    if subject == "Science":
+        if strand is not None:
+            raise ValueError("Science topics have no strands")
+        grade_name = SCIENCE_GRADES.get(grade, grade)
+        lessons = [
+            {"grade": topic["grade"], "topic": topic["value"], "subtopic": None}
+            for topic in data["scienceTopics"]
+            if topic["grade"] == grade_name
+        ]
+        if not lessons:
+            raise ValueError(f"Unknown Science grade: {grade}")
+        return lessons
+    raise ValueError(f"Unknown subject: {subject}")
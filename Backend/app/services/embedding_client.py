@@ -0,0 +1,168 @@
+import json
+import os
+import socket
+import struct
+import sys
+import threading
+from array import array
+from app.config import EMBEDDING_SOCKET, EMBEDDING_MODEL, EMBEDDING_TIMEOUT_SECONDS, DEADLINE_LLM_RESERVE_SECONDS
+
+# Wire format shared with app.embedding_server, one frame per message:
+#   4-byte big-endian length, then the body.
+# Request body:  JSON list of strings.
+# Response body: rows and dimension as two big-endian uint32, then
+#   rows * dim little-endian float32. rows == ERROR_ROWS means the rest of
+#   the body is an error message.
+HEADER = struct.Struct("!I")
+SHAPE = struct.Struct("!II")
+ERROR_ROWS = 0xFFFFFFFF
+
+
+class EmbeddingUnavailable(RuntimeError):
+    pass
+
+
+def read_frame(sock):
+    header = _recv_exactly(sock, HEADER.size)
+    return _recv_exactly(sock, HEADER.unpack(header)[0])
+
+
+def _recv_exactly(sock, size):
+    chunks = bytearray()
+    while len(chunks) < size:
+        chunk = sock.recv(size - len(chunks))
+        if not chunk:
+            raise ConnectionError("embedding server closed the connection")
+        chunks.extend(chunk)
+    return bytes(chunks)
+
+
+def decode_embeddings(body):
+    """
+    Turn a response body into a list of embeddings
+
+    Raises:
+        EmbeddingUnavailable: The server reported an error
+    """
+    rows, dim = SHAPE.unpack_from(body)
+    if rows == ERROR_ROWS:
+        raise EmbeddingUnavailable(body[SHAPE.size:].decode(errors="replace"))
+    values = array("f")
+    values.frombytes(body[SHAPE.size:])
+    if values.itemsize != 4 or len(values) != rows * dim:
+        raise EmbeddingUnavailable("malformed response from embedding server")
+    if sys.byteorder == "big":
+        values.byteswap()
+    flat = values.tolist()
+    return [flat[i * dim:(i + 1) * dim] for i in range(rows)]
+
+
+class RemoteEmbedder:
+    """
+    Client of the shared embedding server
+
+    Each thread keeps one connection open and reuses it; a connection that
+    turns out to be stale (server restarted) is reopened once.
+    """
+
+    def __init__(self, path, timeout=EMBEDDING_TIMEOUT_SECONDS):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        sock = getattr(self._local, "sock", None)
+        # A socket inherited across a fork is shared with the parent
+        if sock is not None and self._local.pid == os.getpid():
+            return sock
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.path)
+        self._local.sock = sock
+        self._local.pid = os.getpid()
+        return sock
+
+    def _close(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            sock.close()
+        self._local.sock = None
+
+    def encode(self, texts):
+        """
+        Embed a list of strings
+
+        Returns:
+            list: One embedding (list of floats) per string, in order
+
+        Raises:
+            DeadlineExceeded: When the request's deadline leaves no time, or
+                runs out while waiting for the server
+            EmbeddingUnavailable: When the server can't be reached or fails
+        """
+        # Imported here: the embedding server shares this module's wire format
+        # and has no use for the web stack
+        from app.deadline import DeadlineExceeded, stage_budget
+        texts = list(texts)
+        if not texts:
+            return []
+        body = json.dumps(texts).encode()
+        for attempt in range(2):
+            # Leaves the LLM its share of the request's time; nothing left
+            # (DeadlineExceeded) also means no retry
+            timeout = stage_budget("embedding", self.timeout, reserve=DEADLINE_LLM_RESERVE_SECONDS)
+            try:
+                sock = self._connection()
+                sock.settimeout(timeout)
+                sock.sendall(HEADER.pack(len(body)) + body)
+                return decode_embeddings(read_frame(sock))
+            except (OSError, ConnectionError) as e:
+                self._close()
+                if isinstance(e, socket.timeout) and timeout is not None and timeout < self.timeout:
+                    # Cut short by the request's deadline, not a failing server
+                    raise DeadlineExceeded("embedding") from e
+                if attempt:
+                    raise EmbeddingUnavailable(f"embedding server at {self.path} unavailable: {e}") from e
+
+
+class LocalEmbedder:
+    """
+    In-process embedding, for running without the embedding server
+
+    The model is loaded on first use.
+    """
+
+    def __init__(self, model_name=EMBEDDING_MODEL):
+        self.model_name = model_name
+        self._model = None
+        self._lock = threading.Lock()
+
+    def encode(self, texts):
+        from app.deadline import check_deadline
+        texts = list(texts)
+        if not texts:
+            return []
+        check_deadline("embedding")
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from sentence_transformers import SentenceTransformer
+                    self._model = SentenceTransformer(self.model_name)
+        return self._model.encode(texts).tolist()
+
+
+_embedder = None
+
+
+def get_embedder():
+    """
+    Embedder for query strings: the shared server when EMBEDDING_SOCKET is
+    set, otherwise the model in this process
+
+    Both produce the all-MiniLM-L6-v2 vectors the Chroma collections were
+    built with, so results can be passed as query_embeddings.
+    """
+    global _embedder
+    if _embedder is None:
+        _embedder = RemoteEmbedder(EMBEDDING_SOCKET) if EMBEDDING_SOCKET else LocalEmbedder()
+    return _embedder
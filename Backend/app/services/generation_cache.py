@@ -0,0 +1,245 @@
+"""
+Cache of generated lesson plans and assessments.
+
+Responses are keyed by their normalized request parameters and kept for
+GENERATION_CACHE_TTL_SECONDS in Mongo, so every worker and node shares
+them, with a small in-process LRU in front. Teachers expect a plan of
+their own, so a response generated for one teacher is only given to
+another when the request accepts it (Cache-Control: max-stale). Responses
+generated ahead of time by pre-warming are served by default; a request
+sending Cache-Control: no-cache always gets a new generation, which is
+stored without replacing a pre-warmed response. Identical requests
+arriving while one is generating wait for it instead of calling the LLM
+again; the generation is cancelled only once every one of them has
+disconnected.
+"""
+import asyncio
+import copy
+import hashlib
+import json
+import logging
+from datetime import datetime, timedelta
+from pymongo.errors import DuplicateKeyError, PyMongoError
+from starlette.concurrency import run_in_threadpool
+from app.cache import TTLCache
+from app.database import generation_cache_collection
+from app.config import GENERATION_CACHE_TTL_SECONDS, GENERATION_CACHE_MEMORY_ENTRIES
+from app.metrics import cache_lookup
+from app.cancellation import CancelToken, use_cancel_token, wait_or_disconnect, client_closed_response
+from app.deadline import current_deadline, use_deadline
+from app import analytics
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_params(params):
+    """ Request parameters with whitespace and skill order made irrelevant """
+    normalized = {key: value.strip() if isinstance(value, str) else value for key, value in params.items()}
+    if normalized.get("exec_skills"):
+        normalized["exec_skills"] = sorted(set(skill.strip() for skill in normalized["exec_skills"]))
+    return normalized
+
+
+def generation_key(kind, params):
+    """ Cache key of a generation request's normalized parameters """
+    payload = json.dumps([kind, params], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+
+# Which stored responses a request accepts (see cache_reuse)
+REUSE_NONE = "none"
+REUSE_PREWARMED = "prewarmed"
+REUSE_ANY = "any"
+
+
+def cache_reuse(cache_control):
+    """
+    Stored responses a request accepts, from its Cache-Control header
+
+    Returns:
+        str: REUSE_NONE for no-cache or no-store, REUSE_ANY for max-stale,
+            REUSE_PREWARMED otherwise
+    """
+    directives = (cache_control or "").lower()
+    if "no-cache" in directives or "no-store" in directives:
+        return REUSE_NONE
+    if "max-stale" in directives:
+        return REUSE_ANY
+    return REUSE_PREWARMED
+
+
+class GenerationCache:
+    """
+    Two-tier response cache: in-process LRU over a shared Mongo collection
+
+    The memory tier is only used from the event loop.
+    """
+
+    def __init__(self, ttl_seconds=GENERATION_CACHE_TTL_SECONDS, memory_entries=GENERATION_CACHE_MEMORY_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self._memory = TTLCache(memory_entries, ttl_seconds)
+
+    async def get(self, key, prewarmed_only=False):
+        """
+        Cached response for key, or None
+
+        Args:
+            key: Cache key
+            prewarmed_only: Only return a response stored by pre-warming
+        """
+        entry = self._memory.get(key)
+        if entry is not None and (entry[1] or not prewarmed_only):
+            cache_lookup("generation_memory", True)
+            return entry[0]
+        cache_lookup("generation_memory", False)
+        now = datetime.utcnow()
+        query = {"_id": key, "expires_at": {"$gt": now}}
+        if prewarmed_only:
+            query["prewarmed"] = True
+        try:
+            # Mongo's TTL monitor only runs every minute; skip expired entries
+            entry = await generation_cache_collection.find_one(query)
+        except PyMongoError as e:
+            logger.warning(f"Error reading the generation cache: {e}")
+            entry = None
+        cache_lookup("generation_store", entry is not None)
+        if entry is None:
+            return None
+        prewarmed = entry.get("prewarmed", False)
+        self._memory.put(key, (entry["response"], prewarmed), ttl_seconds=(entry["expires_at"] - now).total_seconds())
+        return entry["response"]
+
+    async def expires_at(self, key):
+        """ When the pre-warmed response for key expires, or None if there is none """
+        entry = await generation_cache_collection.find_one({"_id": key, "prewarmed": True}, {"expires_at": 1})
+        return entry["expires_at"] if entry else None
+
+    async def put(self, key, kind, params, response, prewarmed=False):
+        """
+        Store a response for key
+
+        A response generated for a request doesn't replace a live
+        pre-warmed one, which keeps serving requests by default.
+
+        Args:
+            prewarmed: Whether pre-warming generated the response
+        """
+        now = datetime.utcnow()
+        query = {"_id": key}
+        if not prewarmed:
+            query["$or"] = [{"prewarmed": {"$ne": True}}, {"expires_at": {"$lte": now}}]
+        try:
+            await generation_cache_collection.replace_one(
+                query,
+                {
+                    "kind": kind,
+                    "params": params,
+                    "response": response,
+                    "prewarmed": prewarmed,
+                    "created_at": now,
+                    "expires_at": now + timedelta(seconds=self.ttl_seconds),
+                },
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            # A pre-warmed response is stored under key; keep it
+            return
+        except PyMongoError as e:
+            logger.warning(f"Error writing the generation cache: {e}")
+        self._memory.put(key, (response, prewarmed))
+
+
+generation_cache = GenerationCache()
+
+class _Flight:
+    """
+    A generation in progress and the number of requests waiting for it
+
+    It runs until the latest deadline of its waiters, starting with the
+    first one's.
+    """
+
+    def __init__(self, deadline):
+        self.token = CancelToken()
+        self.deadline = copy.copy(deadline)
+        self.task = None
+        self.waiters = 0
+
+    def join(self):
+        if self.deadline is not None:
+            self.deadline.extend(current_deadline())
+        self.waiters += 1
+
+
+# Generations in progress in this process, by cache key; identical requests
+# reaching different gunicorn workers each generate
+_in_flight = {}
+
+
+async def _generate(kind, key, params, request, produce, token, deadline):
+    use_cancel_token(token)
+    use_deadline(deadline)
+    response = await run_in_threadpool(produce, request)
+    await generation_cache.put(key, kind, params, response)
+    return response
+
+
+def _forget(key, flight):
+    if _in_flight.get(key) is flight:
+        del _in_flight[key]
+    # Nobody may be left to see the error once every waiter has gone
+    if not flight.task.cancelled():
+        flight.task.exception()
+
+
+async def cached_generation(kind, request, produce, reuse=REUSE_PREWARMED, http_request=None):
+    """
+    A generation route's response, from the cache when possible
+
+    A miss runs produce(request) in the thread pool and caches its result;
+    concurrent identical requests share that one run. Every request is
+    counted in the analytics behind pre-warming.
+
+    Args:
+        kind: "lesson_plan" or "assessment"
+        request: The route's request model
+        produce: Function building the route's response from the request
+        reuse: Stored responses the request accepts, from cache_reuse;
+            with REUSE_NONE a new response is always generated
+        http_request: The route's Request; when given, a client disconnecting
+            or running out of time stops waiting, and the last waiter to go
+            cancels the generation
+
+    Returns:
+        dict: The response body, or a 499 response when the client went away
+
+    Raises:
+        DeadlineExceeded: When the request's deadline passed first
+    """
+    params = normalize_params(request.dict())
+    key = generation_key(kind, params)
+    response = None if reuse == REUSE_NONE else await generation_cache.get(key, prewarmed_only=reuse == REUSE_PREWARMED)
+    analytics.record_request(kind, key, params, hit=response is not None)
+    if response is not None:
+        return response
+
+    flight = _in_flight.get(key)
+    if flight is None:
+        flight = _Flight(current_deadline())
+        flight.task = asyncio.ensure_future(_generate(kind, key, params, request, produce, flight.token, flight.deadline))
+        _in_flight[key] = flight
+        flight.task.add_done_callback(lambda done: _forget(key, flight))
+    flight.join()
+    try:
+        if http_request is None:
+            return await asyncio.shield(flight.task)
+        if await wait_or_disconnect(http_request, flight.task, kind):
+            return flight.task.result()
+        return client_closed_response()
+    finally:
+        flight.waiters -= 1
+        if flight.waiters == 0 and not flight.task.done():
+            flight.token.cancel()
+            # Identical requests from now on start a new generation
+            if _in_flight.get(key) is flight:
+                del _in_flight[key]
@@ -1,17 +1,18 @@
 import os
-import chromadb
-from sentence_transformers import SentenceTransformer
-from openai import OpenAI
 from dotenv import load_dotenv
-from chromadb import PersistentClient
+from .chroma_clients import get_chroma_client, bounded, ICEBREAKER_STORE_PATH
+from .embedding_client import get_embedder
+from .llm import chat_completion
+from app.metrics import StageTimer
+from app.logs import log_payloads
+from app.cancellation import raise_if_cancelled
+from app.deadline import DeadlineExceeded, check_deadline, degraded
 load_dotenv()
+import logging
 import sys
 
-embedder = SentenceTransformer("all-MiniLM-L6-v2")
+logger = logging.getLogger(__name__)
 
-openai = OpenAI(
-    api_key=os.getenv('OPENAI_API_KEY')
-)
 
 
 
@@ -40,7 +41,7 @@ openai = OpenAI(
 #     return icebreaker_collection, exec_collection
 
 def retrieve_context_from_chroma_with_metadata(query, collection, embedder, k=4, materials_filter=None):
-    query_embedding = embedder.encode([query + materials_filter]).tolist()[0]
+    query_embedding = embedder.encode([query + materials_filter])[0]
 
     chroma_filter = None
     # if materials_filter:
@@ -121,48 +122,59 @@ def ask_question_rag(question, collection, embedder, materials_filter=None, k=4,
     return context
 
 def generate_icebreaker(question,materials, exec_skills):
-    BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-    CHROMA_PATH = os.path.join(os.path.dirname(BASE_DIR), "chroma_store")
-
     exec_skills = exec_skills
+    timer = StageTimer("icebreaker")
 
-    client = PersistentClient(path=CHROMA_PATH)
-
-    exec_collection = client.get_collection("exec_skills")
+    client = get_chroma_client()
 
-    CHROMA_PATH = os.path.join(BASE_DIR, "icebreakers")
+    # Queries give up at the request's deadline
+    exec_collection = bounded(client.get_collection("exec_skills"))
 
-    client = PersistentClient(path=CHROMA_PATH)
-    icebreaker_collection = client.get_collection("icebreakers")
+    client = get_chroma_client(ICEBREAKER_STORE_PATH)
+    icebreaker_collection = bounded(client.get_collection("icebreakers"))
 
     # print(icebreaker_collection.peek())
 
     icebreaker_context = ask_question_rag(
         question=question,
         collection=icebreaker_collection,
-        embedder=embedder,
+        embedder=get_embedder(),
         materials_filter=materials,
         k=4,
         client=client
     )
 
 
-    print(f'icebreaker Context:{icebreaker_context}')
+    # Includes embedding the activity query, done inside the retrieval helper
+    timer.lap("retrieval")
 
     # Get exec strategy chunks
     exec_contexts = []
-    for skill in exec_skills:
-        results = exec_collection.query(
-            query_texts=[f"Strategies for {skill}"],
-            n_results=2,
-            where={"executive_skill": skill},
-            include=["documents"]
-        )
+    timer.skip()
+    skill_embeddings = get_embedder().encode([f"Strategies for {skill}" for skill in exec_skills])
+    timer.lap("embedding")
+    raise_if_cancelled("icebreaker", "retrieval")
+    for index, (skill, skill_embedding) in enumerate(zip(exec_skills, skill_embeddings)):
+        try:
+            results = exec_collection.query(
+                query_embeddings=[skill_embedding],
+                n_results=2,
+                where={"executive_skill": skill},
+                include=["documents"]
+            )
+        except DeadlineExceeded:
+            # Out of retrieval time: go on with the strategies found so far
+            degraded("retrieval", skipped_skills=exec_skills[index:])
+            break
         exec_contexts.extend(results["documents"][0])
     exec_context = "\n\n".join(exec_contexts)
+    timer.lap("retrieval")
 
     prompt = build_prompt(exec_context,icebreaker_context, question,exec_skills)
-    response = openai.chat.completions.create(
+    timer.lap("context_packing")
+    check_deadline("context_packing")
+    llm_output = chat_completion(
+        "icebreaker",
         model='gpt-4o',
         messages=[
             {"role": "system", "content": "You are a supportive and creative educational assistant."},
@@ -171,8 +183,10 @@ def generate_icebreaker(question,materials, exec_skills):
         temperature=0.7,
         max_tokens=2000
     )
-    llm_output = response.choices[0].message.content
+    timer.finish()
 
-    print("\n===== LLM OUTPUT =====\n")
-    print(llm_output)
-    return response.choices[0].message.content
\ No newline at end of file
+    log_payloads(
+        logger, "Icebreaker generated",
+        icebreaker_context=icebreaker_context, exec_context=exec_context, prompt=prompt, llm_output=llm_output,
+    )
+    return llm_output
\ No newline at end of file
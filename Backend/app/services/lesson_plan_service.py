@@ -1,9 +1,13 @@
 import os
-import chromadb
-from sentence_transformers import SentenceTransformer
-from openai import OpenAI
 from dotenv import load_dotenv
-from chromadb import PersistentClient
+from .chroma_clients import get_chroma_client, bounded
+from .retrieval_cache import encode_queries, shared_collection
+from .llm import chat_completion
+from app.metrics import StageTimer
+from app.logs import log_payloads
+from app.cancellation import raise_if_cancelled
+from app.deadline import DeadlineExceeded, check_deadline, degraded
+import logging
 import sys
 from .prompts import get_prompt
 from . import prompts
@@ -26,11 +30,9 @@ CONTEXT 3 (Math-Specific Teaching Strategies):
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 
-openai = OpenAI(
-    api_key=os.getenv('OPENAI_API_KEY')
-)
-print("OPENAI_API_KEY:", os.getenv("OPENAI_API_KEY")[:5])  # For debug, remove in production
 
 
 def get_context(client, subject):
@@ -41,7 +43,7 @@ def get_context(client, subject):
     try:
         lesson_collection = client.get_collection(map_subject[subject])
     except Exception as e:
-        print(f"Error getting lesson_plans collection: {e}")
+        logger.warning(f"Error getting lesson_plans collection: {e}")
         # Create the collection
         lesson_collection = client.create_collection(
             name=map_subject[subject],
@@ -55,7 +57,7 @@ def get_context(client, subject):
     try:
         exec_collection = client.get_collection("exec_skills")
     except Exception as e:
-        print(f"Error getting exec_skills collection: {e}")
+        logger.warning(f"Error getting exec_skills collection: {e}")
         # Create the collection
         exec_collection = client.create_collection(
             name="exec_skills",
@@ -68,17 +70,37 @@ def get_context(client, subject):
 
 
     
-# FUNCTION: Generate the augmented lesson plan
-def generate_adaptive_lesson_plan(subject, grade, topic, subtopic, exec_skills):
-    exec_skills = exec_skills
-    print(exec_skills)
-    client = PersistentClient(path="./app/chroma_store")
+def retrieve_context(subject, grade, topic, subtopic, exec_skills, timer):
+    """
+    Retrieve the lesson chunks and executive-skill strategies for a lesson plan
+
+    Also run ahead of the request by the prefetch route, under a retrieval
+    cache the request then reuses.
+
+    Returns:
+        tuple: (lesson_context, exec_context)
+    """
+    client = get_chroma_client()
 
     lesson_collection, exec_collection = get_context(client, subject)
+    # Items of a bulk run share query results; queries give up at the deadline
+    lesson_collection, exec_collection = shared_collection(bounded(lesson_collection)), shared_collection(bounded(exec_collection))
+    timer.lap("retrieval")
+    # Embed every query of this request in one call, so the embedding
+    # server can batch them together
+    if subject == 'Maths':
+        lesson_query = f"Lesson for {subject} on {topic} under {subtopic} for grade {grade}"
+    elif subject == 'Science':
+        lesson_query = f"Lesson for {subject} on {topic} for grade {grade}"
+    skill_queries = [f"Strategies for {skill}" for skill in exec_skills]
+    lesson_embedding, *skill_embeddings = encode_queries([lesson_query] + skill_queries)
+    timer.lap("embedding")
+    raise_if_cancelled("lesson_plan", "retrieval")
+
     # Get lesson chunks
     if subject == 'Maths':
         lesson_results = lesson_collection.query(
-            query_texts=[f"Lesson for {subject} on {topic} under {subtopic} for grade {grade}"],  # semantic hint
+            query_embeddings=[lesson_embedding],  # semantic hint
             n_results=5,
             where={
                 "$and": [
@@ -92,7 +114,7 @@ def generate_adaptive_lesson_plan(subject, grade, topic, subtopic, exec_skills):
         lesson_context = "\n\n".join(lesson_results["documents"][0])
     elif subject == 'Science':
         lesson_results = lesson_collection.query(
-            query_texts=[f"Lesson for {subject} on {topic} for grade {grade}"],  # semantic hint
+            query_embeddings=[lesson_embedding],  # semantic hint
             n_results=7,
             where={
                 "$and": [
@@ -104,31 +126,42 @@ def generate_adaptive_lesson_plan(subject, grade, topic, subtopic, exec_skills):
         )
 
         lesson_context = "\n\n".join(lesson_results["documents"][0])
-    print(f'\nlesson_context--------------------------------------------------------------:\n:{lesson_context}')
 
     # Get exec strategy chunks
     exec_contexts = []
-    for skill in exec_skills:
-        results = exec_collection.query(
-            query_texts=[f"Strategies for {skill}"],
-            n_results=2,
-            where={"executive_skill": skill},
-            include=["documents"]
-        )
+    for index, (skill, skill_embedding) in enumerate(zip(exec_skills, skill_embeddings)):
+        try:
+            results = exec_collection.query(
+                query_embeddings=[skill_embedding],
+                n_results=2,
+                where={"executive_skill": skill},
+                include=["documents"]
+            )
+        except DeadlineExceeded:
+            # Out of retrieval time: go on with the strategies found so far
+            degraded("retrieval", skipped_skills=exec_skills[index:])
+            break
         exec_contexts.extend(results["documents"][0])
     exec_context = "\n\n".join(exec_contexts)
+    timer.lap("retrieval")
+    return lesson_context, exec_context
 
-    print(f'exec_context--------------------------------------------------------------:\n{exec_context}')
+
+# FUNCTION: Generate the augmented lesson plan
+def generate_adaptive_lesson_plan(subject, grade, topic, subtopic, exec_skills):
+    exec_skills = exec_skills
+    timer = StageTimer("lesson_plan")
+    lesson_context, exec_context = retrieve_context(subject, grade, topic, subtopic, exec_skills, timer)
 
     # Prompt template
     prompt = get_prompt(subject, lesson_context, exec_context, exec_skills)
 
-    # print("\n===== LLM INPUT PROMPT =====\n")
-    print(prompt)
-    print(len(prompt))
+    timer.lap("context_packing")
+    check_deadline("context_packing")
 
     # LLM call to OpenRouter
-    response = openai.chat.completions.create(
+    llm_output = chat_completion(
+        "lesson_plan",
         model="gpt-4o",   # <- GPT-4o model name
         messages=[
             {"role": "system", "content": "You are a creative, structured, and neurodiversity-aware educational assistant who specializes in writing adaptive STEM lesson plans based on provided lessons, strategies and contexts"},
@@ -137,9 +170,10 @@ def generate_adaptive_lesson_plan(subject, grade, topic, subtopic, exec_skills):
         temperature=0.7,
         max_tokens=4000,
     )
-    # print("LLM raw response:", response)
-    llm_output = response.choices[0].message.content
+    timer.finish()
 
-    # print("\n===== LLM OUTPUT =====\n")
-    print(len(llm_output))
-    return response.choices[0].message.content
\ No newline at end of file
+    log_payloads(
+        logger, "Lesson plan generated",
+        lesson_context=lesson_context, exec_context=exec_context, prompt=prompt, llm_output=llm_output,
+    )
+    return llm_output
\ No newline at end of file
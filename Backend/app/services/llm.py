@@ -0,0 +1,139 @@
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+from app.metrics import LLM_TOKENS, observe
+from app.cancellation import raise_if_cancelled, close_on_cancel
+from app.config import LLM_BACKGROUND_CONCURRENCY, LLM_BACKGROUND_SERVICE_TIER, LLM_RETRY_MIN_SECONDS
+from app.deadline import stage_budget, check_deadline, degraded, close_at_deadline
+
+_client = None
+_lock = threading.Lock()
+
+# Priority class of the LLM calls made in the current context
+_priority = contextvars.ContextVar("llm_priority", default="interactive")
+_interactive_calls = 0
+_calls_changed = threading.Condition()
+_background_slots = threading.BoundedSemaphore(max(1, LLM_BACKGROUND_CONCURRENCY))
+
+
+def get_openai_client():
+    """
+    Shared OpenAI client, created on first use
+
+    The openai package takes a noticeable share of startup time to import,
+    so it is only loaded once a generation request actually needs it.
+
+    Returns:
+        OpenAI: The client for this process
+    """
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                from openai import OpenAI
+                _client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+    return _client
+
+
+def use_background_priority():
+    """
+    Make the LLM calls of the current context (and threads started from it)
+    low priority: few at a time, and only while no interactive call in this
+    process is waiting on the LLM
+    """
+    _priority.set("background")
+
+
+@contextmanager
+def _priority_slot():
+    global _interactive_calls
+    if _priority.get() == "background":
+        with _background_slots:
+            with _calls_changed:
+                _calls_changed.wait_for(lambda: _interactive_calls == 0)
+            yield
+        return
+    with _calls_changed:
+        _interactive_calls += 1
+    try:
+        yield
+    finally:
+        with _calls_changed:
+            _interactive_calls -= 1
+            _calls_changed.notify_all()
+
+
+def chat_completion(endpoint, **kwargs):
+    """
+    Run a chat completion, streaming it to measure time to first token
+
+    Records the time to the first content token, the total LLM time and the
+    prompt and completion token counts for the endpoint. Calls made under
+    use_background_priority wait their turn behind interactive ones. If the
+    request's clients all disconnect, the stream is closed mid-way, which
+    ends the upstream request. Under a request deadline the call gets what
+    is left of it: the client times out then, the stream is closed at the
+    deadline, and retries are left out when too little time is left for them.
+
+    Args:
+        endpoint: Metrics label of the calling pipeline ("lesson_plan", ...)
+        **kwargs: Arguments for chat.completions.create
+
+    Returns:
+        str: The full completion text
+
+    Raises:
+        Cancelled: When the request's clients have all gone away
+        DeadlineExceeded: When the request's deadline passes first
+    """
+    if _priority.get() == "background" and LLM_BACKGROUND_SERVICE_TIER:
+        kwargs.setdefault("service_tier", LLM_BACKGROUND_SERVICE_TIER)
+    with _priority_slot():
+        raise_if_cancelled(endpoint, "llm_wait")
+        client = get_openai_client()
+        timeout = stage_budget("llm")
+        if timeout is not None:
+            retries = client.max_retries if timeout >= LLM_RETRY_MIN_SECONDS else 0
+            if retries < client.max_retries:
+                degraded("llm", retries_dropped=client.max_retries, seconds_left=round(timeout, 1))
+            client = client.with_options(timeout=timeout, max_retries=retries)
+        start = time.perf_counter()
+        parts = []
+        usage = None
+        try:
+            stream = client.chat.completions.create(
+                stream=True,
+                # The final chunk then carries the token usage
+                stream_options={"include_usage": True},
+                **kwargs
+            )
+            with close_on_cancel(stream), close_at_deadline(stream):
+                for chunk in stream:
+                    if chunk.usage:
+                        usage = chunk.usage
+                    if not chunk.choices:
+                        continue
+                    content = chunk.choices[0].delta.content
+                    if content:
+                        if not parts:
+                            observe(endpoint, "llm_first_token", time.perf_counter() - start)
+                        parts.append(content)
+        except Exception:
+            # Reading a stream closed by the cancellation or the deadline
+            # fails, as does a request timed out at the deadline
+            raise_if_cancelled(endpoint, "llm_stream")
+            check_deadline("llm")
+            raise
+        # ...or just ends early
+        raise_if_cancelled(endpoint, "llm_stream")
+        if usage is None:
+            # A complete stream ends with its usage chunk
+            check_deadline("llm")
+        observe(endpoint, "llm_total", time.perf_counter() - start)
+
+    if usage:
+        LLM_TOKENS.labels(endpoint, "prompt").inc(usage.prompt_tokens)
+        LLM_TOKENS.labels(endpoint, "completion").inc(usage.completion_tokens)
+    return "".join(parts)
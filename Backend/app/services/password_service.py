@@ -0,0 +1,72 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException
+from passlib.context import CryptContext
+from app.config import PASSWORD_BCRYPT_ROUNDS, PASSWORD_HASH_THREADS, PASSWORD_HASH_MAX_PENDING
+
+# Hashes made with any other cost are reported as needing an update, so
+# raising or lowering PASSWORD_BCRYPT_ROUNDS migrates users as they log in
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=PASSWORD_BCRYPT_ROUNDS,
+    bcrypt__min_rounds=PASSWORD_BCRYPT_ROUNDS,
+    bcrypt__max_rounds=PASSWORD_BCRYPT_ROUNDS,
+)
+
+# bcrypt releases the GIL, so a few threads hash in parallel while the
+# event loop keeps serving other routes
+_hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_THREADS, thread_name_prefix="password-hash")
+_pending = 0
+
+
+async def _run_hash_operation(func, *args):
+    """
+    Run a bcrypt operation on the hashing threads, admitting a bounded number at once
+
+    Operations beyond PASSWORD_HASH_MAX_PENDING (running plus queued) are
+    rejected with a 503 straight away instead of queueing, so a burst of
+    credential stuffing cannot build up minutes of hashing work.
+    """
+    global _pending
+    if _pending >= PASSWORD_HASH_MAX_PENDING:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many sign-in attempts in progress, please retry shortly",
+            headers={"Retry-After": "1"}
+        )
+
+    _pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_hash_executor, func, *args)
+    finally:
+        _pending -= 1
+
+
+async def hash_password(password):
+    """
+    Hash a password with the configured bcrypt cost
+
+    Args:
+        password: The plain text password
+
+    Returns:
+        str: The bcrypt hash
+    """
+    return await _run_hash_operation(pwd_context.hash, password)
+
+
+async def verify_password(password, hashed_password):
+    """
+    Check a password against its stored hash
+
+    Args:
+        password: The plain text password from the login request
+        hashed_password: The stored bcrypt hash
+
+    Returns:
+        tuple: (matches, new_hash) where new_hash is a re-hash at the current
+            cost when the stored one was made with a different cost, else None
+    """
+    return await _run_hash_operation(pwd_context.verify_and_update, password, hashed_password)
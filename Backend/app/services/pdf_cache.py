@@ -0,0 +1,217 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+from app.config import PDF_CACHE_DIR, PDF_CACHE_MEMORY_BYTES, PDF_CACHE_DISK_BYTES
+from app.metrics import cache_lookup
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever a change to the PDF services alters the bytes they produce,
+# so stale documents are never served from the cache.
+RENDERER_VERSION = "2"
+
+
+def cache_key(kind, data):
+    """
+    Build a content address for a validated PDF request model
+
+    Args:
+        kind: The document type ("lesson", "quiz", "icebreaker", ...)
+        data: The pydantic request model
+
+    Returns:
+        str: A sha256 hex digest of the canonical request plus renderer version
+    """
+    canonical = json.dumps(
+        data.model_dump(mode="json"),
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    digest = hashlib.sha256()
+    digest.update(f"{kind}:{RENDERER_VERSION}:".encode("utf-8"))
+    digest.update(canonical.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def etag_for(key):
+    """
+    Weak ETag for a cache key
+
+    Weak because a document rendered again (after eviction, or in another
+    worker) is equivalent but not byte-identical: ReportLab stamps the
+    creation date and a random document ID, and ZIPs carry timestamps.
+    """
+    return f'W/"{key}"'
+
+
+def etag_matches(if_none_match, etag):
+    """
+    Check an If-None-Match header against an ETag (weak comparison, RFC 9110)
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    etag = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+class PDFCache:
+    """
+    Two-tier LRU cache for rendered PDFs.
+
+    The memory tier is bounded by total bytes and is private to the process.
+    The disk tier is bounded by total bytes too and can be shared by several
+    workers; file mtimes are bumped on every hit so eviction removes the least
+    recently used documents first.
+    """
+
+    def __init__(self, directory, memory_bytes, disk_bytes):
+        self.directory = directory
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self._memory = OrderedDict()
+        self._memory_used = 0
+        self._disk_used = None
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.pdf")
+
+    def get(self, key):
+        """
+        Return the cached PDF bytes for a key, or None
+
+        May read from disk; call from a thread, not the event loop.
+        """
+        with self._lock:
+            pdf = self._memory.get(key)
+            if pdf is not None:
+                self._memory.move_to_end(key)
+                cache_lookup("pdf_memory", True)
+                return pdf
+        cache_lookup("pdf_memory", False)
+
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                pdf = f.read()
+            os.utime(path)
+        except OSError:
+            cache_lookup("pdf_disk", False)
+            return None
+        cache_lookup("pdf_disk", True)
+
+        with self._lock:
+            self._remember(key, pdf)
+        return pdf
+
+    def put(self, key, pdf):
+        """ Store PDF bytes in both tiers; writes to disk, so call from a thread """
+        with self._lock:
+            self._remember(key, pdf)
+
+        if self.disk_bytes <= 0:
+            return
+
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # An entry being overwritten no longer counts once replaced
+            try:
+                replaced = os.path.getsize(path)
+            except OSError:
+                replaced = 0
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(pdf)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Error writing PDF cache entry {key}: {e}")
+            return
+
+        with self._lock:
+            if self._disk_used is None:
+                self._disk_used = self._scan_disk_usage()
+            else:
+                self._disk_used += len(pdf) - replaced
+            if self._disk_used > self.disk_bytes:
+                self._evict_disk()
+
+    def get_or_render(self, key, render):
+        """
+        Return cached PDF bytes for a key, rendering and storing them on a miss
+
+        Returns:
+            tuple: (pdf bytes, True if served from cache)
+        """
+        pdf = self.get(key)
+        if pdf is not None:
+            return pdf, True
+        pdf = render()
+        self.put(key, pdf)
+        return pdf, False
+
+    def _remember(self, key, pdf):
+        # Documents bigger than a quarter of the memory tier would flush
+        # everything else out of it, so they are only kept on disk.
+        if len(pdf) > self.memory_bytes // 4:
+            return
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_used -= len(previous)
+        self._memory[key] = pdf
+        self._memory_used += len(pdf)
+        while self._memory_used > self.memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_used -= len(evicted)
+
+    def _disk_entries(self):
+        entries = []
+        if not os.path.isdir(self.directory):
+            return entries
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if not entry.name.endswith(".pdf"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def _scan_disk_usage(self):
+        return sum(size for _, size, _ in self._disk_entries())
+
+    def _evict_disk(self):
+        # Other workers may share the directory, so eviction always works from
+        # a fresh scan rather than this process's running total.
+        entries = sorted(self._disk_entries())
+        used = sum(size for _, size, _ in entries)
+        target = int(self.disk_bytes * 0.9)
+        for _, size, path in entries:
+            if used <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            used -= size
+        self._disk_used = used
+
+
+pdf_cache = PDFCache(PDF_CACHE_DIR, PDF_CACHE_MEMORY_BYTES, PDF_CACHE_DISK_BYTES)
@@ -0,0 +1,149 @@
+from reportlab.lib.pagesizes import letter
+from reportlab.lib import colors
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.platypus import SimpleDocTemplate
+from functools import lru_cache
+from app.services.pdf_fonts import resolve_font
+
+# 72 points = 1 inch on every side
+PAGE_MARGIN = 72
+
+# Create a page number function for the PDF
+def add_page_number(canvas, doc):
+    """
+    Add page numbers to each page of the PDF
+    """
+    page_num = canvas.getPageNumber()
+    text = f"Page {page_num}"
+    canvas.setFont("Helvetica", 9)
+    canvas.setFillColor(colors.grey)
+    canvas.drawRightString(
+        doc.pagesize[0] - PAGE_MARGIN,  # right margin
+        PAGE_MARGIN / 2,                # Half of the bottom margin
+        text
+    )
+
+def create_document(buffer, **kwargs):
+    """
+    Create a letter-sized document with the standard one inch margins
+    """
+    return SimpleDocTemplate(
+        buffer,
+        pagesize=letter,
+        rightMargin=PAGE_MARGIN,
+        leftMargin=PAGE_MARGIN,
+        topMargin=PAGE_MARGIN,
+        bottomMargin=PAGE_MARGIN,
+        **kwargs
+    )
+
+def get_pdf_styles(font=None):
+    """
+    Paragraph styles shared by every PDF service.
+
+    Built once per process and font family; ParagraphStyle objects are never
+    mutated after creation, so the same instances are safe to reuse across
+    documents.
+
+    Args:
+        font: Font family requested for the document (defaults to Helvetica)
+
+    Returns:
+        dict: Style name to ParagraphStyle
+    """
+    faces = resolve_font(font)
+    return _build_styles(faces['normal'], faces['bold'])
+
+@lru_cache(maxsize=None)
+def _build_styles(regular_font, bold_font):
+    styles = getSampleStyleSheet()
+
+    title_style = ParagraphStyle(
+        'Title',
+        parent=styles['Title'],
+        fontName=bold_font,
+        fontSize=16,
+        textColor=colors.navy,
+        spaceAfter=10
+    )
+
+    heading_style = ParagraphStyle(
+        'Heading',
+        parent=styles['Heading2'],
+        fontName=bold_font,
+        fontSize=14,
+        textColor=colors.navy,
+        spaceAfter=5,
+        spaceBefore=2
+    )
+
+    subheading_style = ParagraphStyle(
+        'Subheading',
+        parent=styles['Heading3'],
+        fontName=bold_font,
+        fontSize=12,
+        textColor=colors.darkblue,
+        spaceAfter=2,
+        spaceBefore=2
+    )
+
+    normal_style = ParagraphStyle(
+        'Normal',
+        parent=styles['Normal'],
+        fontName=regular_font,
+        fontSize=10,
+        spaceAfter=5
+    )
+
+    list_style = ParagraphStyle(
+        'List',
+        parent=styles['Normal'],
+        fontName=regular_font,
+        fontSize=10,
+        leftIndent=20
+    )
+
+    # Create bold label style for section labels
+    bold_label_style = ParagraphStyle(
+        'BoldLabel',
+        parent=styles['Normal'],
+        fontSize=10,
+        fontName=bold_font,
+        textColor=colors.black,
+        spaceAfter=2
+    )
+
+    # Create style for question box
+    question_style = ParagraphStyle(
+        'Question',
+        parent=styles['Normal'],
+        fontName=regular_font,
+        fontSize=11,
+        leftIndent=10,
+        rightIndent=10,
+        spaceBefore=5,
+        spaceAfter=5,
+        leading=14  # Increased line spacing
+    )
+
+    # Create style for question options
+    option_style = ParagraphStyle(
+        'Option',
+        parent=styles['Normal'],
+        fontName=regular_font,
+        fontSize=10,
+        leftIndent=20,
+        spaceBefore=2,
+        spaceAfter=2
+    )
+
+    return {
+        'title': title_style,
+        'heading': heading_style,
+        'subheading': subheading_style,
+        'normal': normal_style,
+        'list': list_style,
+        'bold_label': bold_label_style,
+        'question': question_style,
+        'option': option_style,
+    }
@@ -0,0 +1,192 @@
+import asyncio
+import os
+import re
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+from starlette.concurrency import run_in_threadpool
+from app.config import PDF_RENDER_PROCESSES
+from app.services.pdf_cache import pdf_cache, cache_key
+from app.metrics import observe
+from app.profiler import profiled_call, unwrap_profiled
+
+_render_pool = None
+
+
+def get_render_pool():
+    """
+    Process pool used for PDF rendering, created on first use.
+
+    ReportLab layout is pure Python, so threads would serialize on the GIL;
+    separate processes let several documents render in parallel.
+    """
+    global _render_pool
+    if _render_pool is None:
+        _render_pool = ProcessPoolExecutor(max_workers=PDF_RENDER_PROCESSES)
+    return _render_pool
+
+
+async def render_pdf(kind, data, render, key=None):
+    """
+    Render a PDF in the process pool, going through the PDF cache
+
+    Args:
+        kind: The document type used in the cache key
+        data: The validated pydantic request model
+        render: A top-level (picklable) function taking the model and returning bytes
+        key: cache_key(kind, data), when the caller has already computed it
+
+    Returns:
+        bytes: The generated PDF
+    """
+    key = key or cache_key(kind, data)
+    # The cache's disk tier is file I/O, kept off the event loop
+    pdf = await run_in_threadpool(pdf_cache.get, key)
+    if pdf is None:
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        # Sampled in the worker process too, for the request's profile
+        pdf = unwrap_profiled(await loop.run_in_executor(get_render_pool(), profiled_call, render, data))
+        # Includes waiting for a free process in the pool
+        observe(f"pdf_{kind}", "pdf_render", time.perf_counter() - start)
+        await run_in_threadpool(pdf_cache.put, key, pdf)
+    return pdf
+
+
+async def render_concurrently(jobs, concurrency):
+    """
+    Render PDFs with at most `concurrency` in flight, yielding each as it finishes
+
+    Args:
+        jobs: Iterable of (kind, data, render, filename) tuples
+        concurrency: Maximum number of documents rendering at once
+
+    Yields:
+        tuple: (filename, pdf bytes) in completion order
+    """
+    jobs = iter(jobs)
+    pending = {}
+
+    def schedule():
+        job = next(jobs, None)
+        if job is None:
+            return
+        kind, data, render, filename = job
+        task = asyncio.ensure_future(render_pdf(kind, data, render))
+        pending[task] = filename
+
+    for _ in range(max(1, concurrency)):
+        schedule()
+
+    try:
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                filename = pending.pop(task)
+                # Only refill the window once the finished document is handed
+                # to the consumer, so a slow client applies backpressure.
+                yield filename, task.result()
+                schedule()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+class _ZipSink:
+    """
+    Write-only file object for zipfile that hands bytes back as they are written.
+
+    It deliberately has no seek(), which makes ZipFile emit data descriptors
+    instead of rewinding to patch local headers, so the archive can be sent
+    to the client incrementally.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._offset
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+# Path separators, characters Windows forbids in names, and control
+# characters (CR/LF would also break a Content-Disposition header)
+_UNSAFE_FILENAME_RE = re.compile(r'[\\/:*?"<>|\x00-\x1f\x7f]+')
+
+
+def safe_filename(name):
+    """
+    A user-supplied title made safe as a single file name
+
+    Unsafe characters become "-" and leading dots are dropped, so the
+    result can't name a parent directory or a hidden file.
+    """
+    return _UNSAFE_FILENAME_RE.sub("-", name).strip().lstrip(".").strip() or "-"
+
+
+def _unique_name(filename, used):
+    # "/" separates folders within the archive; each part is sanitized on its own
+    name = filename = "/".join(safe_filename(part) for part in filename.split("/"))
+    stem, ext = os.path.splitext(filename)
+    n = 2
+    while name in used:
+        name = f"{stem}_{n}{ext}"
+        n += 1
+    used.add(name)
+    return name
+
+
+async def stream_pdf_zip(jobs, concurrency):
+    """
+    Stream a ZIP archive of rendered PDFs
+
+    Only the documents currently rendering and the most recently finished
+    entry are held in memory, however many documents are exported.
+
+    Args:
+        jobs: Iterable of (kind, data, render, filename) tuples
+        concurrency: Maximum number of documents rendering at once
+
+    Yields:
+        bytes: Successive chunks of the ZIP archive
+    """
+    async for chunk in stream_zip(render_concurrently(jobs, concurrency)):
+        yield chunk
+
+
+async def stream_zip(entries, compression=zipfile.ZIP_STORED):
+    """
+    Stream a ZIP archive of files produced one at a time
+
+    Args:
+        entries: Async iterable of (filename, bytes); repeated names get a suffix
+        compression: zipfile compression for the entries (PDFs don't shrink,
+            so stored by default)
+
+    Yields:
+        bytes: Successive chunks of the ZIP archive
+    """
+    sink = _ZipSink()
+    archive = zipfile.ZipFile(sink, mode="w", compression=compression)
+    used_names = set()
+
+    async for filename, data in entries:
+        archive.writestr(_unique_name(filename, used_names), data)
+        yield sink.drain()
+
+    archive.close()
+    yield sink.drain()
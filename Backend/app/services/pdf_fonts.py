@@ -0,0 +1,102 @@
+import logging
+import os
+from functools import lru_cache
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.lib.fonts import addMapping
+from app.config import PDF_FONTS_DIR
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FONT = "Helvetica"
+
+# Base-14 faces for the default font; nothing is embedded for these
+_BUILTIN_FACES = {
+    "normal": "Helvetica",
+    "bold": "Helvetica-Bold",
+    "italic": "Helvetica-Oblique",
+    "boldItalic": "Helvetica-BoldOblique",
+}
+
+# Open-licensed (SIL OFL) families looked up under PDF_FONTS_DIR/<family>/.
+# A missing italic face falls back to the upright one.
+FONT_FAMILIES = {
+    "AtkinsonHyperlegible": {
+        "normal": "AtkinsonHyperlegible-Regular.ttf",
+        "bold": "AtkinsonHyperlegible-Bold.ttf",
+        "italic": "AtkinsonHyperlegible-Italic.ttf",
+        "boldItalic": "AtkinsonHyperlegible-BoldItalic.ttf",
+    },
+    "OpenDyslexic": {
+        "normal": "OpenDyslexic-Regular.ttf",
+        "bold": "OpenDyslexic-Bold.ttf",
+        "italic": "OpenDyslexic-Italic.ttf",
+        "boldItalic": "OpenDyslexic-BoldItalic.ttf",
+    },
+}
+
+
+@lru_cache(maxsize=None)
+def register_fonts():
+    """
+    Register the bundled font families with ReportLab, once per process.
+
+    TrueType fonts registered this way are subset on output: each PDF only
+    embeds the glyphs it actually uses, so an accessible font adds a few KB
+    per document rather than the whole TTF.
+
+    Returns:
+        dict: Family name to its face names (normal, bold, italic, boldItalic)
+    """
+    families = {DEFAULT_FONT: dict(_BUILTIN_FACES)}
+
+    for family, files in FONT_FAMILIES.items():
+        directory = os.path.join(PDF_FONTS_DIR, family)
+        faces = {}
+        for face, filename in files.items():
+            path = os.path.join(directory, filename)
+            if not os.path.exists(path):
+                continue
+            face_name = f"{family}-{face}"
+            try:
+                pdfmetrics.registerFont(TTFont(face_name, path))
+            except Exception as e:
+                logger.warning(f"Error registering font {path}: {e}")
+                continue
+            faces[face] = face_name
+
+        if "normal" not in faces:
+            continue
+        faces.setdefault("bold", faces["normal"])
+        faces.setdefault("italic", faces["normal"])
+        faces.setdefault("boldItalic", faces["bold"])
+
+        # Let <b> and <i> markup inside paragraphs resolve to the right face
+        addMapping(faces["normal"], 0, 0, faces["normal"])
+        addMapping(faces["normal"], 1, 0, faces["bold"])
+        addMapping(faces["normal"], 0, 1, faces["italic"])
+        addMapping(faces["normal"], 1, 1, faces["boldItalic"])
+        families[family] = faces
+
+    return families
+
+
+def available_fonts():
+    """ Names of the font families that can be requested """
+    return list(register_fonts().keys())
+
+
+def resolve_font(font):
+    """
+    Faces for a requested font family, falling back to Helvetica
+
+    Args:
+        font: Family name from the request, or None for the default
+
+    Returns:
+        dict: Face names (normal, bold, italic, boldItalic)
+    """
+    families = register_fonts()
+    if font and font not in families:
+        logger.warning(f"Font {font} is not available, using {DEFAULT_FONT}")
+    return families.get(font or DEFAULT_FONT, families[DEFAULT_FONT])
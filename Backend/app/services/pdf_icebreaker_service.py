@@ -1,117 +1,42 @@
-from reportlab.lib.pagesizes import letter
 from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, ListFlowable, ListItem
+from reportlab.platypus import Paragraph, Spacer, Table, TableStyle, ListFlowable, ListItem
 from reportlab.lib.units import inch
-from reportlab.pdfgen import canvas
 from io import BytesIO
 from typing import Dict, Any, List
+from app.services.pdf_common import add_page_number, create_document, get_pdf_styles
+from app.services.pdf_markdown import inline_markup, markdown_to_flowables
 
-# Create a page number function for the PDF
-def add_page_number(canvas, doc):
+def build_icebreaker_story(icebreaker_data, styles):
     """
-    Add page numbers to each page of the PDF
-    """
-    page_num = canvas.getPageNumber()
-    text = f"Page {page_num}"
-    canvas.setFont("Helvetica", 9)
-    canvas.setFillColor(colors.grey)
-    canvas.drawRightString(
-        doc.pagesize[0] - 72,  # 72 points = 1 inch, right margin
-        72 / 2,                # Half of the bottom margin
-        text
-    )
+    Build the flowables for an icebreaker activity document
 
-def generate_icebreaker_pdf(icebreaker_data):
-    """
-    Generate a PDF document from icebreaker activity data
-    
     Args:
         icebreaker_data: The icebreaker data from the API request
-        
+        styles: The shared styles from get_pdf_styles()
+
     Returns:
-        bytes: The generated PDF as bytes
+        list: ReportLab flowables
     """
-    # Create a buffer to store the PDF
-    buffer = BytesIO()
-    
     # Extract icebreaker data
     icebreaker = icebreaker_data.icebreaker
     disorder = getattr(icebreaker_data, 'disorder', None)  # Make disorder optional
     setting = icebreaker_data.setting
     activity = icebreaker_data.activity
     materials_input = icebreaker_data.materials
-    
-    # Create a PDF document
-    doc = SimpleDocTemplate(
-        buffer,
-        pagesize=letter,
-        rightMargin=72,
-        leftMargin=72,
-        topMargin=72,
-        bottomMargin=72
-    )
-    
-    # Get styles
-    styles = getSampleStyleSheet()
-    
-    # Create custom styles
-    title_style = ParagraphStyle(
-        'Title',
-        parent=styles['Title'],
-        fontSize=16,
-        textColor=colors.navy,
-        spaceAfter=10
-    )
-    
-    heading_style = ParagraphStyle(
-        'Heading',
-        parent=styles['Heading2'],
-        fontSize=14,
-        textColor=colors.navy,
-        spaceAfter=5,
-        spaceBefore=2
-    )
-    
-    subheading_style = ParagraphStyle(
-        'Subheading',
-        parent=styles['Heading3'],
-        fontSize=12,
-        textColor=colors.darkblue,
-        spaceAfter=2,
-        spaceBefore=2
-    )
-    
-    normal_style = ParagraphStyle(
-        'Normal',
-        parent=styles['Normal'],
-        fontSize=10,
-        spaceAfter=5
-    )
-    
-    list_style = ParagraphStyle(
-        'List',
-        parent=styles['Normal'],
-        fontSize=10,
-        leftIndent=20
-    )
-    
-    # Create bold label style for section labels
-    bold_label_style = ParagraphStyle(
-        'BoldLabel',
-        parent=styles['Normal'],
-        fontSize=10,
-        fontName='Helvetica-Bold',
-        textColor=colors.black,
-        spaceAfter=2
-    )
+
+    title_style = styles['title']
+    heading_style = styles['heading']
+    subheading_style = styles['subheading']
+    normal_style = styles['normal']
+    list_style = styles['list']
+    bold_label_style = styles['bold_label']
     
     # Create the content for the PDF
     content = []
     
     # Add title
     if icebreaker.title:
-        content.append(Paragraph(icebreaker.title, title_style))
+        content.append(Paragraph(inline_markup(icebreaker.title), title_style))
     else:
         content.append(Paragraph("Icebreaker Activity", title_style))
     
@@ -134,7 +59,7 @@ def generate_icebreaker_pdf(icebreaker_data):
         
         # Create a table for executive skills
         exec_skills_data = [[Paragraph('<b>Executive Function Skills</b>', bold_label_style), 
-                            Paragraph(', '.join(exec_skills), normal_style)]]
+                            Paragraph(inline_markup(', '.join(exec_skills)), normal_style)]]
         
         exec_skills_table = Table(exec_skills_data, colWidths=[2 * inch, 3.5 * inch])
         exec_skills_table.setStyle(TableStyle([
@@ -158,7 +83,8 @@ def generate_icebreaker_pdf(icebreaker_data):
             ('TEXTCOLOR', (0, 0), (0, -1), colors.darkblue),
             ('ALIGN', (0, 0), (0, -1), 'RIGHT'),
             ('ALIGN', (1, 0), (1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+            ('FONTNAME', (0, 0), (0, -1), bold_label_style.fontName),
+            ('FONTNAME', (1, 0), (1, -1), normal_style.fontName),
             ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
             ('TOPPADDING', (0, 0), (-1, -1), 6),
             ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
@@ -170,13 +96,13 @@ def generate_icebreaker_pdf(icebreaker_data):
     # Add objective
     if icebreaker.objective:
         content.append(Paragraph('Objective', heading_style))
-        content.append(Paragraph(icebreaker.objective, normal_style))
+        content.extend(markdown_to_flowables(icebreaker.objective, styles))
         content.append(Spacer(1, 0.1 * inch))
     
     # Add materials
     if icebreaker.materials:
         content.append(Paragraph('Materials Needed', heading_style))
-        content.append(Paragraph(icebreaker.materials, normal_style))
+        content.extend(markdown_to_flowables(icebreaker.materials, styles))
         content.append(Spacer(1, 0.1 * inch))
     
     # Add instructions
@@ -187,7 +113,7 @@ def generate_icebreaker_pdf(icebreaker_data):
         instructions_items = []
         for i, instruction in enumerate(icebreaker.instructions):
             instructions_items.append(
-                ListItem(Paragraph(instruction, list_style), leftIndent=20)
+                ListItem(Paragraph(inline_markup(instruction), list_style), leftIndent=20)
             )
         
         if instructions_items:
@@ -208,7 +134,7 @@ def generate_icebreaker_pdf(icebreaker_data):
         questions_items = []
         for question in icebreaker.questions:
             questions_items.append(
-                ListItem(Paragraph(question, list_style), leftIndent=20)
+                ListItem(Paragraph(inline_markup(question), list_style), leftIndent=20)
             )
         
         if questions_items:
@@ -229,7 +155,7 @@ def generate_icebreaker_pdf(icebreaker_data):
         debrief_items = []
         for point in icebreaker.debrief:
             debrief_items.append(
-                ListItem(Paragraph(point, list_style), leftIndent=20)
+                ListItem(Paragraph(inline_markup(point), list_style), leftIndent=20)
             )
         
         if debrief_items:
@@ -250,7 +176,7 @@ def generate_icebreaker_pdf(icebreaker_data):
         tips_items = []
         for tip in icebreaker.tips:
             tips_items.append(
-                ListItem(Paragraph(tip, list_style), leftIndent=20)
+                ListItem(Paragraph(inline_markup(tip), list_style), leftIndent=20)
             )
         
         if tips_items:
@@ -271,7 +197,7 @@ def generate_icebreaker_pdf(icebreaker_data):
         variations_items = []
         for variation in icebreaker.variations:
             variations_items.append(
-                ListItem(Paragraph(variation, list_style), leftIndent=20)
+                ListItem(Paragraph(inline_markup(variation), list_style), leftIndent=20)
             )
         
         if variations_items:
@@ -284,6 +210,25 @@ def generate_icebreaker_pdf(icebreaker_data):
             content.append(variations_list)
             content.append(Spacer(1, 0.1 * inch))
     
+    return content
+
+def generate_icebreaker_pdf(icebreaker_data):
+    """
+    Generate a PDF document from icebreaker activity data
+    
+    Args:
+        icebreaker_data: The icebreaker data from the API request
+        
+    Returns:
+        bytes: The generated PDF as bytes
+    """
+    # Create a buffer to store the PDF
+    buffer = BytesIO()
+    
+    # Create a PDF document
+    doc = create_document(buffer)
+    content = build_icebreaker_story(icebreaker_data, get_pdf_styles(getattr(icebreaker_data, 'font', None)))
+    
     # Build the PDF with page numbers
     doc.build(content, onFirstPage=add_page_number, onLaterPages=add_page_number)
     
@@ -1,132 +1,48 @@
-from reportlab.lib.pagesizes import letter
 from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, ListFlowable, ListItem
+from reportlab.platypus import Paragraph, Spacer, Table, TableStyle
 from reportlab.lib.units import inch
-from reportlab.pdfgen import canvas
 from io import BytesIO
 from typing import Dict, Any, List
+import re
+from app.services.pdf_common import add_page_number, create_document, get_pdf_styles
+from app.services.pdf_markdown import inline_markup, markdown_to_flowables
 
-# Create a page number function for the PDF
-def add_page_number(canvas, doc):
-    """
-    Add page numbers to each page of the PDF
-    """
-    page_num = canvas.getPageNumber()
-    text = f"Page {page_num}"
-    canvas.setFont("Helvetica", 9)
-    canvas.setFillColor(colors.grey)
-    canvas.drawRightString(
-        doc.pagesize[0] - 72,  # 72 points = 1 inch, right margin
-        72 / 2,                # Half of the bottom margin
-        text
-    )
+# Materials arrive comma separated or as one bullet per line
+_MATERIALS_SPLIT_RE = re.compile(r'\s*(?:,|\n)\s*')
+_LEADING_BULLET_RE = re.compile(r'^[-*•\s]+')
 
-def generate_lesson_pdf(lesson_plan_data):
+# The frontend joins activity bullets onto one line: "- one - two"
+_INLINE_BULLET_RE = re.compile(r'(?:^|\s)-\s+')
+
+def build_lesson_story(lesson_plan_data, styles):
     """
-    Generate a PDF document from lesson plan data
-    
+    Build the flowables for a lesson plan document
+
     Args:
         lesson_plan_data: The lesson plan data from the API request
-        
+        styles: The shared styles from get_pdf_styles()
+
     Returns:
-        bytes: The generated PDF as bytes
+        list: ReportLab flowables
     """
-    # Create a buffer to store the PDF
-    buffer = BytesIO()
-    
     # Extract lesson plan data
     lesson_plan = lesson_plan_data.lessonPlan
     exec_skills = lesson_plan_data.exec_skills
-    
-    # Create a PDF document
-    doc = SimpleDocTemplate(
-        buffer,
-        pagesize=letter,
-        rightMargin=72,
-        leftMargin=72,
-        topMargin=72,
-        bottomMargin=72
-    )
-    
-    # Get styles
-    styles = getSampleStyleSheet()
-    
-    # Create custom styles
-    title_style = ParagraphStyle(
-        'Title',
-        parent=styles['Title'],
-        fontSize=16,
-        textColor=colors.navy,
-        spaceAfter=10
-    )
-    
-    heading_style = ParagraphStyle(
-        'Heading',
-        parent=styles['Heading2'],
-        fontSize=14,
-        textColor=colors.navy,
-        spaceAfter=5,
-        spaceBefore=2
-    )
-    
-    subheading_style = ParagraphStyle(
-        'Subheading',
-        parent=styles['Heading3'],
-        fontSize=12,
-        textColor=colors.darkblue,
-        spaceAfter=2,
-        spaceBefore=2
-    )
-    
-    normal_style = ParagraphStyle(
-        'Normal',
-        parent=styles['Normal'],
-        fontSize=10,
-        spaceAfter=5
-    )
-    
-    list_style = ParagraphStyle(
-        'List',
-        parent=styles['Normal'],
-        fontSize=10,
-        leftIndent=20
-    )
-    
-    # Create bold label style for section labels
-    bold_label_style = ParagraphStyle(
-        'BoldLabel',
-        parent=styles['Normal'],
-        fontSize=10,
-        fontName='Helvetica-Bold',
-        textColor=colors.black,
-        spaceAfter=2
-    )
-    
-    # Create style for executive function strategy content with a box
-    exec_function_style = ParagraphStyle(
-        'ExecFunction',
-        parent=styles['Normal'],
-        fontSize=10,
-        leftIndent=10,
-        rightIndent=10,
-        spaceBefore=5,
-        spaceAfter=5,
-        borderWidth=1,
-        borderColor=colors.black,
-        borderPadding=5,
-        borderRadius=5,
-        backColor=colors.lightgrey.clone(alpha=0.3)
-    )
+
+    title_style = styles['title']
+    heading_style = styles['heading']
+    subheading_style = styles['subheading']
+    normal_style = styles['normal']
+    bold_label_style = styles['bold_label']
     
     # Create the content for the PDF
     content = []
     
     # Add title
     if lesson_plan.title:
-        content.append(Paragraph(lesson_plan.title, title_style))
+        content.append(Paragraph(inline_markup(lesson_plan.title), title_style))
     else:
-        content.append(Paragraph(f"{lesson_plan.subject or ''} Lesson Plan", title_style))
+        content.append(Paragraph(inline_markup(f"{lesson_plan.subject or ''} Lesson Plan"), title_style))
     
     content.append(Spacer(1, 0.2 * inch))
     
@@ -142,7 +58,7 @@ def generate_lesson_pdf(lesson_plan_data):
         metadata.append(['Strand', lesson_plan.strand])
     if lesson_plan.primarySOL:
         # Create a paragraph for the Primary SOL to enable text wrapping
-        sol_paragraph = Paragraph(lesson_plan.primarySOL, normal_style)
+        sol_paragraph = Paragraph(inline_markup(lesson_plan.primarySOL), normal_style)
         metadata.append(['Primary SOL', sol_paragraph])
     
     if metadata:
@@ -153,7 +69,8 @@ def generate_lesson_pdf(lesson_plan_data):
             ('TEXTCOLOR', (0, 0), (0, -1), colors.darkblue),
             ('ALIGN', (0, 0), (0, -1), 'RIGHT'),
             ('ALIGN', (1, 0), (1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+            ('FONTNAME', (0, 0), (0, -1), bold_label_style.fontName),
+            ('FONTNAME', (1, 0), (1, -1), normal_style.fontName),
             ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
             ('TOPPADDING', (0, 0), (-1, -1), 6),
             ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
@@ -165,14 +82,14 @@ def generate_lesson_pdf(lesson_plan_data):
     # Add objective
     if lesson_plan.objective:
         content.append(Paragraph('Objective', heading_style))
-        content.append(Paragraph(lesson_plan.objective, normal_style))
+        content.extend(markdown_to_flowables(lesson_plan.objective, styles))
         content.append(Spacer(1, 0.1 * inch))
     
     # Add executive function skills
     if exec_skills:
         content.append(Paragraph('Executive Function Skills', heading_style))
         skills_text = ', '.join(exec_skills)
-        content.append(Paragraph(skills_text, normal_style))
+        content.append(Paragraph(inline_markup(skills_text), normal_style))
         content.append(Spacer(1, 0.1 * inch))
     
     # Add materials
@@ -183,32 +100,24 @@ def generate_lesson_pdf(lesson_plan_data):
         materials = lesson_plan.materials
         # Remove any bullet points if they exist
         if ',' in materials or materials.startswith('-') or materials.startswith('*'):
-            # Split by commas or bullet points
-            if ',' in materials:
-                materials_list = materials.split(',')
-            else:
-                materials_list = materials.replace('- ', '').replace('* ', '').split('\n')
-            
-            # Clean up each item and join with commas
+            # Split by commas or bullet points, dropping the bullet markers
             cleaned_materials = []
-            for item in materials_list:
-                item_text = item.strip()
+            for item in _MATERIALS_SPLIT_RE.split(materials):
+                item_text = _LEADING_BULLET_RE.sub('', item)
                 if item_text:
-                    # Remove any leading bullet points or dashes
-                    item_text = item_text.lstrip('-* ')
                     cleaned_materials.append(item_text)
             
             # Join all materials with commas
             materials = ', '.join(cleaned_materials)
         
         # Display as a single paragraph
-        content.append(Paragraph(materials, normal_style))
+        content.append(Paragraph(inline_markup(materials), normal_style))
         content.append(Spacer(1, 0.1 * inch))
         
     # Add vocabulary
     if lesson_plan.vocabulary:
         content.append(Paragraph('Vocabulary', heading_style))
-        content.append(Paragraph(lesson_plan.vocabulary, normal_style))
+        content.extend(markdown_to_flowables(lesson_plan.vocabulary, styles))
         content.append(Spacer(1, 0.1 * inch))
     
     # Add sections - now guaranteed to have title, method, activities, and executiveFunction
@@ -218,36 +127,23 @@ def generate_lesson_pdf(lesson_plan_data):
         
         for i, section in enumerate(lesson_plan.sections):
             # Add section title
-            content.append(Paragraph(section.title, subheading_style))
+            content.append(Paragraph(inline_markup(section.title), subheading_style))
             
             # Add method with bold label
             content.append(Paragraph('<b>Method:</b>', bold_label_style))
-            content.append(Paragraph(section.method, normal_style))
+            content.extend(markdown_to_flowables(section.method, styles))
             content.append(Spacer(1, 0.05 * inch))
             
             # Add activities with bold label
             content.append(Paragraph('<b>Activities:</b>', bold_label_style))
             
-            # Process activities - handle bullet points
+            # Process activities - put inline bullet points back on their own lines
             activities = section.activities
-            if activities.startswith('- '):
-                activities_list = activities.split('- ')
-                activities_items = []
-                for item in activities_list:
-                    item_text = item.strip()
-                    if item_text:
-                        activities_items.append(ListItem(Paragraph(item_text, list_style)))
-                
-                if activities_items:
-                    activities_flowable = ListFlowable(
-                        activities_items,
-                        bulletType='bullet',
-                        leftIndent=20,
-                        bulletFontSize=8
-                    )
-                    content.append(activities_flowable)
-            else:
-                content.append(Paragraph(activities, normal_style))
+            if activities.startswith('- ') and '\n' not in activities:
+                activities = '\n'.join(
+                    f"- {item.strip()}" for item in _INLINE_BULLET_RE.split(activities) if item.strip()
+                )
+            content.extend(markdown_to_flowables(activities, styles))
             
             content.append(Spacer(1, 0.05 * inch))
             
@@ -255,7 +151,7 @@ def generate_lesson_pdf(lesson_plan_data):
             content.append(Paragraph('<b>Executive Function Strategy:</b>', bold_label_style))
             
             # Create a table for the executive function strategy with a border
-            exec_table = Table([[Paragraph(section.executiveFunction, normal_style)]], 
+            exec_table = Table([[markdown_to_flowables(section.executiveFunction, styles)]], 
                               colWidths=[5.5 * inch])
             exec_table.setStyle(TableStyle([
                 ('BOX', (0, 0), (-1, -1), 1, colors.black),
@@ -267,6 +163,25 @@ def generate_lesson_pdf(lesson_plan_data):
             
             content.append(Spacer(1, 0.2 * inch))
     
+    return content
+
+def generate_lesson_pdf(lesson_plan_data):
+    """
+    Generate a PDF document from lesson plan data
+    
+    Args:
+        lesson_plan_data: The lesson plan data from the API request
+        
+    Returns:
+        bytes: The generated PDF as bytes
+    """
+    # Create a buffer to store the PDF
+    buffer = BytesIO()
+    
+    # Create a PDF document
+    doc = create_document(buffer)
+    content = build_lesson_story(lesson_plan_data, get_pdf_styles(getattr(lesson_plan_data, 'font', None)))
+    
     # Build the PDF with page numbers
     doc.build(content, onFirstPage=add_page_number, onLaterPages=add_page_number)
     
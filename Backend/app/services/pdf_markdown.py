@@ -0,0 +1,220 @@
+import re
+from xml.sax.saxutils import escape
+from reportlab.platypus import Paragraph, ListFlowable, ListItem
+
+# Block-level patterns, matched against one line at a time
+_QUESTION_RE = re.compile(
+    r'^\s*(?:#{1,6}\s*(?:\*\*)?Question\s+(\d+)\s*(?:\*\*)?[:.)]?'   # ### Question 1
+    r'|\*\*Question\s+(\d+)\s*[:.)]?\*\*[:.)]?'                       # **Question 1:**
+    r'|Question\s+(\d+)\s*[:.)])'                                      # Question 1:
+    r'\s*(.*?)\s*$',
+    re.IGNORECASE
+)
+_HEADING_RE = re.compile(r'^\s*(#{1,6})\s+(.*?)\s*#*\s*$')
+_BULLET_RE = re.compile(r'^\s*[-*+•]\s+(.*)$')
+_NUMBERED_RE = re.compile(r'^\s*(\d+)[.)]\s+(.*)$')
+
+# Inline emphasis: ***bold italic***, then **bold**, then *italic*. Markers
+# hug their text and sit on word boundaries, so neither "3 * 4" nor
+# "3*4=12 and 5*6" is taken for emphasis
+_INLINE_RE = re.compile(
+    r'(?<![\w*])\*\*\*(?=\S)(.+?)(?<=\S)\*\*\*(?![\w*])'
+    r'|(?<![\w*])\*\*(?=\S)(.+?)(?<=\S)\*\*(?![\w*])'
+    r'|(?<![\w*])\*(?=[^\s*])(.+?)(?<=[^\s*])\*(?![\w*])'
+)
+_STRAY_MARKUP_RE = re.compile(r'\*\*|^#+\s*')
+
+# Fallback question split for content without "Question N" headings
+_NUMBERED_QUESTION_RE = re.compile(r'(?:^|\n)\d+\.\s+')
+
+
+def _question_number(match):
+    return int(match.group(1) or match.group(2) or match.group(3))
+
+
+def _inline_sub(match):
+    bold_italic, bold, italic = match.groups()
+    if bold_italic is not None:
+        return f"<b><i>{_INLINE_RE.sub(_inline_sub, bold_italic)}</i></b>"
+    if bold is not None:
+        # Italic nested in bold, e.g. "**see *this* one**"
+        return f"<b>{_INLINE_RE.sub(_inline_sub, bold)}</b>"
+    return f"<i>{italic}</i>"
+
+
+def inline_markup(text):
+    """
+    Convert one line of markdown into ReportLab paragraph markup
+
+    Reserved XML characters are escaped first, so model output containing
+    "<" or "&" can no longer break the paragraph parser.
+
+    Args:
+        text: Markdown text
+
+    Returns:
+        str: Markup for a Paragraph, with bold, italic and bold italic preserved
+    """
+    if not text:
+        return ''
+    markup = _INLINE_RE.sub(_inline_sub, escape(text))
+    return _STRAY_MARKUP_RE.sub('', markup)
+
+
+def tokenize(text):
+    """
+    Split markdown into block tokens in a single pass over its lines
+
+    Returns:
+        list: Tuples of
+            ("question", number, title)
+            ("heading", level, text)
+            ("bullet", None, text)
+            ("numbered", number, text)
+            ("text", None, lines)
+    """
+    tokens = []
+    paragraph = []
+
+    def flush():
+        if paragraph:
+            tokens.append(("text", None, list(paragraph)))
+            paragraph.clear()
+
+    for line in (text or '').splitlines():
+        if not line.strip():
+            flush()
+            continue
+
+        match = _QUESTION_RE.match(line)
+        if match:
+            flush()
+            tokens.append(("question", _question_number(match), match.group(4)))
+            continue
+
+        match = _HEADING_RE.match(line)
+        if match:
+            flush()
+            tokens.append(("heading", len(match.group(1)), match.group(2)))
+            continue
+
+        match = _BULLET_RE.match(line)
+        if match:
+            flush()
+            tokens.append(("bullet", None, match.group(1)))
+            continue
+
+        match = _NUMBERED_RE.match(line)
+        if match:
+            flush()
+            tokens.append(("numbered", int(match.group(1)), match.group(2)))
+            continue
+
+        paragraph.append(line.strip())
+
+    flush()
+    return tokens
+
+
+def _list_flowable(kind, items, styles, start):
+    list_items = [ListItem(Paragraph(inline_markup(item), styles['list'])) for item in items]
+    if kind == "bullet":
+        return ListFlowable(list_items, bulletType='bullet', leftIndent=20, bulletFontSize=8)
+    return ListFlowable(list_items, bulletType='1', start=start, leftIndent=20, bulletFontSize=10)
+
+
+def markdown_to_flowables(text, styles, body_style=None):
+    """
+    Convert the markdown subset produced by the model into ReportLab flowables
+
+    Supports headings, "Question N" blocks, bold/italic, and bullet and
+    numbered lists. Consecutive list items become one ListFlowable; other
+    consecutive lines become one paragraph with their line breaks kept.
+
+    Args:
+        text: Markdown text
+        styles: The shared styles from get_pdf_styles()
+        body_style: Style for plain paragraphs (defaults to styles['normal'])
+
+    Returns:
+        list: ReportLab flowables
+    """
+    body_style = body_style or styles['normal']
+    flowables = []
+    pending_kind = None
+    pending_items = []
+    pending_start = 1
+
+    def flush_list():
+        if pending_items:
+            flowables.append(_list_flowable(pending_kind, pending_items, styles, pending_start))
+            pending_items.clear()
+
+    for kind, number, value in tokenize(text):
+        if kind in ("bullet", "numbered"):
+            if kind != pending_kind:
+                flush_list()
+                pending_kind = kind
+                pending_start = number or 1
+            pending_items.append(value)
+            continue
+
+        flush_list()
+        pending_kind = None
+
+        if kind == "question":
+            title = f"<b>Question {number}</b>"
+            if value:
+                title += f" {inline_markup(value)}"
+            flowables.append(Paragraph(title, styles['subheading']))
+        elif kind == "heading":
+            style = styles['heading'] if number <= 2 else styles['subheading']
+            flowables.append(Paragraph(inline_markup(value), style))
+        else:
+            markup = '<br/>'.join(inline_markup(line) for line in value)
+            flowables.append(Paragraph(markup, body_style))
+
+    flush_list()
+    return flowables
+
+
+def split_questions(text):
+    """
+    Split assessment markdown into its questions
+
+    Questions are delimited by "### Question N" style headings. Content
+    without any such heading falls back to splitting on "1." style lines.
+    Text before the first question (instructions, a reading passage) is
+    returned separately rather than dropped.
+
+    Returns:
+        tuple: (intro markdown, list of (question number, question body
+            markdown) tuples)
+    """
+    intro_lines = []
+    questions = []
+    current_number = None
+    current_lines = []
+
+    for line in (text or '').splitlines():
+        match = _QUESTION_RE.match(line)
+        if match:
+            if current_number is not None:
+                questions.append((current_number, '\n'.join(current_lines).strip()))
+            current_number = _question_number(match)
+            current_lines = [match.group(4)] if match.group(4) else []
+        elif current_number is not None:
+            current_lines.append(line)
+        else:
+            intro_lines.append(line)
+
+    if current_number is not None:
+        questions.append((current_number, '\n'.join(current_lines).strip()))
+        return '\n'.join(intro_lines).strip(), questions
+
+    parts = [part.strip() for part in _NUMBERED_QUESTION_RE.split(text or '')]
+    if len(parts) == 1:
+        # Nothing numbered either: the whole text is one question
+        return '', [(1, parts[0])] if parts[0] else []
+    # The first part is whatever came before "1."
+    return parts[0], [(i + 1, part) for i, part in enumerate(part for part in parts[1:] if part)]
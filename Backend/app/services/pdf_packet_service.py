@@ -0,0 +1,218 @@
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+from reportlab.platypus import BaseDocTemplate, PageTemplate, Frame, Flowable, Paragraph, Spacer, PageBreak
+from reportlab.lib.units import inch
+from io import BytesIO
+from app.services.pdf_common import PAGE_MARGIN, get_pdf_styles
+from app.services.pdf_markdown import inline_markup
+from app.services.pdf_lesson_service import build_lesson_story
+from app.services.pdf_quiz_service import build_quiz_story
+from app.services.pdf_icebreaker_service import build_icebreaker_story
+
+TOTAL_PAGES_FORM = "packet_total_pages"
+
+
+def _part_page_form(index):
+    return f"packet_part_{index}_page"
+
+
+class PartStart(Flowable):
+    """
+    Zero-size marker placed at the start of each part of the packet.
+
+    The document template watches for it to record which page the part
+    starts on and which title the running header should show.
+    """
+
+    def __init__(self, index, title):
+        Flowable.__init__(self)
+        self.index = index
+        self.title = title
+
+    def wrap(self, availWidth, availHeight):
+        return (0, 0)
+
+    def draw(self):
+        pass
+
+
+class PacketContents(Flowable):
+    """
+    Table of contents whose page numbers are filled in after layout.
+
+    Each page number is drawn through a PDF form XObject that is only defined
+    when the canvas is saved, once every part's start page is known. That
+    keeps the table of contents at the front of the document without laying
+    the whole packet out a second time.
+    """
+
+    def __init__(self, titles, style, leading=22):
+        Flowable.__init__(self)
+        self.titles = titles
+        self.style = style
+        self.leading = leading
+
+    def wrap(self, availWidth, availHeight):
+        self.width = availWidth
+        return (availWidth, self.leading * len(self.titles))
+
+    def draw(self):
+        c = self.canv
+        font_name = self.style.fontName
+        font_size = self.style.fontSize
+        for i, title in enumerate(self.titles):
+            y = self.leading * (len(self.titles) - i - 1) + 4
+            c.setFont(font_name, font_size)
+            c.setFillColor(colors.black)
+            label = f"{i + 1}. {title}"
+            c.drawString(0, y, label)
+
+            # Dotted leader between the title and the page number
+            start = c.stringWidth(label, font_name, font_size) + 6
+            end = self.width - 30
+            if end > start:
+                c.saveState()
+                c.setStrokeColor(colors.grey)
+                c.setDash(1, 3)
+                c.line(start, y, end, y)
+                c.restoreState()
+
+            c.saveState()
+            c.translate(self.width, y)
+            c.doForm(_part_page_form(i))
+            c.restoreState()
+
+
+class PacketDocTemplate(BaseDocTemplate):
+    """
+    Single-frame document that tracks part start pages for the packet
+    """
+
+    def __init__(self, filename, **kwargs):
+        BaseDocTemplate.__init__(self, filename, **kwargs)
+        self.packet_title = ""
+        self.part_title = ""
+        self.part_pages = {}
+        self.last_page = 0
+        frame = Frame(self.leftMargin, self.bottomMargin, self.width, self.height, id='normal')
+        self.addPageTemplates([PageTemplate(id='packet', frames=[frame], onPageEnd=self._decorate_page)])
+
+    def afterFlowable(self, flowable):
+        if isinstance(flowable, PartStart):
+            self.part_pages[flowable.index] = self.page
+            self.part_title = flowable.title
+
+    def afterPage(self):
+        self.last_page = self.page
+
+    def _decorate_page(self, c, doc):
+        """
+        Draw the shared header and the continuous "Page N of M" footer
+        """
+        c.saveState()
+        c.setFont("Helvetica", 9)
+        c.setFillColor(colors.grey)
+        top = doc.pagesize[1] - PAGE_MARGIN / 2
+        c.drawString(PAGE_MARGIN, top, self.packet_title)
+        if self.part_title:
+            c.drawRightString(doc.pagesize[0] - PAGE_MARGIN, top, self.part_title)
+        c.setStrokeColor(colors.lightgrey)
+        c.setLineWidth(0.5)
+        c.line(PAGE_MARGIN, top - 4, doc.pagesize[0] - PAGE_MARGIN, top - 4)
+
+        label = f"Page {c.getPageNumber()} of "
+        right = doc.pagesize[0] - PAGE_MARGIN
+        c.drawRightString(right - 14, PAGE_MARGIN / 2, label)
+        c.translate(right, PAGE_MARGIN / 2)
+        c.doForm(TOTAL_PAGES_FORM)
+        c.restoreState()
+
+    def make_canvas(self, *args, **kwargs):
+        """
+        Canvas factory that defines the forward-referenced page number forms on save
+        """
+        doc = self
+
+        class PacketCanvas(canvas.Canvas):
+            def save(self):
+                for index in range(doc.part_count):
+                    page = doc.part_pages.get(index)
+                    self._number_form(_part_page_form(index), str(page) if page else "", 10)
+                self._number_form(TOTAL_PAGES_FORM, str(doc.last_page), 9)
+                canvas.Canvas.save(self)
+
+            def _number_form(self, name, text, font_size):
+                # Right-aligned at the origin, so the bounding box extends left
+                self.beginForm(name, lowerx=-60, lowery=-4, upperx=0, uppery=font_size + 4)
+                self.setFont("Helvetica", font_size)
+                self.setFillColor(colors.black if font_size > 9 else colors.grey)
+                self.drawRightString(0, 0, text)
+                self.endForm()
+
+        return PacketCanvas(*args, **kwargs)
+
+
+def generate_packet_pdf(packet_data):
+    """
+    Generate one PDF combining a lesson plan, its assessment and an icebreaker
+
+    All parts are laid out in a single document build that shares one
+    stylesheet, a running header, continuous page numbering and a table of
+    contents.
+
+    Args:
+        packet_data: The unit packet data from the API request
+
+    Returns:
+        bytes: The generated PDF as bytes
+    """
+    # Create a buffer to store the PDF
+    buffer = BytesIO()
+
+    styles = get_pdf_styles(packet_data.font)
+
+    parts = []
+    if packet_data.lesson:
+        parts.append(('Lesson Plan', build_lesson_story(packet_data.lesson, styles)))
+    if packet_data.assessment:
+        parts.append(('Assessment', build_quiz_story(packet_data.assessment, styles)))
+    if packet_data.icebreaker:
+        parts.append(('Icebreaker Activity', build_icebreaker_story(packet_data.icebreaker, styles)))
+
+    title = packet_data.title or 'Unit Packet'
+
+    doc = PacketDocTemplate(
+        buffer,
+        pagesize=letter,
+        rightMargin=PAGE_MARGIN,
+        leftMargin=PAGE_MARGIN,
+        topMargin=PAGE_MARGIN,
+        bottomMargin=PAGE_MARGIN,
+        title=title
+    )
+    doc.packet_title = title
+    doc.part_count = len(parts)
+
+    # Cover page with the table of contents
+    content = [
+        Paragraph(inline_markup(title), styles['title']),
+        Spacer(1, 0.3 * inch),
+        Paragraph('Contents', styles['heading']),
+        Spacer(1, 0.1 * inch),
+        PacketContents([part_title for part_title, _ in parts], styles['normal']),
+    ]
+
+    for index, (part_title, story) in enumerate(parts):
+        content.append(PageBreak())
+        content.append(PartStart(index, part_title))
+        content.extend(story)
+
+    # Build the whole packet in one pass
+    doc.build(content, canvasmaker=doc.make_canvas)
+
+    # Get the value of the BytesIO buffer
+    pdf_bytes = buffer.getvalue()
+    buffer.close()
+
+    return pdf_bytes
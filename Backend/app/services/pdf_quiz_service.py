@@ -1,117 +1,59 @@
-from reportlab.lib.pagesizes import letter
 from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, ListFlowable, ListItem
+from reportlab.platypus import Paragraph, Spacer, Table, TableStyle, ListFlowable, ListItem
 from reportlab.lib.units import inch
-from reportlab.pdfgen import canvas
 from io import BytesIO
 from typing import Dict, Any, List
-import re
+from app.services.pdf_common import add_page_number, create_document, get_pdf_styles
+from app.services.pdf_markdown import inline_markup, markdown_to_flowables, split_questions
 
-# Create a page number function for the PDF
-def add_page_number(canvas, doc):
+_SEPARATOR_STYLE = TableStyle([
+    ('LINEBELOW', (0, 0), (-1, -1), 0.5, colors.lightgrey),
+    ('TOPPADDING', (0, 0), (-1, -1), 0),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 0),
+])
+
+def question_separator():
     """
-    Add page numbers to each page of the PDF
+    Thin rule drawn between questions
     """
-    page_num = canvas.getPageNumber()
-    text = f"Page {page_num}"
-    canvas.setFont("Helvetica", 9)
-    canvas.setFillColor(colors.grey)
-    canvas.drawRightString(
-        doc.pagesize[0] - 72,  # 72 points = 1 inch, right margin
-        72 / 2,                # Half of the bottom margin
-        text
-    )
+    separator = Table([['']], colWidths=[5.5 * inch])
+    separator.setStyle(_SEPARATOR_STYLE)
+    return separator
 
-def generate_quiz_pdf(assessment_data):
+
+def build_quiz_header(assessment_data, styles, subtitle=None):
     """
-    Generate a PDF document from assessment data
-    
+    Build the title, metadata and skills flowables that open an assessment
+
     Args:
         assessment_data: The assessment data from the API request
-        
+        styles: The shared styles from get_pdf_styles()
+        subtitle: Optional line shown under the title, e.g. a version label
+
     Returns:
-        bytes: The generated PDF as bytes
+        list: ReportLab flowables, ending with the "Assessment Questions" heading
     """
-    # Create a buffer to store the PDF
-    buffer = BytesIO()
-    
     # Extract assessment data
     assessment = assessment_data.assessment
     exec_skills = assessment_data.exec_skills
-    
-    # Create a PDF document
-    doc = SimpleDocTemplate(
-        buffer,
-        pagesize=letter,
-        rightMargin=72,
-        leftMargin=72,
-        topMargin=72,
-        bottomMargin=72
-    )
-    
-    # Get styles
-    styles = getSampleStyleSheet()
-    
-    # Create custom styles
-    title_style = ParagraphStyle(
-        'Title',
-        parent=styles['Title'],
-        fontSize=16,
-        textColor=colors.navy,
-        spaceAfter=10
-    )
-    
-    heading_style = ParagraphStyle(
-        'Heading',
-        parent=styles['Heading2'],
-        fontSize=14,
-        textColor=colors.navy,
-        spaceAfter=5,
-        spaceBefore=2
-    )
-    
-    subheading_style = ParagraphStyle(
-        'Subheading',
-        parent=styles['Heading3'],
-        fontSize=12,
-        textColor=colors.darkblue,
-        spaceAfter=2,
-        spaceBefore=2
-    )
-    
-    normal_style = ParagraphStyle(
-        'Normal',
-        parent=styles['Normal'],
-        fontSize=10,
-        spaceAfter=5
-    )
-    
-    list_style = ParagraphStyle(
-        'List',
-        parent=styles['Normal'],
-        fontSize=10,
-        leftIndent=20
-    )
-    
-    # Create bold label style for section labels
-    bold_label_style = ParagraphStyle(
-        'BoldLabel',
-        parent=styles['Normal'],
-        fontSize=10,
-        fontName='Helvetica-Bold',
-        textColor=colors.black,
-        spaceAfter=2
-    )
+
+    title_style = styles['title']
+    heading_style = styles['heading']
+    subheading_style = styles['subheading']
+    normal_style = styles['normal']
+    bold_label_style = styles['bold_label']
     
     # Create the content for the PDF
     content = []
     
     # Add title
     if assessment.title:
-        content.append(Paragraph(assessment.title, title_style))
+        content.append(Paragraph(inline_markup(assessment.title), title_style))
     else:
-        content.append(Paragraph(f"{assessment.subject or ''} Assessment", title_style))
+        content.append(Paragraph(inline_markup(f"{assessment.subject or ''} Assessment"), title_style))
+    
+    if subtitle:
+        content.append(Paragraph(inline_markup(subtitle), subheading_style))
     
     content.append(Spacer(1, 0.2 * inch))
     
@@ -134,7 +76,8 @@ def generate_quiz_pdf(assessment_data):
             ('TEXTCOLOR', (0, 0), (0, -1), colors.darkblue),
             ('ALIGN', (0, 0), (0, -1), 'RIGHT'),
             ('ALIGN', (1, 0), (1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+            ('FONTNAME', (0, 0), (0, -1), bold_label_style.fontName),
+            ('FONTNAME', (1, 0), (1, -1), normal_style.fontName),
             ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
             ('TOPPADDING', (0, 0), (-1, -1), 6),
             ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
@@ -147,57 +90,9 @@ def generate_quiz_pdf(assessment_data):
     if exec_skills:
         content.append(Paragraph('Executive Function Skills', heading_style))
         skills_text = ', '.join(exec_skills)
-        content.append(Paragraph(skills_text, normal_style))
+        content.append(Paragraph(inline_markup(skills_text), normal_style))
         content.append(Spacer(1, 0.2 * inch))
     
-    # Create style for question box
-    question_style = ParagraphStyle(
-        'Question',
-        parent=styles['Normal'],
-        fontSize=11,
-        leftIndent=10,
-        rightIndent=10,
-        spaceBefore=5,
-        spaceAfter=5,
-        leading=14  # Increased line spacing
-    )
-    
-    # Create style for executive function strategy with a box
-    strategy_style = ParagraphStyle(
-        'Strategy',
-        parent=styles['Normal'],
-        fontSize=10,
-        leftIndent=10,
-        rightIndent=10,
-        spaceBefore=5,
-        spaceAfter=5,
-        borderWidth=1,
-        borderColor=colors.black,
-        borderPadding=5,
-        borderRadius=5,
-        backColor=colors.lightgrey.clone(alpha=0.3)
-    )
-    
-    # Create style for question options
-    option_style = ParagraphStyle(
-        'Option',
-        parent=styles['Normal'],
-        fontSize=10,
-        leftIndent=20,
-        spaceBefore=2,
-        spaceAfter=2
-    )
-    
-    # Create style for question number
-    question_number_style = ParagraphStyle(
-        'QuestionNumber',
-        parent=styles['Heading3'],
-        fontSize=12,
-        textColor=colors.white,
-        fontName='Helvetica-Bold',
-        alignment=1  # Center alignment
-    )
-    
     # Add a decorative header for the assessment questions
     content.append(Spacer(1, 0.1 * inch))
     
@@ -205,6 +100,29 @@ def generate_quiz_pdf(assessment_data):
     content.append(Paragraph('Assessment Questions', heading_style))
     content.append(Spacer(1, 0.2 * inch))
     
+    return content
+
+def build_quiz_story(assessment_data, styles):
+    """
+    Build the flowables for an assessment document
+
+    Args:
+        assessment_data: The assessment data from the API request
+        styles: The shared styles from get_pdf_styles()
+
+    Returns:
+        list: ReportLab flowables
+    """
+    assessment = assessment_data.assessment
+
+    subheading_style = styles['subheading']
+    normal_style = styles['normal']
+    bold_label_style = styles['bold_label']
+    question_style = styles['question']
+    option_style = styles['option']
+    
+    content = build_quiz_header(assessment_data, styles)
+    
     # Check if we have structured questions data
     if hasattr(assessment, 'questions') and assessment.questions:
         # Use the structured questions data
@@ -217,19 +135,13 @@ def generate_quiz_pdf(assessment_data):
             
             # Add question number and type
             if hasattr(question, 'type') and question.type:
-                question_elements.append(Paragraph(f"<b>Question {question_num}</b> <i>({question.type})</i>", subheading_style))
+                question_elements.append(Paragraph(f"<b>Question {question_num}</b> <i>({inline_markup(question.type)})</i>", subheading_style))
             else:
                 question_elements.append(Paragraph(f"<b>Question {question_num}</b>", subheading_style))
             
             # Add the question text with proper formatting
             if hasattr(question, 'text') and question.text:
-                # Clean markdown characters from the text
-                cleaned_text = question.text
-                cleaned_text = cleaned_text.replace('**', '')  # Remove bold markdown
-                cleaned_text = cleaned_text.replace('##', '')  # Remove heading markdown
-                cleaned_text = cleaned_text.replace('*', '')   # Remove italic markdown
-                
-                question_elements.append(Paragraph(cleaned_text, question_style))
+                question_elements.extend(markdown_to_flowables(question.text, styles, question_style))
             else:
                 question_elements.append(Paragraph("No question text available", question_style))
             
@@ -237,73 +149,59 @@ def generate_quiz_pdf(assessment_data):
             if hasattr(question, 'options') and question.options:
                 # Add each option as a separate paragraph instead of a list
                 for option in question.options:
-                    # Clean markdown characters from options
-                    cleaned_option = option
-                    cleaned_option = cleaned_option.replace('**', '')  # Remove bold markdown
-                    cleaned_option = cleaned_option.replace('##', '')  # Remove heading markdown
-                    cleaned_option = cleaned_option.replace('*', '')   # Remove italic markdown
-                    
                     # Add each option as a separate paragraph with proper indentation
-                    question_elements.append(Paragraph(cleaned_option, option_style))
+                    question_elements.append(Paragraph(inline_markup(option), option_style))
                     # Add a small space between options
                     question_elements.append(Spacer(1, 0.05 * inch))
             
             # Add executive function strategy if available with simple styling
             if hasattr(question, 'strategy') and question.strategy:
                 question_elements.append(Spacer(1, 0.1 * inch))
-                
-                # Clean markdown characters from strategy
-                cleaned_strategy = question.strategy
-                cleaned_strategy = cleaned_strategy.replace('**', '')  # Remove bold markdown
-                cleaned_strategy = cleaned_strategy.replace('##', '')  # Remove heading markdown
-                cleaned_strategy = cleaned_strategy.replace('*', '')   # Remove italic markdown
-                
                 question_elements.append(Paragraph("<b>Executive Function Strategy:</b>", bold_label_style))
-                question_elements.append(Paragraph(cleaned_strategy, normal_style))
+                question_elements.extend(markdown_to_flowables(question.strategy, styles))
             
             # Add each element to the content directly
             for element in question_elements:
                 content.append(element)
             
             # Add a thin separator line between questions
-            separator = Table([['']],  colWidths=[5.5 * inch])
-            separator.setStyle(TableStyle([
-                ('LINEBELOW', (0, 0), (-1, -1), 0.5, colors.lightgrey),
-                ('TOPPADDING', (0, 0), (-1, -1), 0),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 0),
-            ]))
-            content.append(separator)
+            content.append(question_separator())
             content.append(Spacer(1, 0.2 * inch))  # Space between questions
     else:
-        # Parse the markdown content
-        assessment_text = assessment.content
-        
-        # Split the content by question patterns
-        # Look for patterns like "1.", "Question 1:", etc.
-        question_pattern = r'(?:^|\n)(?:\d+\.\s+|\*\*Question\s+\d+\*\*:?\s+|Question\s+\d+:?\s+)'
-        questions = re.split(question_pattern, assessment_text)
-        
-        # Remove any empty strings from the split
-        questions = [q.strip() for q in questions if q.strip()]
-        
-        # Process each question
-        for i, question_text in enumerate(questions):
-            question_num = i + 1
-            
+        # Parse the markdown content, split on "### Question N" style headings
+        intro, questions = split_questions(assessment.content)
+        if intro:
+            # Instructions or a passage given before the first question
+            content.extend(markdown_to_flowables(intro, styles))
+            content.append(Spacer(1, 0.2 * inch))
+        for question_num, question_text in questions:
             # Simple question formatting for unstructured content
             content.append(Paragraph(f"<b>Question {question_num}</b>", subheading_style))
-            content.append(Paragraph(question_text, question_style))
+            content.extend(markdown_to_flowables(question_text, styles, question_style))
             
             # Add a thin separator line between questions
-            separator = Table([['']],  colWidths=[5.5 * inch])
-            separator.setStyle(TableStyle([
-                ('LINEBELOW', (0, 0), (-1, -1), 0.5, colors.lightgrey),
-                ('TOPPADDING', (0, 0), (-1, -1), 0),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 0),
-            ]))
-            content.append(separator)
+            content.append(question_separator())
             content.append(Spacer(1, 0.2 * inch))
     
+    return content
+
+def generate_quiz_pdf(assessment_data):
+    """
+    Generate a PDF document from assessment data
+    
+    Args:
+        assessment_data: The assessment data from the API request
+        
+    Returns:
+        bytes: The generated PDF as bytes
+    """
+    # Create a buffer to store the PDF
+    buffer = BytesIO()
+    
+    # Create a PDF document
+    doc = create_document(buffer)
+    content = build_quiz_story(assessment_data, get_pdf_styles(getattr(assessment_data, 'font', None)))
+    
     # Build the PDF with page numbers
     doc.build(content, onFirstPage=add_page_number, onLaterPages=add_page_number)
     
@@ -0,0 +1,460 @@
+import random
+import re
+import zipfile
+from io import BytesIO
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.pdfgen.canvas import Canvas
+from reportlab.platypus import BaseDocTemplate, PageTemplate, Frame, Flowable, Paragraph, Spacer, PageBreak, Table, TableStyle
+from app.services.pdf_common import PAGE_MARGIN, get_pdf_styles
+from app.services.pdf_markdown import inline_markup, markdown_to_flowables, split_questions
+from app.services.pdf_quiz_service import build_quiz_header
+from app.services.pdf_export_service import safe_filename
+
+# Width of the single frame on a letter page with one inch margins
+FRAME_WIDTH = letter[0] - 2 * PAGE_MARGIN
+FRAME_HEIGHT = letter[1] - 2 * PAGE_MARGIN
+
+OPTION_LETTERS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+# Space reserved left of each option's text for its letter
+_OPTION_GUTTER = 18
+_QUESTION_GAP = 0.2 * inch
+# Question/answer pairs per row of the answer key grid
+_KEY_COLUMNS = 5
+
+# "A) 4", "(b) 4", "C. 4" - labels are dropped and redrawn per version
+_OPTION_LABEL_RE = re.compile(r'^\s*\(?([A-Ha-h])[).:]\s+')
+# "- A) 4" option lines inside markdown questions
+_MARKDOWN_OPTION_RE = re.compile(r'^\s*(?:[-*+•]\s*)?\(?([A-Ha-h])[).:]\s+(.*)$')
+# "**Answer**: C", "Correct answer: C) 4", "**Explanation:** ..."
+_ANSWER_RE = re.compile(r'^\s*\**\s*(?:correct\s+)?answer\s*\**\s*:\s*\**\s*(.*?)\s*$', re.IGNORECASE)
+_EXPLANATION_RE = re.compile(r'^\s*\**\s*explanation\s*\**\s*:\s*\**\s*(.*?)\s*$', re.IGNORECASE)
+# "C", "(c)", "C." - an answer that is only an option letter
+_ANSWER_LETTER_RE = re.compile(r'^\s*\(?([A-Za-z])[).:]?\s*$')
+
+
+def _strip_option_label(option):
+    return _OPTION_LABEL_RE.sub('', option, count=1)
+
+
+def _normalize(text):
+    return re.sub(r'[\s*]+', ' ', text or '').strip().lower()
+
+
+def _answer_index(answer, options):
+    """
+    Index of the correct option, from either its letter or its text
+
+    A letter is only taken as such when it is the whole answer ("C") or
+    labels the text of that same option ("C) 4"), so an answer like
+    "A prime number" is matched by its text.
+
+    Returns:
+        int | None: Position in `options`, or None when it cannot be resolved
+    """
+    if not answer or not options:
+        return None
+    match = _ANSWER_LETTER_RE.match(answer) or _OPTION_LABEL_RE.match(answer)
+    if match:
+        index = OPTION_LETTERS.index(match.group(1).upper())
+        labelled_text = _normalize(answer[match.end():])
+        if index < len(options) and (not labelled_text or labelled_text == _normalize(options[index])):
+            return index
+    wanted = _normalize(_strip_option_label(answer))
+    for index, option in enumerate(options):
+        if _normalize(option) == wanted:
+            return index
+    return None
+
+
+def _parse_markdown_question(body):
+    """
+    Split one markdown question into stem, options, trailing text, answer and explanation
+    """
+    stem, options, trailing = [], [], []
+    answer = explanation = None
+    for line in body.splitlines():
+        match = _ANSWER_RE.match(line)
+        if match:
+            answer = match.group(1)
+            continue
+        match = _EXPLANATION_RE.match(line)
+        if match:
+            explanation = match.group(1)
+            continue
+        match = _MARKDOWN_OPTION_RE.match(line)
+        if match and not trailing:
+            options.append(match.group(2))
+            continue
+        (trailing if options else stem).append(line)
+    return '\n'.join(stem), options, '\n'.join(trailing), answer, explanation
+
+
+class MeasuredQuestion:
+    """
+    One question laid out once at the frame width.
+
+    Each piece keeps its wrapped flowable and height, so every version can
+    place the same pieces in a different order without wrapping any text
+    again. Question numbers and option letters are the only parts that vary
+    between versions, and those are drawn directly on the canvas.
+    """
+
+    def __init__(self, stem, options, trailing, answer, explanation, question_type, styles, canv):
+        self.canv = canv
+        self.styles = styles
+        self.question_type = question_type
+        self.explanation = explanation
+        self.answer_text = answer
+        self.answer = _answer_index(answer, options)
+
+        question_style = styles['question']
+        option_style = styles['option']
+        self.option_text_style = ParagraphStyle('OptionText', parent=option_style, leftIndent=0)
+
+        self.stem = [self._measure(f, FRAME_WIDTH) for f in markdown_to_flowables(stem, styles, question_style)]
+        if not self.stem:
+            self.stem = [self._measure(Paragraph("No question text available", question_style), FRAME_WIDTH)]
+        self.options = [
+            self._measure(Paragraph(inline_markup(option), self.option_text_style),
+                          FRAME_WIDTH - option_style.leftIndent - _OPTION_GUTTER)
+            for option in options
+        ]
+        self.trailing = [self._measure(f, FRAME_WIDTH) for f in markdown_to_flowables(trailing, styles)]
+
+    def _measure(self, flowable, width):
+        _, height = flowable.wrapOn(self.canv, width, FRAME_HEIGHT)
+        return (flowable, height, flowable.getSpaceBefore(), flowable.getSpaceAfter())
+
+    def rows(self, number, option_order):
+        """
+        Drawing rows for this question as numbered `number` with options in `option_order`
+
+        Returns:
+            list: (height, draw) tuples; draw(canvas, x, top) paints the row below `top`
+        """
+        header_style = self.styles['subheading']
+        option_style = self.styles['option']
+        header = f"Question {number}"
+        if self.question_type:
+            header += f" ({self.question_type})"
+
+        def draw_header(c, x, top):
+            c.setFont(header_style.fontName, header_style.fontSize)
+            c.setFillColor(header_style.textColor)
+            c.drawString(x, top - header_style.spaceBefore - header_style.fontSize, header)
+
+        rows = [(header_style.spaceBefore + header_style.leading + header_style.spaceAfter, draw_header)]
+        rows.extend(self._piece_row(piece) for piece in self.stem)
+        for position, original in enumerate(option_order):
+            rows.append(self._option_row(OPTION_LETTERS[position], self.options[original], option_style))
+        rows.extend(self._piece_row(piece) for piece in self.trailing)
+
+        def draw_rule(c, x, top):
+            c.setStrokeColor(colors.lightgrey)
+            c.setLineWidth(0.5)
+            c.line(x, top - 4, x + 5.5 * inch, top - 4)
+
+        rows.append((4 + _QUESTION_GAP, draw_rule))
+        return rows
+
+    @staticmethod
+    def _piece_row(piece):
+        flowable, height, before, after = piece
+
+        def draw(c, x, top):
+            flowable.drawOn(c, x, top - before - height)
+
+        return (before + height + after, draw)
+
+    def _option_row(self, label, piece, option_style):
+        paragraph, height, before, after = piece
+        style = self.option_text_style
+
+        def draw(c, x, top):
+            bottom = top - before - height
+            c.setFont(style.fontName, style.fontSize)
+            c.setFillColor(style.textColor)
+            # Same baseline as the paragraph's first line
+            c.drawString(x + option_style.leftIndent, bottom + height - style.fontSize, f"{label})")
+            paragraph.drawOn(c, x + option_style.leftIndent + _OPTION_GUTTER, bottom)
+
+        return (before + height + after + 0.05 * inch, draw)
+
+
+class QuestionBlock(Flowable):
+    """
+    A question placed from pre-measured rows; wrapping it costs nothing.
+
+    The block is kept on one page when it fits on a page at all, and is only
+    split between rows when it is taller than a whole frame.
+    """
+
+    def __init__(self, rows):
+        Flowable.__init__(self)
+        self.rows = rows
+        self.height = sum(height for height, _ in rows)
+
+    def wrap(self, availWidth, availHeight):
+        self.width = availWidth
+        return (availWidth, self.height)
+
+    def split(self, availWidth, availHeight):
+        if self.height <= FRAME_HEIGHT or len(self.rows) < 2:
+            return []
+        used = 0
+        for index, (height, _) in enumerate(self.rows):
+            if used + height > availHeight:
+                break
+            used += height
+        if index == 0:
+            return []
+        return [QuestionBlock(self.rows[:index]), QuestionBlock(self.rows[index:])]
+
+    def draw(self):
+        top = self.height
+        for height, draw in self.rows:
+            draw(self.canv, 0, top)
+            top -= height
+
+
+class VersionStart(Flowable):
+    """
+    Zero-size marker at the start of each version, restarting its page count
+    """
+
+    def __init__(self, label):
+        Flowable.__init__(self)
+        self.label = label
+
+    def wrap(self, availWidth, availHeight):
+        return (0, 0)
+
+    def draw(self):
+        pass
+
+
+class VersionedQuizDocTemplate(BaseDocTemplate):
+    """
+    Single-frame document whose footer names the current version and its page
+    """
+
+    def __init__(self, filename, **kwargs):
+        BaseDocTemplate.__init__(self, filename, **kwargs)
+        self.version_label = ""
+        self.version_first_page = 1
+        frame = Frame(self.leftMargin, self.bottomMargin, self.width, self.height, id='normal')
+        self.addPageTemplates([PageTemplate(id='quiz', frames=[frame], onPageEnd=self._decorate_page)])
+
+    def afterFlowable(self, flowable):
+        if isinstance(flowable, VersionStart):
+            self.version_label = flowable.label
+            self.version_first_page = self.page
+
+    def _decorate_page(self, c, doc):
+        text = f"Page {self.page - self.version_first_page + 1}"
+        if self.version_label:
+            text = f"{self.version_label} - {text}"
+        c.saveState()
+        c.setFont("Helvetica", 9)
+        c.setFillColor(colors.grey)
+        c.drawRightString(doc.pagesize[0] - PAGE_MARGIN, PAGE_MARGIN / 2, text)
+        c.restoreState()
+
+
+def measure_questions(assessment, styles):
+    """
+    Lay out every question of an assessment once
+
+    Args:
+        assessment: The AssessmentModel from the request
+        styles: The shared styles from get_pdf_styles()
+
+    Returns:
+        list: MeasuredQuestion objects in their original order
+    """
+    # Lists and tables need a canvas to measure against; nothing is drawn on it
+    canv = Canvas(BytesIO())
+    measured = []
+    if assessment.questions:
+        for question in assessment.questions:
+            options = [_strip_option_label(option) for option in (question.options or [])]
+            measured.append(MeasuredQuestion(
+                question.text or '', options, question.strategy or '',
+                question.answer, question.explanation, question.type, styles, canv
+            ))
+    else:
+        _, questions = split_questions(assessment.content)
+        for _, body in questions:
+            stem, options, trailing, answer, explanation = _parse_markdown_question(body)
+            measured.append(MeasuredQuestion(stem, options, trailing, answer, explanation, None, styles, canv))
+    return measured
+
+
+def plan_versions(measured, versions, seed, shuffle_questions=True, shuffle_options=True):
+    """
+    Question and option orders for each version
+
+    Version A keeps the original order; the others are shuffled with a
+    generator seeded from `seed`, so the same request always produces the
+    same versions.
+
+    Returns:
+        list: (label, question order, option orders) per version
+    """
+    rng = random.Random(seed)
+    plans = []
+    for v in range(versions):
+        question_order = list(range(len(measured)))
+        option_orders = [list(range(len(question.options))) for question in measured]
+        if v > 0:
+            if shuffle_questions:
+                rng.shuffle(question_order)
+            if shuffle_options:
+                for order in option_orders:
+                    rng.shuffle(order)
+        plans.append((f"Version {OPTION_LETTERS[v]}", question_order, option_orders))
+    return plans
+
+
+def build_version_story(assessment_data, styles, measured, plan, intro=''):
+    """
+    Flowables for one version, assembled from the pre-measured questions,
+    with the markdown intro (text before the first question) kept in place
+    """
+    label, question_order, option_orders = plan
+    content = [VersionStart(label)]
+    content.extend(build_quiz_header(assessment_data, styles, subtitle=label))
+    if intro:
+        content.extend(markdown_to_flowables(intro, styles))
+        content.append(Spacer(1, 0.2 * inch))
+    for number, original in enumerate(question_order, start=1):
+        content.append(QuestionBlock(measured[original].rows(number, option_orders[original])))
+    return content
+
+
+def build_answer_key_story(assessment_data, styles, measured, plans, seed):
+    """
+    Flowables for the answer key: a compact grid of answers per version,
+    followed by one explanation per question numbered as in Version A
+    """
+    assessment = assessment_data.assessment
+    title = assessment.title or f"{assessment.subject or ''} Assessment"
+    content = [
+        VersionStart("Answer Key"),
+        Paragraph(inline_markup(f"{title} - Answer Key"), styles['title']),
+        Paragraph(f"Seed {seed}", styles['normal']),
+        Spacer(1, 0.2 * inch),
+    ]
+
+    grid_style = TableStyle([
+        ('FONTNAME', (0, 0), (-1, -1), styles['normal'].fontName),
+        ('FONTNAME', (1, 0), (-1, -1), styles['bold_label'].fontName),
+        ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
+        ('TOPPADDING', (0, 0), (-1, -1), 2),
+    ] + [('TEXTCOLOR', (col, 0), (col, -1), colors.grey) for col in range(0, 2 * _KEY_COLUMNS, 2)]
+      + [('FONTNAME', (col, 0), (col, -1), styles['normal'].fontName) for col in range(0, 2 * _KEY_COLUMNS, 2)])
+
+    for label, question_order, option_orders in plans:
+        cells = []
+        for number, original in enumerate(question_order, start=1):
+            question = measured[original]
+            if question.answer is not None:
+                answer = OPTION_LETTERS[option_orders[original].index(question.answer)]
+            else:
+                # Free-text answers are listed with the explanations
+                answer = '*' if question.answer_text else '-'
+            cells.extend([f"{number}.", answer])
+        cells.extend([''] * (-len(cells) % (2 * _KEY_COLUMNS)))
+        rows = [cells[i:i + 2 * _KEY_COLUMNS] for i in range(0, len(cells), 2 * _KEY_COLUMNS)]
+
+        content.append(Paragraph(label, styles['heading']))
+        if rows:
+            grid = Table(rows, colWidths=[0.35 * inch, 0.75 * inch] * _KEY_COLUMNS)
+            grid.setStyle(grid_style)
+            content.append(grid)
+        content.append(Spacer(1, 0.2 * inch))
+
+    explained = [
+        (number, question) for number, question in enumerate(measured, start=1)
+        if question.explanation or (question.answer is None and question.answer_text)
+    ]
+    if explained:
+        content.append(Paragraph('Explanations', styles['heading']))
+        for number, question in explained:
+            markup = f"<b>{number}.</b>"
+            if question.answer is None and question.answer_text:
+                markup += f" <b>Answer:</b> {inline_markup(question.answer_text)}"
+            if question.explanation:
+                markup += f" {inline_markup(question.explanation)}"
+            content.append(Paragraph(markup, styles['normal']))
+    return content
+
+
+def _render(stories, title):
+    buffer = BytesIO()
+    doc = VersionedQuizDocTemplate(
+        buffer,
+        pagesize=letter,
+        rightMargin=PAGE_MARGIN,
+        leftMargin=PAGE_MARGIN,
+        topMargin=PAGE_MARGIN,
+        bottomMargin=PAGE_MARGIN,
+        title=title
+    )
+    content = []
+    for story in stories:
+        if content:
+            content.append(PageBreak())
+        content.extend(story)
+    doc.build(content)
+    pdf_bytes = buffer.getvalue()
+    buffer.close()
+    return pdf_bytes
+
+
+def generate_quiz_versions(versions_data):
+    """
+    Generate shuffled versions of an assessment plus an answer key
+
+    Every question is wrapped once; each version only places the measured
+    pieces in its own order and draws question numbers and option letters,
+    so text layout is paid once however many versions are requested.
+
+    Args:
+        versions_data: The QuizVersionsPDF data from the API request
+
+    Returns:
+        bytes: One PDF with every version followed by the answer key, or a
+            ZIP with one PDF per version and one for the key when
+            versions_data.format is "zip"
+    """
+    styles = get_pdf_styles(versions_data.font)
+    seed = versions_data.seed
+    if seed is None:
+        seed = random.randrange(2 ** 31)
+
+    assessment = versions_data.assessment
+    measured = measure_questions(assessment, styles)
+    intro = '' if assessment.questions else split_questions(assessment.content)[0]
+    plans = plan_versions(measured, versions_data.versions, seed,
+                          versions_data.shuffleQuestions, versions_data.shuffleOptions)
+
+    title = assessment.title or 'Assessment'
+    version_stories = [build_version_story(versions_data, styles, measured, plan, intro) for plan in plans]
+    key_story = build_answer_key_story(versions_data, styles, measured, plans, seed)
+
+    if versions_data.format != "zip":
+        return _render(version_stories + [key_story], title)
+
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_STORED) as archive:
+        for (label, _, _), story in zip(plans, version_stories):
+            archive.writestr(safe_filename(f"{title}_{label}.pdf").replace(' ', '_'), _render([story], f"{title} {label}"))
+        archive.writestr(safe_filename(f"{title}_Answer_Key.pdf").replace(' ', '_'), _render([key_story], f"{title} Answer Key"))
+    return buffer.getvalue()
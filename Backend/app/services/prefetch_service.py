@@ -0,0 +1,137 @@
+"""
+Speculative retrieval while a teacher fills in a generation form.
+
+The lesson plan and quiz forms call /prefetch once grade, topic and
+subtopic are chosen, a few seconds before they are submitted. That runs
+the request's retrieval (query embeddings and Chroma queries) under a
+RetrievalCache kept in the form's slot, so the submit finds its lesson
+chunks ready and only embeds and queries the skills chosen since. Each
+form session has one slot per kind: a newer prefetch supersedes the
+older one, which is cancelled if it hasn't started yet.
+
+Slots live in this process. Behind several workers without sticky
+sessions a submit can land on another one, and simply retrieves as usual.
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from starlette.concurrency import run_in_threadpool
+from app.config import PREFETCH_TTL_SECONDS, PREFETCH_CONCURRENCY, PREFETCH_MAX_SLOTS
+from app.metrics import cache_lookup
+from .retrieval_cache import RetrievalCache, use_retrieval_cache
+
+logger = logging.getLogger(__name__)
+
+
+def lesson_of(request):
+    """ The lesson a generation request is for, ignoring its executive skills """
+    return (request.subject, request.grade.strip(), request.topic.strip(), (request.subtopic or "").strip())
+
+
+class _Slot:
+    def __init__(self, lesson, cache):
+        self.lesson = lesson
+        self.cache = cache
+        self.task = None
+        self.started = False
+        self.expires_at = time.monotonic() + PREFETCH_TTL_SECONDS
+
+    def matches(self, lesson):
+        return self.lesson == lesson and self.expires_at > time.monotonic()
+
+    def cancel(self):
+        # Only while waiting for its turn: retrieval already in its thread
+        # can't be interrupted, and keeps its place in the concurrency cap
+        # until it ends
+        if not self.started:
+            self.task.cancel()
+
+
+class PrefetchSlots:
+    """
+    One prefetch per form session and kind, with a cap on how many run at once
+
+    Only used from the event loop.
+    """
+
+    def __init__(self, max_slots=PREFETCH_MAX_SLOTS, concurrency=PREFETCH_CONCURRENCY):
+        self.max_slots = max_slots
+        self._slots = OrderedDict()
+        self._running = asyncio.Semaphore(concurrency)
+
+    def start(self, session, kind, lesson, retrieve):
+        """
+        Start a prefetch in the session's slot, superseding the slot's last one
+
+        Args:
+            session: Identifies the form being filled in
+            kind: "lesson_plan" or "assessment"
+            lesson: The lesson it is for, from lesson_of
+            retrieve: Function running the retrieval, called in the thread pool
+
+        Returns:
+            bool: True when the slot already held results for this lesson,
+                which are kept and added to
+        """
+        key = (session, kind)
+        previous = self._slots.pop(key, None)
+        reused = previous is not None and previous.matches(lesson)
+        if previous is not None:
+            previous.cancel()
+        slot = _Slot(lesson, previous.cache if reused else RetrievalCache(label="prefetch_retrieval"))
+        slot.task = asyncio.ensure_future(self._run(slot, retrieve))
+        self._slots[key] = slot
+        while len(self._slots) > self.max_slots:
+            _, evicted = self._slots.popitem(last=False)
+            evicted.cancel()
+        return reused
+
+    async def _run(self, slot, retrieve):
+        async with self._running:
+            slot.started = True
+            use_retrieval_cache(slot.cache)
+            try:
+                await run_in_threadpool(retrieve)
+            except Exception as e:
+                # The submit retrieves whatever is missing itself
+                logger.info(f"Prefetch failed: {e}")
+
+    async def take(self, session, kind, lesson):
+        """
+        The retrieval cache prefetched for this session's lesson, or None
+
+        Waits for a prefetch that is already running, since the request
+        would otherwise repeat the same retrieval; one still waiting for
+        its turn is cancelled instead. The slot is kept until it expires,
+        so a second submit of the same form reuses it too.
+        """
+        slot = self._slots.get((session, kind))
+        if slot is None or not slot.matches(lesson):
+            cache_lookup("prefetch", False)
+            return None
+        cache_lookup("prefetch", slot.started)
+        slot.cancel()
+        if not slot.task.done():
+            await asyncio.wait({slot.task})
+        return slot.cache
+
+
+prefetch_slots = PrefetchSlots()
+
+
+def session_key(user, session_id):
+    """ A form session: the user plus the id the page sends in X-Prefetch-Session """
+    return user["email"], session_id or ""
+
+
+async def use_prefetched(user, session_id, kind, request):
+    """
+    Let the current request's retrieval reuse what its form prefetched
+
+    Call from the route before the pipeline starts; the cache is picked up
+    by the threads the request's work runs in.
+    """
+    cache = await prefetch_slots.take(session_key(user, session_id), kind, lesson_of(request))
+    if cache is not None:
+        use_retrieval_cache(cache)
@@ -0,0 +1,104 @@
+"""
+Generation cache pre-warming.
+
+Once a day, during the off-peak hours PREWARM_HOURS (UTC), one worker
+runs a "prewarm" job: it takes the PREWARM_TOP_K most requested lesson
+plan and assessment combinations of the analytics window and generates
+every one whose pre-warmed response is missing or past half its
+lifetime, so the day's requests for them are cache hits (unless they send
+Cache-Control: no-cache). Generation goes
+through the low-priority LLM class and never competes with interactive
+requests in the same worker.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from pydantic import BaseModel
+from pymongo.errors import DuplicateKeyError
+from app import analytics
+from app.config import PREWARM_TOP_K, PREWARM_HOURS, GENERATION_CACHE_TTL_SECONDS, LLM_BACKGROUND_CONCURRENCY
+from app.jobs import PRIORITY_BULK, enqueue
+from app.logs import fields
+from .generation_cache import generation_cache
+from .llm import use_background_priority
+
+logger = logging.getLogger(__name__)
+
+# How often workers check whether today's pre-warming is due
+SCHEDULE_CHECK_SECONDS = 300
+
+
+# Worker job parameters
+class PrewarmJob(BaseModel):
+    top_k: int = PREWARM_TOP_K
+
+
+def in_prewarm_hours(hour, hours=PREWARM_HOURS):
+    """ Whether a UTC hour is in a "start-end" window (end exclusive, may wrap midnight) """
+    start, _, end = hours.partition("-")
+    start, end = int(start), int(end or start)
+    return start <= hour < end if start <= end else hour >= start or hour < end
+
+
+async def run_prewarm(top_k, producers):
+    """
+    Generate the cached responses of the most popular combinations
+
+    Args:
+        top_k: How many combinations to consider
+        producers: Job kind -> (request model, function building the response)
+
+    Returns:
+        dict: Counts of candidates, generated, fresh (skipped) and failed
+    """
+    use_background_priority()
+    candidates = [candidate for candidate in await analytics.popular(top_k) if candidate["kind"] in producers]
+    # Fresh enough to last through the coming peak
+    refresh_before = datetime.utcnow() + timedelta(seconds=GENERATION_CACHE_TTL_SECONDS / 2)
+    counts = {"candidates": len(candidates), "generated": 0, "fresh": 0, "failed": 0}
+    slots = asyncio.Semaphore(max(1, LLM_BACKGROUND_CONCURRENCY))
+
+    async def prewarm(candidate):
+        expires_at = await generation_cache.expires_at(candidate["key"])
+        if expires_at and expires_at > refresh_before:
+            counts["fresh"] += 1
+            return
+        model, produce = producers[candidate["kind"]]
+        async with slots:
+            try:
+                response = await asyncio.to_thread(produce, model(**candidate["params"]))
+            except Exception as e:
+                counts["failed"] += 1
+                logger.warning(f"Pre-warming failed: {e}", extra=fields(kind=candidate["kind"], params=candidate["params"]))
+                return
+        await generation_cache.put(candidate["key"], candidate["kind"], candidate["params"], response, prewarmed=True)
+        counts["generated"] += 1
+
+    await asyncio.gather(*(prewarm(candidate) for candidate in candidates))
+    await analytics.record_prewarm(counts["generated"])
+    logger.info("Pre-warming finished", extra=fields(**counts))
+    return counts
+
+
+async def schedule_prewarm(stop):
+    """
+    Queue today's pre-warming job once the off-peak hours begin
+
+    Every worker runs this; the job id is the date, so only the first
+    worker to get there queues it.
+    """
+    while PREWARM_TOP_K > 0 and not stop.is_set():
+        now = datetime.utcnow()
+        if in_prewarm_hours(now.hour):
+            try:
+                await enqueue("prewarm", PrewarmJob().dict(), "system", PRIORITY_BULK,
+                              job_id=f"prewarm-{now:%Y-%m-%d}")
+                logger.info("Queued today's pre-warming")
+            except DuplicateKeyError:
+                pass
+            except Exception as e:
+                logger.warning(f"Queueing pre-warming failed: {e}")
+        try:
+            await asyncio.wait_for(stop.wait(), SCHEDULE_CHECK_SECONDS)
+        except asyncio.TimeoutError:
+            pass
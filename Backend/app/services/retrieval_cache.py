@@ -0,0 +1,81 @@
+"""
+Retrieval shared between the items of a bulk run, or between a prefetch
+and the request it prepared for.
+
+Bulk items for the same topic under different executive-skill profiles
+run the same lesson queries, and every item asks for the same few skill
+strategies. While a RetrievalCache is in use (use_retrieval_cache), query
+embeddings and Chroma query results are computed once and reused by every
+item; outside a bulk run or prefetched request both helpers pass straight
+through.
+"""
+import contextvars
+import json
+import threading
+from app.metrics import cache_lookup
+from .embedding_client import get_embedder
+
+_current = contextvars.ContextVar("retrieval_cache", default=None)
+
+
+class RetrievalCache:
+    """ Embeddings by query text and query results by collection and query """
+
+    def __init__(self, label="bulk_retrieval"):
+        # Cache name for the lookup metrics
+        self.label = label
+        self.embeddings = {}
+        self.results = {}
+        self.lock = threading.Lock()
+
+
+def use_retrieval_cache(cache):
+    """ Share retrieval through cache in the current context (and threads started from it) """
+    _current.set(cache)
+
+
+def encode_queries(texts):
+    """
+    Embed query strings, reusing embeddings already in the current cache
+
+    Returns:
+        list: One embedding per string, in order
+    """
+    cache = _current.get()
+    if cache is None:
+        return get_embedder().encode(texts)
+    with cache.lock:
+        missing = [text for text in dict.fromkeys(texts) if text not in cache.embeddings]
+    if missing:
+        embeddings = get_embedder().encode(missing)
+        with cache.lock:
+            cache.embeddings.update(zip(missing, embeddings))
+    with cache.lock:
+        return [cache.embeddings[text] for text in texts]
+
+
+class _SharedCollection:
+    def __init__(self, collection, cache):
+        self.collection = collection
+        self.cache = cache
+
+    def query(self, query_embeddings, **kwargs):
+        key = (
+            self.collection.name,
+            tuple(tuple(embedding) for embedding in query_embeddings),
+            json.dumps(kwargs, sort_keys=True),
+        )
+        with self.cache.lock:
+            result = self.cache.results.get(key)
+        cache_lookup(self.cache.label, result is not None)
+        if result is None:
+            result = self.collection.query(query_embeddings=query_embeddings, **kwargs)
+            with self.cache.lock:
+                self.cache.results[key] = result
+        return result
+
+
+def shared_collection(collection):
+    """ The collection, with query() going through the current cache if there is one """
+    cache = _current.get()
+    return collection if cache is None else _SharedCollection(collection, cache)
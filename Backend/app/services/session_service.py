@@ -0,0 +1,63 @@
+import hashlib
+import secrets
+from datetime import datetime, timedelta
+from app.database import sessions_collection, users_collection
+from app.config import SESSION_EXPIRE_MINUTES
+
+# Never send these user fields back to the browser
+USER_PROJECTION = {"_id": 0, "password": 0}
+
+
+def _token_hash(token):
+    # Only the hash is stored, so a leaked sessions collection holds no usable tokens
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+async def create_session(email):
+    """
+    Start a login session for a user
+
+    Args:
+        email: The user's email, as stored in the users collection
+
+    Returns:
+        str: The opaque session token to hand to the browser
+    """
+    token = secrets.token_urlsafe(32)
+    now = datetime.utcnow()
+    await sessions_collection.insert_one({
+        "token_hash": _token_hash(token),
+        "email": email,
+        "created_at": now,
+        "expires_at": now + timedelta(minutes=SESSION_EXPIRE_MINUTES)
+    })
+    return token
+
+
+async def get_session_user(token):
+    """
+    Look up the user behind a session token
+
+    Both lookups go through unique indexes (sessions.token_hash and
+    users.email). The expiry is checked here as well, because Mongo's TTL
+    monitor only removes expired sessions about once a minute.
+
+    Args:
+        token: The session token from the browser
+
+    Returns:
+        dict | None: The user without _id or password, or None when the
+            session does not exist or has expired
+    """
+    session = await sessions_collection.find_one({
+        "token_hash": _token_hash(token),
+        "expires_at": {"$gt": datetime.utcnow()}
+    })
+    if not session:
+        return None
+    return await users_collection.find_one({"email": session["email"]}, USER_PROJECTION)
+
+
+async def delete_session(token):
+    """ End a login session """
+    await sessions_collection.delete_one({"token_hash": _token_hash(token)})
@@ -0,0 +1,113 @@
+import asyncio
+import logging
+import os
+import time
+from app.database import init_indexes
+from app.services.pdf_fonts import register_fonts
+from app.services.chroma_clients import get_chroma_client, CHROMA_STORE_PATH, ICEBREAKER_STORE_PATH
+from app.services.embedding_client import get_embedder
+from app.logs import fields
+
+logger = logging.getLogger(__name__)
+
+CHROMA_STORES = (CHROMA_STORE_PATH, ICEBREAKER_STORE_PATH)
+
+# Read size when pulling index files into the page cache
+TOUCH_CHUNK = 1 << 20
+
+
+class WarmupState:
+    """
+    Progress of the startup warm-up, reported by /ready
+    """
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.ready = False
+        self.failed = None
+        self.steps = {}
+        self.total = None
+
+    def report(self):
+        return {
+            "status": "ready" if self.ready else "failed" if self.failed else "warming",
+            "error": self.failed,
+            "steps": {name: round(seconds, 3) for name, seconds in self.steps.items()},
+            "total": round(self.total, 3) if self.total is not None else None,
+        }
+
+
+state = WarmupState()
+
+
+def touch_index_files():
+    """
+    Read every file of the Chroma stores once so the HNSW index and SQLite
+    pages are in the page cache before the first query
+
+    Returns:
+        int: Bytes read
+    """
+    total = 0
+    for store in CHROMA_STORES:
+        for root, _, files in os.walk(store):
+            for name in files:
+                with open(os.path.join(root, name), "rb") as f:
+                    while chunk := f.read(TOUCH_CHUNK):
+                        total += len(chunk)
+    return total
+
+
+def open_stores():
+    for store in CHROMA_STORES:
+        get_chroma_client(store)
+
+
+def load_embedder():
+    # Loads the model in-process, or waits on the embedding server's first batch
+    return get_embedder().encode(["warm up"])[0]
+
+
+def query_collections(embedding):
+    """
+    Run one query against every collection, which loads its HNSW segment
+    """
+    for store in CHROMA_STORES:
+        client = get_chroma_client(store)
+        # Newer Chroma versions list names rather than collection objects
+        for name in [getattr(listed, "name", listed) for listed in client.list_collections()]:
+            try:
+                client.get_collection(name).query(query_embeddings=[embedding], n_results=1, include=["distances"])
+            except Exception as e:
+                # An empty collection has nothing to load; don't hold back readiness
+                logger.warning(f"Warm-up query on {name} failed: {e}")
+
+
+async def _step(name, func, *args):
+    start = time.perf_counter()
+    result = await func(*args) if asyncio.iscoroutinefunction(func) else await asyncio.to_thread(func, *args)
+    state.steps[name] = time.perf_counter() - start
+    logger.info(f"Warm-up step {name} done", extra=fields(step=name, duration_ms=round(state.steps[name] * 1000)))
+    return result
+
+
+async def warm_up():
+    """
+    Startup warm-up: everything the first generation request would
+    otherwise pay for. The blocking steps run in a thread so the event
+    loop keeps answering /ready (503) meanwhile.
+    """
+    try:
+        await _step("fonts", register_fonts)
+        await _step("database_indexes", init_indexes)
+        await _step("touch_index_files", touch_index_files)
+        await _step("open_stores", open_stores)
+        embedding = await _step("load_embedder", load_embedder)
+        await _step("query_collections", query_collections, embedding)
+    except Exception as e:
+        state.failed = f"{type(e).__name__}: {e}"
+        logger.error(f"Warm-up failed: {state.failed}")
+        return
+    state.total = time.monotonic() - state.started
+    state.ready = True
+    logger.info("Warm-up finished", extra=fields(since_startup_ms=round(state.total * 1000)))
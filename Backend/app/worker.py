@@ -0,0 +1,144 @@
+"""
+Generation job worker.
+
+Claims jobs queued by the generation routes (?mode=job) from Mongo and
+runs them through the same pipeline as the synchronous routes. Workers
+share nothing but the database, so they scale independently of the API:
+run as many as needed, on any node.
+
+Each worker runs JOB_WORKER_CONCURRENCY jobs at once, each in a thread
+(a bulk run schedules its own items), and renews its jobs' leases while
+they run. On SIGTERM it stops claiming and finishes the jobs it holds; a
+bulk run cut short resumes from its checkpoints on another worker.
+
+Run from the Backend directory:
+    python -m app.worker [--concurrency N]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import socket
+import uuid
+from fastapi import HTTPException
+from app import jobs, warmup
+from app.config import JOB_LEASE_SECONDS, JOB_POLL_SECONDS, JOB_WORKER_CONCURRENCY
+from app.logs import setup_logging, fields, request_id_var
+from app.routers.lesson_plan_routes import LessonPlanRequest, lesson_plan_response
+from app.routers.assessment_router import AssessmentRequest, assessment_response
+from app.routers.icebreaker_routes import IceBreakerRequest, icebreaker_response
+from app.routers.bulk_routes import BulkJob, bulk_job_response
+from app.services.prewarm_service import PrewarmJob, run_prewarm, schedule_prewarm
+
+logger = logging.getLogger(__name__)
+
+# Job kinds whose responses the generation cache keeps
+CACHED_KINDS = ("lesson_plan", "assessment")
+
+
+async def prewarm_job_response(job: PrewarmJob):
+    """ Worker handler for the daily pre-warming job """
+    return await run_prewarm(job.top_k, {kind: HANDLERS[kind] for kind in CACHED_KINDS})
+
+
+# Job kind -> (request model, function producing the route's response body)
+HANDLERS = {
+    "lesson_plan": (LessonPlanRequest, lesson_plan_response),
+    "assessment": (AssessmentRequest, assessment_response),
+    "icebreaker": (IceBreakerRequest, icebreaker_response),
+    # Async: schedules the run's items on threads itself
+    "bulk": (BulkJob, bulk_job_response),
+    "prewarm": (PrewarmJob, prewarm_job_response),
+}
+
+
+async def _keep_lease(job_id, worker_id):
+    while True:
+        await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+        if not await jobs.renew_lease(job_id, worker_id):
+            logger.warning("Lost the lease on a running job", extra=fields(job_id=job_id))
+            return
+
+
+async def run_job(job, worker_id):
+    """ Run one claimed job and record its result or error """
+    # Log lines from the pipeline carry the job id as their request id
+    request_id_var.set(job["_id"])
+    model, handler = HANDLERS[job["kind"]]
+    logger.info("Job started", extra=fields(job_id=job["_id"], kind=job["kind"], attempt=job["attempts"]))
+    lease = asyncio.create_task(_keep_lease(job["_id"], worker_id))
+    try:
+        if asyncio.iscoroutinefunction(handler):
+            result = await handler(model(**job["params"]))
+        else:
+            result = await asyncio.to_thread(handler, model(**job["params"]))
+    except HTTPException as e:
+        await jobs.finish(job["_id"], worker_id, error={"status_code": e.status_code, "detail": e.detail})
+        logger.info("Job failed", extra=fields(job_id=job["_id"], status=e.status_code))
+    except Exception as e:
+        await jobs.finish(job["_id"], worker_id, error={"status_code": 500, "detail": str(e)})
+        logger.exception("Job failed", extra=fields(job_id=job["_id"]))
+    else:
+        await jobs.finish(job["_id"], worker_id, result=result)
+        logger.info("Job done", extra=fields(job_id=job["_id"]))
+    finally:
+        lease.cancel()
+
+
+async def work(worker_id, stop):
+    """ One job slot: claim and run jobs until stopped """
+    delay = JOB_POLL_SECONDS
+    while not stop.is_set():
+        try:
+            job = await jobs.claim(worker_id, HANDLERS)
+        except Exception as e:
+            logger.warning(f"Claiming a job failed: {e}")
+            job = None
+        if job is None:
+            # Back off while the queue is empty, up to 5x the poll interval
+            try:
+                await asyncio.wait_for(stop.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+            delay = min(delay * 1.5, JOB_POLL_SECONDS * 5)
+            continue
+        delay = JOB_POLL_SECONDS
+        await asyncio.create_task(run_job(job, worker_id))
+
+
+async def reap(stop):
+    """ Periodically fail jobs that used up their attempts """
+    while not stop.is_set():
+        try:
+            failed = await jobs.fail_abandoned()
+            if failed:
+                logger.warning("Failed abandoned jobs", extra=fields(count=failed))
+        except Exception as e:
+            logger.warning(f"Reaping abandoned jobs failed: {e}")
+        try:
+            await asyncio.wait_for(stop.wait(), JOB_LEASE_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def main(concurrency):
+    worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+
+    # Load the stores and the embedder before taking the first job
+    await warmup.warm_up()
+    logger.info("Worker ready", extra=fields(worker=worker_id, concurrency=concurrency))
+    await asyncio.gather(reap(stop), schedule_prewarm(stop), *(work(worker_id, stop) for _ in range(concurrency)))
+    logger.info("Worker stopped", extra=fields(worker=worker_id))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generation job worker")
+    parser.add_argument("--concurrency", type=int, default=JOB_WORKER_CONCURRENCY)
+    args = parser.parse_args()
+    setup_logging()
+    asyncio.run(main(args.concurrency))
@@ -0,0 +1,104 @@
+"""
+Cold-start benchmark: how long a fresh API process takes to become useful.
+
+Starts the app with uvicorn and reports the time until it accepts TCP
+connections, the time until /ready answers 200, and the warm-up step
+timings /ready returns. Run it on every deploy candidate and append the
+results to a file to track cold start over time.
+
+Clear the OS page cache first for a truly cold run
+(sync; echo 3 > /proc/sys/vm/drop_caches).
+
+Run from the Backend directory:
+    python -m benchmarks.bench_cold_start --runs 3 --output cold_start.jsonl
+"""
+import argparse
+import json
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import httpx
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def one_run(timeout):
+    port = free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        stdout=subprocess.DEVNULL,
+    )
+    listening = None
+    try:
+        while time.perf_counter() - start < timeout:
+            if server.poll() is not None:
+                raise SystemExit("Server exited during startup")
+            try:
+                response = httpx.get(f"http://127.0.0.1:{port}/ready", timeout=1)
+            except httpx.TransportError:
+                time.sleep(0.05)
+                continue
+            if listening is None:
+                listening = time.perf_counter() - start
+            report = response.json()
+            if response.status_code == 200:
+                return {"listening": listening, "ready": time.perf_counter() - start, "steps": report["steps"]}
+            if report["status"] == "failed":
+                raise SystemExit(f"Warm-up failed: {report['error']}")
+            time.sleep(0.05)
+        raise SystemExit(f"Not ready after {timeout} s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                              capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API cold-start benchmark")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=300, help="seconds to wait for /ready")
+    parser.add_argument("--output", help="append a JSON line with the results to this file")
+    args = parser.parse_args()
+
+    runs = []
+    for n in range(args.runs):
+        result = one_run(args.timeout)
+        runs.append(result)
+        steps = "  ".join(f"{name}={seconds * 1000:.0f}ms" for name, seconds in result["steps"].items())
+        print(f"run {n + 1}: listening {result['listening'] * 1000:.0f}ms  "
+              f"ready {result['ready'] * 1000:.0f}ms  ({steps})")
+
+    summary = {
+        "listening": statistics.median(run["listening"] for run in runs),
+        "ready": statistics.median(run["ready"] for run in runs),
+    }
+    print(f"median: listening {summary['listening'] * 1000:.0f}ms  ready {summary['ready'] * 1000:.0f}ms")
+
+    if args.output:
+        with open(args.output, "a") as f:
+            f.write(json.dumps({
+                "at": datetime.utcnow().isoformat(timespec="seconds"),
+                "revision": git_revision(),
+                **summary,
+                "runs": runs,
+            }) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Query embedding benchmark: per-request encoding vs the micro-batching server.
+
+Simulates concurrent generation requests, each embedding the queries a
+lesson plan request needs (one lesson query plus one per executive skill).
+"inline" encodes each request on its own in the calling thread, as the
+services used to; "server" sends them to app.embedding_server over a Unix
+socket, started here as a subprocess.
+
+Needs sentence-transformers and the all-MiniLM-L6-v2 weights. Run from the
+Backend directory:
+    python -m benchmarks.bench_embedding --clients 32 --requests 10 --skills 2
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+
+def queries(client, request, skills):
+    return [f"Lesson for Maths on fractions {client}-{request} for grade 4"] + \
+           [f"Strategies for skill {n}" for n in range(skills)]
+
+
+def run_clients(encode, clients, requests, skills):
+    """
+    Run concurrent clients, each issuing requests back to back
+
+    Returns:
+        tuple: (wall seconds, per-request latencies)
+    """
+    latencies = []
+    lock = threading.Lock()
+
+    def client(n):
+        for request in range(requests):
+            start = time.perf_counter()
+            vectors = encode(queries(n, request, skills))
+            elapsed = time.perf_counter() - start
+            assert len(vectors) == skills + 1
+            with lock:
+                latencies.append(elapsed)
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, latencies
+
+
+def start_server(path, threads):
+    env = dict(os.environ, EMBEDDING_SOCKET=path, EMBEDDING_THREADS=str(threads))
+    server = subprocess.Popen([sys.executable, "-m", "app.embedding_server"], env=env)
+    while not os.path.exists(path):
+        if server.poll() is not None:
+            raise SystemExit("Embedding server failed to start")
+        time.sleep(0.2)
+    return server
+
+
+def report(name, wall, latencies, texts):
+    latencies.sort()
+    print(f"{name:<7} {texts / wall:8.1f} texts/s  "
+          f"p50={statistics.median(latencies) * 1000:.1f}ms  "
+          f"p95={latencies[int(len(latencies) * 0.95) - 1] * 1000:.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query embedding benchmark")
+    parser.add_argument("--clients", type=int, default=32, help="concurrent requests")
+    parser.add_argument("--requests", type=int, default=10, help="requests per client")
+    parser.add_argument("--skills", type=int, default=2, help="executive skills per request")
+    parser.add_argument("--threads", type=int, default=os.cpu_count() or 1, help="torch threads")
+    args = parser.parse_args()
+    texts = args.clients * args.requests * (args.skills + 1)
+
+    import torch
+    from sentence_transformers import SentenceTransformer
+    from app.config import EMBEDDING_MODEL
+    from app.services.embedding_client import RemoteEmbedder
+
+    torch.set_num_threads(args.threads)
+    model = SentenceTransformer(EMBEDDING_MODEL, device="cpu")
+    model.encode(["warm up"])
+    wall, latencies = run_clients(lambda batch: model.encode(batch).tolist(),
+                                  args.clients, args.requests, args.skills)
+    report("inline", wall, latencies, texts)
+    del model
+
+    path = os.path.join(tempfile.mkdtemp(), "embedding.sock")
+    server = start_server(path, args.threads)
+    try:
+        embedder = RemoteEmbedder(path)
+        embedder.encode(["warm up"])
+        wall, latencies = run_clients(embedder.encode, args.clients, args.requests, args.skills)
+        report("server", wall, latencies, texts)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
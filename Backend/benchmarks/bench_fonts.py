@@ -0,0 +1,50 @@
+"""
+Compare PDF size and render time across the available font families.
+
+Embedded TrueType fonts are subset, so an accessible font should cost a few
+KB and a few percent of render time over base-14 Helvetica.
+
+Run from the Backend directory:
+    python -m benchmarks.bench_fonts --repeat 5
+"""
+import argparse
+
+from app.services.pdf_fonts import DEFAULT_FONT, available_fonts
+from app.services.pdf_lesson_service import generate_lesson_pdf
+from app.services.pdf_quiz_service import generate_quiz_pdf
+from benchmarks.bench_pdf import measure
+from benchmarks.synthetic import lesson_plan_payload, assessment_payload
+
+CASES = [
+    ("lesson[10]", lambda: lesson_plan_payload(10), generate_lesson_pdf),
+    ("quiz[50]", lambda: assessment_payload(50), generate_quiz_pdf),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PDF font size and render-time comparison")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    fonts = available_fonts()
+    if len(fonts) == 1:
+        print("Only Helvetica is available; add TTF files under PDF_FONTS_DIR to compare.")
+
+    for name, factory, render in CASES:
+        baseline = None
+        for font in fonts:
+            payload = factory()
+            payload.font = font
+            metrics = measure(render, payload, args.repeat)
+            if font == DEFAULT_FONT:
+                baseline = metrics
+            print(
+                f"{name:<12} {font:<22} render_ms={metrics['render_ms']:<9} "
+                f"output_kb={metrics['output_kb']:<7} "
+                f"time={metrics['render_ms'] / baseline['render_ms']:.2f}x "
+                f"size={metrics['output_kb'] / baseline['output_kb']:.2f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Google sign-in latency benchmark against a local stand-in for Google.
+
+Starts a small HTTP server that plays Google's token, JWKS and userinfo
+endpoints, with configurable per-request and per-connection delays to
+stand in for network round trips and TLS handshakes. It then compares the
+previous callback flow (a fresh client for the token exchange and another
+for userinfo) with the pooled client plus local id_token verification.
+
+The same stand-in can back a manually run server: export the GOOGLE_*_URL
+variables it prints and set GOOGLE_CLIENT_ID=bench-client.
+
+Run from the Backend directory:
+    python -m benchmarks.bench_google_login --logins 20 --rtt 40 --handshake 60
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+CLIENT_ID = "bench-client"
+KEY_ID = "bench-key"
+
+PROFILE = {
+    "sub": "1234567890",
+    "email": "teacher@example.com",
+    "email_verified": True,
+    "name": "Test Teacher",
+    "given_name": "Test",
+    "family_name": "Teacher",
+    "picture": "https://example.com/avatar.png",
+}
+
+
+def make_stand_in(rtt, handshake):
+    """
+    HTTP server that answers like Google's OAuth endpoints
+
+    Args:
+        rtt: Seconds added to every request
+        handshake: Seconds added once per new connection
+    """
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key()))
+    jwk.update({"kid": KEY_ID, "alg": "RS256", "use": "sig"})
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def setup(self):
+            time.sleep(handshake)
+            BaseHTTPRequestHandler.setup(self)
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, body, headers=None):
+            time.sleep(rtt)
+            payload = json.dumps(body).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            claims = dict(PROFILE, iss="https://accounts.google.com", aud=CLIENT_ID,
+                          exp=datetime.utcnow() + timedelta(hours=1), iat=datetime.utcnow())
+            id_token = jwt.encode(claims, private_key, algorithm="RS256", headers={"kid": KEY_ID})
+            self._send({"access_token": "stand-in-access-token", "id_token": id_token, "expires_in": 3599})
+
+        def do_GET(self):
+            if self.path.startswith("/certs"):
+                self._send({"keys": [jwk]}, {"Cache-Control": "public, max-age=21600"})
+            else:
+                self._send({
+                    "id": PROFILE["sub"], "email": PROFILE["email"], "verified_email": True,
+                    "name": PROFILE["name"], "given_name": PROFILE["given_name"],
+                    "family_name": PROFILE["family_name"], "picture": PROFILE["picture"],
+                })
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def previous_flow(base_url):
+    """ The callback before pooling: two fresh clients, two sequential calls """
+    async with httpx.AsyncClient() as client:
+        token_response = await client.post(f"{base_url}/token", data={"code": "x"})
+    access_token = token_response.json()["access_token"]
+    async with httpx.AsyncClient() as client:
+        user_response = await client.get(f"{base_url}/userinfo",
+                                         headers={"Authorization": f"Bearer {access_token}"})
+    return user_response.json()
+
+
+async def run(logins, base_url):
+    from app.oauth import exchange_code, verify_id_token, profile_from_claims, close_http_client
+
+    async def pooled_flow():
+        token_data = await exchange_code("x")
+        return profile_from_claims(await verify_id_token(token_data["id_token"]))
+
+    results = {}
+    for name, flow in (("previous", lambda: previous_flow(base_url)), ("pooled", pooled_flow)):
+        timings = []
+        for _ in range(logins):
+            start = time.perf_counter()
+            profile = await flow()
+            timings.append(time.perf_counter() - start)
+            assert profile["email"] == PROFILE["email"]
+        results[name] = timings
+    await close_http_client()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Google sign-in latency benchmark")
+    parser.add_argument("--logins", type=int, default=20, help="sequential logins per flow")
+    parser.add_argument("--rtt", type=float, default=40, help="ms added to every request")
+    parser.add_argument("--handshake", type=float, default=60, help="ms added to every new connection")
+    args = parser.parse_args()
+
+    server = make_stand_in(args.rtt / 1000, args.handshake / 1000)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    # app.config reads these when the OAuth module is first imported
+    os.environ["GOOGLE_CLIENT_ID"] = CLIENT_ID
+    os.environ["GOOGLE_TOKEN_URL"] = f"{base_url}/token"
+    os.environ["GOOGLE_JWKS_URL"] = f"{base_url}/certs"
+    os.environ["GOOGLE_USERINFO_URL"] = f"{base_url}/userinfo"
+    print(f"Stand-in at {base_url} (rtt {args.rtt} ms, handshake {args.handshake} ms)")
+
+    results = asyncio.run(run(args.logins, base_url))
+    server.shutdown()
+
+    for name, timings in results.items():
+        print(f"{name:<9} first={timings[0] * 1000:.1f}ms  "
+              f"median={statistics.median(timings) * 1000:.1f}ms  "
+              f"max={max(timings) * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Login burst benchmark for password verification.
+
+Fires a burst of concurrent logins and compares verifying bcrypt hashes
+inline on the event loop (the old behaviour) with the bounded hashing
+executor. Alongside login throughput and latency it reports event loop
+lag, measured by a 10 ms ticker, as a stand-in for how long other routes
+such as generation requests would have been stalled.
+
+Run from the Backend directory:
+    python -m benchmarks.bench_login --logins 64 --rounds 12
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+TICK = 0.01
+
+
+async def _ticker(lags, stop):
+    """ Record how late each 10 ms tick fires """
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append(time.perf_counter() - start - TICK)
+
+
+async def _burst(login, count):
+    lags = []
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(_ticker(lags, stop))
+    await asyncio.sleep(0)
+
+    latencies = []
+    rejected = 0
+
+    # Latency counts from the start of the burst, as every login arrives at once
+    async def one():
+        nonlocal rejected
+        try:
+            await login()
+        except Exception as e:
+            if getattr(e, "status_code", None) != 503:
+                raise
+            rejected += 1
+            return
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(count)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await ticker
+
+    latencies.sort()
+    return {
+        "logins_per_second": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1) if latencies else None,
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 1) if latencies else None,
+        "rejected": rejected,
+        "max_loop_lag_ms": round(max(lags, default=0) * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Login burst benchmark")
+    parser.add_argument("--logins", type=int, default=64, help="concurrent logins in the burst")
+    parser.add_argument("--rounds", type=int, help="bcrypt cost (default PASSWORD_BCRYPT_ROUNDS)")
+    parser.add_argument("--threads", type=int, help="hashing threads (default PASSWORD_HASH_THREADS)")
+    parser.add_argument("--max-pending", type=int, help="admission limit (default PASSWORD_HASH_MAX_PENDING)")
+    args = parser.parse_args()
+
+    # The password service reads its settings at import time
+    if args.rounds:
+        os.environ["PASSWORD_BCRYPT_ROUNDS"] = str(args.rounds)
+    if args.threads:
+        os.environ["PASSWORD_HASH_THREADS"] = str(args.threads)
+    if args.max_pending:
+        os.environ["PASSWORD_HASH_MAX_PENDING"] = str(args.max_pending)
+
+    from app.config import PASSWORD_BCRYPT_ROUNDS, PASSWORD_HASH_THREADS, PASSWORD_HASH_MAX_PENDING
+    from app.services.password_service import pwd_context, verify_password
+
+    stored = pwd_context.hash("correct horse battery staple")
+
+    async def inline_login():
+        pwd_context.verify_and_update("correct horse battery staple", stored)
+
+    async def offloaded_login():
+        await verify_password("correct horse battery staple", stored)
+
+    print(f"{args.logins} concurrent logins, bcrypt cost {PASSWORD_BCRYPT_ROUNDS}, "
+          f"{PASSWORD_HASH_THREADS} threads, admission limit {PASSWORD_HASH_MAX_PENDING}")
+    for name, login in (("inline", inline_login), ("offloaded", offloaded_login)):
+        result = asyncio.run(_burst(login, args.logins))
+        print(f"{name:<10} " + "  ".join(f"{k}={v}" for k, v in result.items()))
+
+
+if __name__ == "__main__":
+    main()
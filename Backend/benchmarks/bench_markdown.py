@@ -0,0 +1,49 @@
+"""
+Throughput benchmark for the shared markdown-to-flowables converter.
+
+Run from the Backend directory:
+    python -m benchmarks.bench_markdown --questions 150 --repeat 20
+"""
+import argparse
+import time
+
+from app.services.pdf_common import get_pdf_styles
+from app.services.pdf_markdown import markdown_to_flowables, split_questions, tokenize
+from benchmarks.synthetic import synthetic_assessment_markdown
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--questions", type=int, default=150)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    styles = get_pdf_styles()
+    text = synthetic_assessment_markdown(args.questions)
+    size_mb = len(text.encode("utf-8")) / (1024 * 1024)
+
+    # Tokenizing alone, to separate our parsing cost from ReportLab's
+    # paragraph markup parser
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        tokens = tokenize(text)
+    tokenize_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        flowables = []
+        for _, body in split_questions(text)[1]:
+            flowables.extend(markdown_to_flowables(body, styles))
+    elapsed = time.perf_counter() - start
+
+    print(f"input: {args.questions} questions, {size_mb * 1024:.1f} KB")
+    print(f"tokens per pass: {len(tokens)}")
+    print(f"tokenize: {tokenize_elapsed / args.repeat * 1000:.2f} ms/pass, "
+          f"{size_mb * args.repeat / tokenize_elapsed:.2f} MB/s")
+    print(f"flowables per pass: {len(flowables)}")
+    print(f"to flowables: {elapsed / args.repeat * 1000:.2f} ms/pass, "
+          f"{size_mb * args.repeat / elapsed:.2f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+PDF rendering benchmark for the lesson, quiz and icebreaker services.
+
+Renders synthetic documents of increasing size and records render time,
+peak Python memory, output size and pages per second. Results are written
+as JSON so runs from different commits can be compared; with --baseline the
+run fails when any case regresses by more than --threshold.
+
+Run from the Backend directory:
+    python -m benchmarks.bench_pdf --output bench_pdf.json
+    python -m benchmarks.bench_pdf --baseline bench_pdf.json --threshold 0.25
+"""
+import argparse
+import json
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from app.services.pdf_cache import RENDERER_VERSION
+from app.services.pdf_fonts import DEFAULT_FONT
+from app.services.pdf_lesson_service import generate_lesson_pdf
+from app.services.pdf_quiz_service import generate_quiz_pdf
+from app.services.pdf_icebreaker_service import generate_icebreaker_pdf
+from app.services.pdf_quiz_versions_service import generate_quiz_versions
+from benchmarks.synthetic import lesson_plan_payload, assessment_payload, icebreaker_payload, quiz_versions_payload
+
+# (case name, payload factory, renderer, sizes)
+CASES = [
+    ("lesson", lesson_plan_payload, generate_lesson_pdf, [1, 10, 40]),
+    ("quiz", assessment_payload, generate_quiz_pdf, [10, 50, 150]),
+    ("quiz_markdown", lambda n: assessment_payload(n, structured=False), generate_quiz_pdf, [10, 50, 150]),
+    # Five shuffled versions plus answer key; compare with 5x quiz[n]
+    ("quiz_versions", quiz_versions_payload, generate_quiz_versions, [10, 50, 150]),
+    ("icebreaker", icebreaker_payload, generate_icebreaker_pdf, [3, 15, 60]),
+]
+
+# Metrics compared against the baseline; higher is worse for all of them
+REGRESSION_METRICS = ["render_ms", "peak_memory_kb"]
+
+_PAGE_RE = re.compile(rb"/Type\s*/Page(?![a-zA-Z])")
+
+
+def count_pages(pdf):
+    """ Count page objects in a PDF produced by ReportLab """
+    return len(_PAGE_RE.findall(pdf))
+
+
+def measure(render, payload, repeat):
+    """
+    Render a payload `repeat` times and return its metrics
+    """
+    # Warm-up render so one-time costs (font metrics, imports) are excluded
+    pdf = render(payload)
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        render(payload)
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    render(payload)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    render_s = statistics.median(timings)
+    pages = count_pages(pdf)
+    return {
+        "render_ms": round(render_s * 1000, 3),
+        "peak_memory_kb": round(peak / 1024, 1),
+        "output_kb": round(len(pdf) / 1024, 1),
+        "pages": pages,
+        "pages_per_second": round(pages / render_s, 1) if render_s else None,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(repeat, only=None, font=None):
+    results = {}
+    for name, factory, render, sizes in CASES:
+        if only and name not in only:
+            continue
+        for size in sizes:
+            key = f"{name}[{size}]"
+            payload = factory(size)
+            payload.font = font
+            results[key] = measure(render, payload, repeat)
+            print(f"{key:<22} " + "  ".join(f"{k}={v}" for k, v in results[key].items()))
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+    Return a list of regression messages for cases slower or bigger than baseline
+    """
+    regressions = []
+    for key, metrics in results.items():
+        previous = baseline.get(key)
+        if not previous:
+            continue
+        for metric in REGRESSION_METRICS:
+            old, new = previous.get(metric), metrics.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if change > threshold:
+                regressions.append(f"{key} {metric}: {old} -> {new} (+{change:.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PDF rendering benchmark")
+    parser.add_argument("--repeat", type=int, default=5, help="timed renders per case")
+    parser.add_argument("--case", action="append", help="only run the named case(s)")
+    parser.add_argument("--font", help="font family to render with (default Helvetica)")
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="JSON results from a previous run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed relative regression")
+    args = parser.parse_args()
+
+    results = run(args.repeat, args.case, args.font)
+
+    report = {
+        "commit": git_commit(),
+        "renderer_version": RENDERER_VERSION,
+        "font": args.font or DEFAULT_FONT,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline.get("results", {}), args.threshold)
+        if regressions:
+            print(f"Regressions beyond {args.threshold:.0%} against {args.baseline} "
+                  f"(commit {baseline.get('commit')}):")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
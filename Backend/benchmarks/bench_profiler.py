@@ -0,0 +1,65 @@
+"""
+Sampling profiler overhead benchmark.
+
+Renders the same lesson PDF repeatedly with the sampler idle and with it
+sampling at the configured interval, alternating so machine noise hits
+both equally, and reports the slowdown together with the cost of one
+sample. A handful of idle threads stand in for the thread pools and
+database monitors a worker carries.
+
+Run from the Backend directory:
+    python -m benchmarks.bench_profiler --rounds 10 --interval-ms 20
+"""
+import argparse
+import statistics
+import threading
+import time
+
+from app.profiler import Sampler
+from app.services.pdf_lesson_service import generate_lesson_pdf
+from benchmarks.synthetic import lesson_plan_payload
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sampling profiler overhead benchmark")
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--sections", type=int, default=40)
+    parser.add_argument("--interval-ms", type=float, default=20)
+    parser.add_argument("--idle-threads", type=int, default=16)
+    args = parser.parse_args()
+
+    stop = threading.Event()
+    for _ in range(args.idle_threads):
+        threading.Thread(target=stop.wait, daemon=True).start()
+
+    data = lesson_plan_payload(args.sections)
+    render = lambda: generate_lesson_pdf(data)
+    render()
+
+    sampler = Sampler(interval=args.interval_ms / 1000)
+    per_sample = min(timed(sampler.sample) for _ in range(200))
+
+    off, on = [], []
+    for _ in range(args.rounds):
+        off.append(timed(render))
+        sampler.begin()
+        on.append(timed(render))
+        sampler.end()
+    stop.set()
+
+    off_median, on_median = statistics.median(off), statistics.median(on)
+    print(f"one sample ({args.idle_threads} idle threads + 1 busy): {per_sample * 1e6:.0f} us")
+    print(f"render, sampler idle:    {off_median * 1000:.1f} ms")
+    print(f"render, sampling every {args.interval_ms:g} ms: {on_median * 1000:.1f} ms "
+          f"({(on_median / off_median - 1) * 100:+.2f}%)")
+    print(f"samples kept: {len(sampler.samples)}")
+
+
+if __name__ == "__main__":
+    main()
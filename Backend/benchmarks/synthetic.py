@@ -0,0 +1,126 @@
+"""
+Synthetic, parameterized payloads for the PDF benchmarks.
+
+Every generator is deterministic for a given size, so results from
+different commits are comparable.
+"""
+from app.routers.pdf_routes import (
+    SectionModel,
+    LessonPlanModel,
+    LessonPlanPDF,
+    QuestionModel,
+    AssessmentModel,
+    AssessmentPDF,
+    IcebreakerModel,
+    IcebreakerPDF,
+    QuizVersionsPDF,
+)
+
+EXEC_SKILLS = ["Planning", "Working Memory", "Task Initiation"]
+
+QUESTION_TEMPLATE = """### Question {n}
+**Question Type**: Multiple choice
+**Question**: Sam has **{n} apples** and buys *three* more. If 3 * 4 = 12 and 5 < 7, how many apples & pears?
+- A) {a}
+- B) {b}
+- C) {c}
+- D) {d}
+**Executive Function Strategy**: Use a *checklist*:
+1. Read the question twice
+2. Underline the **numbers**
+3. Check the answer
+"""
+
+PARAGRAPH = (
+    "Students use **base-ten blocks** to model the problem, then record each step "
+    "on a graphic organizer. The teacher models *think-aloud* reasoning and checks "
+    "for understanding before moving on."
+)
+
+
+def synthetic_assessment_markdown(questions):
+    """ Assessment markdown with the given number of questions """
+    return "# Synthetic Assessment\n\n" + "\n".join(
+        QUESTION_TEMPLATE.format(n=n, a=n, b=n + 1, c=n + 2, d=n + 3)
+        for n in range(1, questions + 1)
+    )
+
+
+def lesson_plan_payload(sections):
+    """ LessonPlanPDF with the given number of sections """
+    return LessonPlanPDF(
+        exec_skills=EXEC_SKILLS,
+        lessonPlan=LessonPlanModel(
+            title=f"Synthetic Lesson ({sections} sections)",
+            objective=PARAGRAPH,
+            grade="3",
+            subject="Maths",
+            strand="Number and Number Sense",
+            topic="Place Value",
+            primarySOL="3.1 The student will read, write, and identify the place and value of each digit.",
+            materials="- base-ten blocks\n- place value charts\n- whiteboards, markers",
+            vocabulary="digit, place value, ones, tens, hundreds",
+            sections=[
+                SectionModel(
+                    title=f"Section {i + 1}",
+                    method=PARAGRAPH,
+                    activities=" ".join(f"- Activity step {j + 1}: {PARAGRAPH}" for j in range(4)),
+                    executiveFunction=f"**Strategy:** {PARAGRAPH}",
+                )
+                for i in range(sections)
+            ],
+        ),
+    )
+
+
+def assessment_payload(questions, structured=True):
+    """ AssessmentPDF with the given number of questions """
+    structured_questions = None
+    if structured:
+        structured_questions = [
+            QuestionModel(
+                text=f"Sam has **{n} apples** and buys *three* more. How many apples does Sam have?",
+                options=[f"A) {n + 1}", f"B) {n + 2}", f"C) {n + 3}", f"D) {n + 4}"],
+                answer="C",
+                explanation=f"{n} + 3 = {n + 3}",
+            )
+            for n in range(1, questions + 1)
+        ]
+    return AssessmentPDF(
+        exec_skills=EXEC_SKILLS,
+        assessment=AssessmentModel(
+            title=f"Synthetic Assessment ({questions} questions)",
+            subject="Maths",
+            grade="3",
+            topic="Addition",
+            subtopic="Word Problems",
+            content=synthetic_assessment_markdown(questions),
+            questions=structured_questions,
+        ),
+    )
+
+
+def quiz_versions_payload(questions, versions=5):
+    """ QuizVersionsPDF for `versions` shuffled copies of the structured assessment """
+    return QuizVersionsPDF(**assessment_payload(questions).dict(), versions=versions, seed=1)
+
+
+def icebreaker_payload(items):
+    """ IcebreakerPDF with the given number of items in each list """
+    lines = [f"Item {i + 1}: {PARAGRAPH}" for i in range(items)]
+    return IcebreakerPDF(
+        setting="In-Person",
+        activity="Team building",
+        materials="Coloured paper",
+        exec_skills=EXEC_SKILLS,
+        icebreaker=IcebreakerModel(
+            title=f"Synthetic Icebreaker ({items} items)",
+            objective=PARAGRAPH,
+            materials="Coloured paper, markers",
+            instructions=lines,
+            questions=lines,
+            debrief=lines,
+            tips=lines,
+            variations=lines,
+        ),
+    )
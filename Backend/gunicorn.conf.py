@@ -0,0 +1,155 @@
+"""
+Production serving: one preloaded master, several forked uvicorn workers.
+
+The app, its models and static tables are loaded once in the master and
+inherited by every worker copy-on-write. Run from the Backend directory:
+    gunicorn -c gunicorn.conf.py app.main:app
+
+The embedding model is not in the workers at all: the master starts one
+embedding server (app.embedding_server) for the node, and workers send it
+their query strings over EMBEDDING_SOCKET. A thread in the master restarts
+the server if it exits; requests embedding meanwhile fail until it is back.
+
+Rate limit counters are kept in Mongo when there is more than one worker
+(RATE_LIMIT_BACKEND), so every quota holds across workers. Other state
+stays per worker: prefetch slots (a submit only reuses a prefetch that
+landed on the same worker) and the coalescing of identical generation
+requests (identical requests on different workers each generate).
+
+Check how much of each worker is really shared with:
+    python scripts/memory_report.py
+"""
+import gc
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+# Workers embed through the shared server unless told otherwise; set before
+# app.config reads it
+os.environ.setdefault("EMBEDDING_SOCKET", "/tmp/lessonplan-embedding.sock")
+# Workers write metric samples here so /metrics on any worker sees them all;
+# prometheus_client reads it when the app's metrics are created
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/lessonplan-metrics")
+# Samples left by a previous run would be added to this one's
+shutil.rmtree(os.environ["PROMETHEUS_MULTIPROC_DIR"], ignore_errors=True)
+os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"])
+
+# With in-process counters every worker would grant the full quota, so
+# the limits would be multiplied by the worker count
+if int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)) > 1:
+    os.environ.setdefault("RATE_LIMIT_BACKEND", "mongo")
+
+from app.config import RATE_LIMIT_BACKEND, WEB_CONCURRENCY, WORKER_THREADS, EMBEDDING_SOCKET, EMBEDDING_THREADS
+
+# Thread pools in torch, BLAS and tokenizers size themselves to the whole
+# machine by default; with several workers that oversubscribes the CPUs.
+# These must be set before the app (and torch) is imported below.
+for name in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+    os.environ.setdefault(name, str(WORKER_THREADS))
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = WEB_CONCURRENCY
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = 120
+graceful_timeout = 30
+keepalive = 5
+
+# No collections while the app is loading: every collection would write to
+# object headers that are about to be shared with the workers
+gc.disable()
+
+
+embedding_server = None
+# Seconds between checks that the embedding server is still running
+EMBEDDING_CHECK_SECONDS = 5
+_stopping = threading.Event()
+
+
+def start_embedding_server():
+    """ Start the embedding server and wait until its socket answers """
+    # The server gets its own thread budget, not the per-worker one above
+    env = dict(os.environ)
+    for name in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        env[name] = str(EMBEDDING_THREADS)
+    process = subprocess.Popen([sys.executable, "-m", "app.embedding_server"], env=env)
+
+    # Don't take traffic until the model is loaded and the socket answers
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("Embedding server exited during startup")
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+                probe.connect(EMBEDDING_SOCKET)
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"Embedding server did not open {EMBEDDING_SOCKET} in time")
+
+
+def supervise_embedding_server(server):
+    """ Restart the embedding server whenever it exits, until the master stops """
+    global embedding_server
+    while not _stopping.wait(EMBEDDING_CHECK_SECONDS):
+        # poll() also sees an exit the arbiter already reaped
+        code = embedding_server.poll()
+        if code is None:
+            continue
+        server.log.error("Embedding server exited with code %s; restarting it", code)
+        try:
+            embedding_server = start_embedding_server()
+            server.log.info("Embedding server restarted")
+        except (OSError, RuntimeError) as e:
+            server.log.error("Restarting the embedding server failed: %s", e)
+
+
+def on_starting(server):
+    global embedding_server
+    if not EMBEDDING_SOCKET:
+        return
+    embedding_server = start_embedding_server()
+    threading.Thread(target=supervise_embedding_server, args=(server,), name="embedding-supervisor",
+                     daemon=True).start()
+
+
+def on_exit(server):
+    _stopping.set()
+    if embedding_server and embedding_server.poll() is None:
+        embedding_server.terminate()
+        embedding_server.wait(timeout=10)
+
+
+def when_ready(server):
+    from app.preload import preload
+
+    preload()
+    # Move everything loaded so far into a permanent generation the
+    # collector never scans, so workers don't dirty those pages by
+    # touching their GC headers
+    gc.freeze()
+    server.log.info("Preloaded app; %d objects frozen before forking %d workers",
+                    gc.get_freeze_count(), workers)
+    if workers > 1 and RATE_LIMIT_BACKEND != "mongo":
+        server.log.warning("RATE_LIMIT_BACKEND=%s with %d workers: every rate limit is multiplied by %d",
+                           RATE_LIMIT_BACKEND, workers, workers)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def post_fork(server, worker):
+    gc.enable()
+    try:
+        import torch
+        torch.set_num_threads(WORKER_THREADS)
+    except ImportError:
+        pass
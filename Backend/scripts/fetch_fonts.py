@@ -0,0 +1,122 @@
+"""
+Download the accessible PDF font families into PDF_FONTS_DIR.
+
+The TTF files aren't kept in the repository; the Docker image fetches them
+at build time (see the Dockerfile) and local setups run this once. Faces
+are the TrueType builds served by the Fontsource CDN, Latin subset, with
+each family's SIL Open Font License saved next to them as OFL.txt.
+
+Existing files are kept, so running it again only fills in what is
+missing. Exits non-zero if a family's regular face could not be fetched.
+
+Run from the Backend directory:
+    python -m scripts.fetch_fonts [--dest DIR]
+"""
+import argparse
+import os
+import sys
+import time
+import urllib.error
+import urllib.request
+
+from app.services.pdf_fonts import FONT_FAMILIES
+
+FONTS_BASE_URL = os.getenv("FONTS_BASE_URL", "https://cdn.jsdelivr.net/fontsource/fonts")
+LICENSE_BASE_URL = os.getenv("FONTS_LICENSE_BASE_URL", "https://cdn.jsdelivr.net/npm/@fontsource")
+
+# FONT_FAMILIES name -> Fontsource id
+FONTSOURCE_IDS = {
+    "AtkinsonHyperlegible": "atkinson-hyperlegible",
+    "OpenDyslexic": "opendyslexic",
+}
+
+# Face -> (weight, style) in Fontsource file names
+FACES = {
+    "normal": (400, "normal"),
+    "bold": (700, "normal"),
+    "italic": (400, "italic"),
+    "boldItalic": (700, "italic"),
+}
+
+# sfnt versions of TrueType outlines; anything else (an error page, CFF) is rejected
+TRUETYPE_MAGIC = (b"\x00\x01\x00\x00", b"true")
+
+
+def download(url, attempts=3):
+    for attempt in range(attempts):
+        try:
+            with urllib.request.urlopen(url, timeout=30) as response:
+                return response.read()
+        except OSError as e:
+            # A missing file won't appear on retry
+            missing = isinstance(e, urllib.error.HTTPError) and e.code < 500
+            if missing or attempt == attempts - 1:
+                raise
+            print(f"  retrying {url}: {e}")
+            time.sleep(2 ** attempt)
+
+
+def save(path, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def fetch_family(family, dest):
+    """
+    Fetch one family's faces and license
+
+    Returns:
+        bool: True when the regular face is in place
+    """
+    font_id = FONTSOURCE_IDS[family]
+    directory = os.path.join(dest, family)
+    os.makedirs(directory, exist_ok=True)
+
+    for face, filename in FONT_FAMILIES[family].items():
+        path = os.path.join(directory, filename)
+        if os.path.exists(path):
+            continue
+        weight, style = FACES[face]
+        url = f"{FONTS_BASE_URL}/{font_id}@latest/latin-{weight}-{style}.ttf"
+        try:
+            data = download(url)
+        except OSError as e:
+            print(f"  {filename}: {e}")
+            continue
+        if data[:4] not in TRUETYPE_MAGIC:
+            print(f"  {filename}: {url} is not a TrueType font")
+            continue
+        save(path, data)
+        print(f"  {filename}: {len(data) // 1024} KB")
+
+    license_path = os.path.join(directory, "OFL.txt")
+    if not os.path.exists(license_path):
+        try:
+            save(license_path, download(f"{LICENSE_BASE_URL}/{font_id}/LICENSE"))
+        except OSError as e:
+            print(f"  OFL.txt: {e}")
+
+    return os.path.exists(os.path.join(directory, FONT_FAMILIES[family]["normal"]))
+
+
+def main():
+    from app.config import PDF_FONTS_DIR
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dest", default=PDF_FONTS_DIR, help="Fonts directory (default: PDF_FONTS_DIR)")
+    args = parser.parse_args()
+
+    missing = []
+    for family in FONT_FAMILIES:
+        print(family)
+        if not fetch_family(family, args.dest):
+            missing.append(family)
+    if missing:
+        print(f"Missing regular face for: {', '.join(missing)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Import-time budget check for app.main.
+
+Imports the app in a fresh interpreter with -X importtime, prints the
+slowest top-level imports, and exits non-zero when the total exceeds the
+budget or any heavy ML library was imported. Auth and PDF requests must
+be able to start a process without torch, Chroma or the OpenAI SDK;
+those load on first use behind get_embedder, get_chroma_client and
+get_openai_client.
+
+Run from the Backend directory (e.g. in CI):
+    python scripts/import_budget.py --budget-ms 1500
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+# Imported on first use only; importing any of them with app.main is a regression
+FORBIDDEN = ("torch", "sentence_transformers", "chromadb", "openai", "onnxruntime", "transformers", "numpy")
+
+
+def measure(module):
+    """
+    Import a module in a fresh interpreter
+
+    Returns:
+        list: (module name, self microseconds, cumulative microseconds, depth)
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True,
+        env=dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [os.getcwd(), os.getenv("PYTHONPATH")]))),
+    )
+    if result.returncode != 0:
+        sys.exit(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time budget check")
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("IMPORT_TIME_BUDGET_MS", 1500)))
+    parser.add_argument("--top", type=int, default=15, help="slowest direct imports to list")
+    args = parser.parse_args()
+
+    rows = measure(args.module)
+    # -X importtime lists a module after everything it imported, so its
+    # subtree is the run of deeper rows just before it
+    end = next(i for i, row in enumerate(rows) if row[0] == args.module)
+    _, _, cumulative_us, depth = rows[end]
+    start = end
+    while start > 0 and rows[start - 1][3] > depth:
+        start -= 1
+    subtree = rows[start:end]
+    total_ms = cumulative_us / 1000
+
+    print(f"Slowest imports under {args.module}:")
+    direct = sorted((row for row in subtree if row[3] == depth + 1), key=lambda row: row[2], reverse=True)
+    for name, _, cumulative, _ in direct[:args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    failures = []
+    loaded = {name.split(".")[0] for name, _, _, _ in subtree}
+    heavy = sorted(loaded.intersection(FORBIDDEN))
+    if heavy:
+        failures.append(f"heavy libraries imported at startup: {', '.join(heavy)}")
+    if total_ms > args.budget_ms:
+        failures.append(f"{total_ms:.0f} ms exceeds the {args.budget_ms:.0f} ms budget")
+
+    print(f"\n{args.module}: {total_ms:.0f} ms (budget {args.budget_ms:.0f} ms)")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Unique vs shared memory of the gunicorn master and its workers.
+
+Reads /proc/<pid>/smaps_rollup (Linux 4.14+) for the master and each child.
+"Unique" is private memory only that process holds, which is what each extra
+worker really costs; "shared" is resident memory still shared with the
+master copy-on-write. PSS splits shared pages evenly between the processes
+using them, so the PSS column sums to the real total.
+
+Usage:
+    python scripts/memory_report.py            # finds the gunicorn master
+    python scripts/memory_report.py <master pid>
+"""
+import os
+import sys
+
+
+def read_rollup(pid):
+    """ smaps_rollup fields in kB """
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+                fields[parts[0][:-1]] = int(parts[1])
+    return fields
+
+
+def children(pid):
+    """ Child pids of a process """
+    found = []
+    for task in os.listdir(f"/proc/{pid}/task"):
+        try:
+            with open(f"/proc/{pid}/task/{task}/children") as f:
+                found.extend(int(child) for child in f.read().split())
+        except FileNotFoundError:
+            pass
+    return found
+
+
+def find_master():
+    """ Oldest process whose command line mentions gunicorn """
+    candidates = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/cmdline", "rb") as f:
+                cmdline = f.read().replace(b"\0", b" ").decode(errors="replace")
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (FileNotFoundError, ProcessLookupError, PermissionError):
+            continue
+        if "gunicorn" in cmdline and "memory_report" not in cmdline:
+            candidates.append((int(entry), ppid))
+    pids = {pid for pid, _ in candidates}
+    masters = [pid for pid, ppid in candidates if ppid not in pids]
+    return min(masters) if masters else None
+
+
+def mb(kb):
+    return f"{kb / 1024:8.1f}"
+
+
+def main():
+    master = int(sys.argv[1]) if len(sys.argv) > 1 else find_master()
+    if not master:
+        sys.exit("No gunicorn master found; pass its pid")
+
+    rows = [("master", master)] + [("worker", pid) for pid in children(master)]
+    print(f"{'process':<8} {'pid':>7} {'rss MB':>8} {'pss MB':>8} {'unique MB':>9} {'shared MB':>9}")
+    total_pss = 0
+    worker_unique = []
+    for role, pid in rows:
+        rollup = read_rollup(pid)
+        unique = rollup.get("Private_Clean", 0) + rollup.get("Private_Dirty", 0)
+        shared = rollup.get("Shared_Clean", 0) + rollup.get("Shared_Dirty", 0)
+        total_pss += rollup.get("Pss", 0)
+        if role == "worker":
+            worker_unique.append(unique)
+        print(f"{role:<8} {pid:>7} {mb(rollup.get('Rss', 0))} {mb(rollup.get('Pss', 0))} {mb(unique)} {mb(shared)}")
+
+    print(f"\nTotal (PSS): {total_pss / 1024:.1f} MB for {len(worker_unique)} workers")
+    if worker_unique:
+        print(f"Average unique memory per worker: {sum(worker_unique) / len(worker_unique) / 1024:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+"""
+Shared test setup.
+
+app.config reads the environment when it is imported, so the settings the
+app refuses to start without are filled in here first. Mongo points at an
+unreachable address: tests that need a database swap the collections for
+mongomock ones (mock_collection).
+
+Run from the Backend directory:
+    pip install -r requirements-dev.txt
+    python -m pytest
+"""
+import os
+
+os.environ.setdefault("SECRET_KEY", "test-secret-key-of-a-reasonable-length")
+os.environ.setdefault("SESSION_SECRET_KEY", "test-session-secret-key")
+os.environ.setdefault("DATABASE_NAME", "test")
+os.environ.setdefault("MONGO_URI", "mongodb://127.0.0.1:1/?serverSelectionTimeoutMS=100")
+os.environ.setdefault("PDF_CACHE_DIR", "/tmp/lessonplan-test-pdf-cache")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import pytest
+
+
+@pytest.fixture
+def mock_collection():
+    """ Factory for empty in-memory Mongo collections with motor's async API """
+    from mongomock_motor import AsyncMongoMockClient
+
+    database = AsyncMongoMockClient()["test"]
+    return lambda name: database[name]
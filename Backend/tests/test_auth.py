@@ -0,0 +1,72 @@
+import time
+from datetime import timedelta
+import jwt
+import pytest
+from fastapi import Depends, FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from app import auth
+from app.auth import require_user, verify_token
+from app.config import JWT_ALGORITHM, SECRET_KEY
+from app.routers.auth_routes import create_access_token
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    auth._claims_cache.clear()
+    yield
+    auth._claims_cache.clear()
+
+
+def test_valid_token_gives_its_claims():
+    token = create_access_token({"email": "a@b.c", "first_name": "Ada"}, timedelta(hours=1))
+    claims = verify_token(token)
+    assert claims["email"] == "a@b.c" and claims["first_name"] == "Ada"
+    assert claims["exp"] > time.time()
+
+
+def test_expired_token_is_rejected():
+    token = create_access_token({"email": "a@b.c"}, timedelta(seconds=-1))
+    with pytest.raises(HTTPException) as raised:
+        verify_token(token)
+    assert raised.value.status_code == 401
+    assert raised.value.detail == "Token expired"
+    assert raised.value.headers["WWW-Authenticate"] == "Bearer"
+
+
+@pytest.mark.parametrize("token", [
+    jwt.encode({"email": "a@b.c", "exp": time.time() + 60}, "another-secret-key-of-enough-length", algorithm=JWT_ALGORITHM),
+    jwt.encode({"email": "a@b.c", "exp": time.time() + 60}, SECRET_KEY, algorithm="HS512"),
+    "not-a-token",
+])
+def test_forged_or_malformed_token_is_rejected(token):
+    with pytest.raises(HTTPException) as raised:
+        verify_token(token)
+    assert raised.value.detail == "Invalid token"
+
+
+def test_cached_claims_stop_at_the_tokens_expiry():
+    token = jwt.encode({"email": "a@b.c", "exp": int(time.time()) + 2}, SECRET_KEY, algorithm=JWT_ALGORITHM)
+    assert verify_token(token)["email"] == "a@b.c"
+    time.sleep(2.1)
+    with pytest.raises(HTTPException) as raised:
+        verify_token(token)
+    assert raised.value.detail == "Token expired"
+
+
+def test_require_user_on_a_route():
+    app = FastAPI()
+
+    @app.get("/me")
+    async def me(user: dict = Depends(require_user)):
+        return {"email": user["email"]}
+
+    client = TestClient(app)
+    token = create_access_token({"email": "a@b.c"}, timedelta(hours=1))
+    assert client.get("/me", headers={"Authorization": f"Bearer {token}"}).json() == {"email": "a@b.c"}
+
+    expired = create_access_token({"email": "a@b.c"}, timedelta(seconds=-1))
+    for headers in ({}, {"Authorization": token}, {"Authorization": f"Basic {token}"},
+                    {"Authorization": f"Bearer {expired}"}):
+        response = client.get("/me", headers=headers)
+        assert response.status_code == 401
+        assert response.headers["www-authenticate"] == "Bearer"
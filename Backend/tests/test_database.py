@@ -0,0 +1,29 @@
+import asyncio
+from pymongo.errors import ConnectionFailure, OperationFailure
+from app import database
+
+
+class FakeCollection:
+    def __init__(self, name, error=None):
+        self.name = name
+        self.error = error
+        self.created = []
+
+    async def create_index(self, keys, **options):
+        if self.error:
+            raise self.error
+        self.created.append(keys)
+
+
+def test_init_indexes_carries_on_past_a_failing_index(monkeypatch):
+    first, broken, last = FakeCollection("a"), FakeCollection("b", OperationFailure("conflict")), FakeCollection("c")
+    monkeypatch.setattr(database, "INDEXES", [(first, "x", {}), (broken, "y", {}), (last, "z", {})])
+    asyncio.run(database.init_indexes())
+    assert first.created == ["x"] and last.created == ["z"]
+
+
+def test_init_indexes_stops_when_mongo_is_unreachable(monkeypatch):
+    down, after = FakeCollection("a", ConnectionFailure("down")), FakeCollection("b")
+    monkeypatch.setattr(database, "INDEXES", [(down, "x", {}), (after, "y", {})])
+    asyncio.run(database.init_indexes())
+    assert after.created == []
@@ -0,0 +1,106 @@
+import os
+import socket
+import threading
+import time
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from app.config import DEADLINE_MAX_SECONDS
+from app.deadline import (
+    Deadline, DeadlineExceeded, call_within, deadline_exceeded_handler, remaining, request_deadline, stage_budget,
+    use_deadline,
+)
+from app.services.embedding_client import EmbeddingUnavailable, RemoteEmbedder
+
+
+@pytest.fixture(autouse=True)
+def no_deadline():
+    yield
+    use_deadline(None)
+
+
+def test_no_deadline_gives_the_default():
+    assert stage_budget("retrieval") is None
+    assert stage_budget("embedding", 5.0, reserve=15) == 5.0
+
+
+def test_reserve_is_kept_for_later_stages():
+    use_deadline(Deadline("lesson_plan", 60))
+    assert 44 < stage_budget("retrieval", reserve=15) <= 45
+    assert stage_budget("embedding", 5.0, reserve=15) == 5.0
+
+
+def test_short_deadline_shares_the_time_instead_of_failing():
+    use_deadline(Deadline("lesson_plan", 10))
+    assert 4.9 < stage_budget("retrieval", reserve=15) <= 5
+
+
+def test_exhausted_deadline_raises():
+    use_deadline(Deadline("lesson_plan", -1))
+    with pytest.raises(DeadlineExceeded) as raised:
+        stage_budget("llm")
+    assert raised.value.status_code == 504
+    assert raised.value.endpoint == "lesson_plan" and raised.value.stage == "llm"
+
+
+def test_extend_keeps_the_later_deadline():
+    deadline = Deadline("lesson_plan", 1)
+    deadline.extend(Deadline("lesson_plan", 30))
+    assert deadline.remaining() > 29
+    deadline.extend(None)
+    assert deadline.remaining() == float("inf")
+
+
+def test_call_within_gives_up_on_a_slow_call():
+    use_deadline(Deadline("lesson_plan", 0.2))
+    assert call_within("retrieval", lambda value: value, value=3) == 3
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        call_within("retrieval", lambda seconds: time.sleep(seconds), seconds=2)
+    assert time.monotonic() - start < 1
+
+
+@pytest.fixture
+def silent_server(tmp_path):
+    """ An embedding socket that accepts connections and never answers """
+    path = str(tmp_path / "embedding.sock")
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.listen()
+    accepted = []
+    threading.Thread(target=lambda: accepted.append(server.accept()), daemon=True).start()
+    yield path
+    server.close()
+
+
+def test_embedding_timeout_from_the_deadline_is_a_504(silent_server):
+    use_deadline(Deadline("lesson_plan", 0.3))
+    with pytest.raises(DeadlineExceeded) as raised:
+        RemoteEmbedder(silent_server, timeout=5).encode(["fractions"])
+    assert raised.value.stage == "embedding"
+
+
+def test_embedding_server_down_is_unavailable(tmp_path):
+    with pytest.raises(EmbeddingUnavailable):
+        RemoteEmbedder(os.path.join(tmp_path, "missing.sock"), timeout=1).encode(["fractions"])
+
+
+def test_request_timeout_header_sets_and_caps_the_deadline():
+    app = FastAPI()
+    app.add_exception_handler(DeadlineExceeded, deadline_exceeded_handler)
+
+    @app.get("/left", dependencies=[Depends(request_deadline("lesson_plan"))])
+    def left():
+        return {"left": remaining()}
+
+    @app.get("/late", dependencies=[Depends(request_deadline("lesson_plan"))])
+    def late():
+        time.sleep(0.2)
+        stage_budget("llm")
+
+    client = TestClient(app)
+    assert 9 < client.get("/left", headers={"X-Request-Timeout": "10"}).json()["left"] <= 10
+    assert client.get("/left", headers={"X-Request-Timeout": "100000"}).json()["left"] <= DEADLINE_MAX_SECONDS
+    response = client.get("/late", headers={"X-Request-Timeout": "0.1"})
+    assert response.status_code == 504
+    assert response.json()["detail"]["stage"] == "llm"
@@ -0,0 +1,134 @@
+import asyncio
+import threading
+import pytest
+from pydantic import BaseModel
+from app import analytics
+from app.services import generation_cache as cache_module
+from app.services.generation_cache import (
+    GenerationCache, REUSE_ANY, REUSE_NONE, REUSE_PREWARMED, cache_reuse, cached_generation, generation_key,
+    normalize_params,
+)
+
+
+class Form(BaseModel):
+    topic: str
+    exec_skills: list = []
+
+
+@pytest.fixture(autouse=True)
+def cache(monkeypatch, mock_collection):
+    monkeypatch.setattr(cache_module, "generation_cache_collection", mock_collection("generation_cache"))
+    cache = GenerationCache()
+    monkeypatch.setattr(cache_module, "generation_cache", cache)
+    monkeypatch.setattr(analytics, "_pending", {})
+    return cache
+
+
+def key_of(form):
+    return generation_key("lesson_plan", normalize_params(form.model_dump()))
+
+
+class Producer:
+    def __init__(self, release=None):
+        self.calls = 0
+        self.release = release
+
+    def __call__(self, form):
+        self.calls += 1
+        if self.release is not None:
+            self.release.wait(5)
+        return {"plan": f"{form.topic} #{self.calls}"}
+
+
+def hits_and_requests():
+    counts = list(analytics._pending.values())
+    return sum(c["hits"] for c in counts), sum(c["count"] for c in counts)
+
+
+def test_cache_reuse_from_cache_control():
+    assert cache_reuse(None) == REUSE_PREWARMED
+    assert cache_reuse("no-cache") == REUSE_NONE
+    assert cache_reuse("no-store, max-age=0") == REUSE_NONE
+    assert cache_reuse("max-stale=3600") == REUSE_ANY
+
+
+def test_prewarmed_response_is_served_by_default(cache):
+    async def run():
+        form = Form(topic="Fractions")
+        await cache.put(key_of(form), "lesson_plan", normalize_params(form.model_dump()), {"plan": "warm"}, prewarmed=True)
+        cache._memory.clear()
+        produce = Producer()
+        assert await cached_generation("lesson_plan", form, produce) == {"plan": "warm"}
+        assert produce.calls == 0
+        assert hits_and_requests() == (1, 1)
+
+    asyncio.run(run())
+
+
+def test_response_generated_for_another_request_needs_max_stale(cache):
+    async def run():
+        form = Form(topic="Fractions")
+        produce = Producer()
+        assert await cached_generation("lesson_plan", form, produce) == {"plan": "Fractions #1"}
+        assert await cached_generation("lesson_plan", form, produce) == {"plan": "Fractions #2"}
+        assert await cached_generation("lesson_plan", form, produce, reuse=REUSE_ANY) == {"plan": "Fractions #2"}
+        assert produce.calls == 2
+        assert hits_and_requests() == (1, 3)
+
+    asyncio.run(run())
+
+
+def test_no_cache_generates_without_replacing_the_prewarmed_response(cache):
+    async def run():
+        form = Form(topic="Fractions")
+        await cache.put(key_of(form), "lesson_plan", normalize_params(form.model_dump()), {"plan": "warm"}, prewarmed=True)
+        produce = Producer()
+        assert await cached_generation("lesson_plan", form, produce, reuse=REUSE_NONE) == {"plan": "Fractions #1"}
+        cache._memory.clear()
+        assert await cached_generation("lesson_plan", form, produce) == {"plan": "warm"}
+        assert await cache.expires_at(key_of(form)) is not None
+
+    asyncio.run(run())
+
+
+def test_parameters_are_normalized_before_lookup(cache):
+    async def run():
+        produce = Producer()
+        await cached_generation("lesson_plan", Form(topic=" Fractions ", exec_skills=["b", "a"]), produce)
+        response = await cached_generation("lesson_plan", Form(topic="Fractions", exec_skills=["a", "b", "a"]), produce,
+                                           reuse=REUSE_ANY)
+        assert response == {"plan": " Fractions  #1"}
+        assert produce.calls == 1
+
+    asyncio.run(run())
+
+
+def test_identical_concurrent_requests_share_one_generation():
+    async def run():
+        release = threading.Event()
+        produce = Producer(release)
+        form = Form(topic="Fractions")
+        requests = [asyncio.ensure_future(cached_generation("lesson_plan", form, produce, reuse=REUSE_NONE))
+                    for _ in range(3)]
+        await asyncio.sleep(0.1)
+        assert len(cache_module._in_flight) == 1
+        release.set()
+        responses = await asyncio.gather(*requests)
+        assert responses == [{"plan": "Fractions #1"}] * 3
+        assert produce.calls == 1
+        assert cache_module._in_flight == {}
+
+    asyncio.run(run())
+
+
+def test_different_requests_generate_separately():
+    async def run():
+        produce = Producer()
+        responses = await asyncio.gather(
+            cached_generation("lesson_plan", Form(topic="Fractions"), produce),
+            cached_generation("lesson_plan", Form(topic="Decimals"), produce),
+        )
+        assert sorted(response["plan"].split()[0] for response in responses) == ["Decimals", "Fractions"]
+        assert produce.calls == 2
+
+    asyncio.run(run())
@@ -0,0 +1,158 @@
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+from fastapi import HTTPException
+from app import jobs
+from app.config import JOB_MAX_ATTEMPTS
+
+KINDS = ("lesson_plan", "assessment")
+
+
+@pytest.fixture
+def collection(monkeypatch, mock_collection):
+    collection = mock_collection("jobs")
+    monkeypatch.setattr(jobs, "jobs_collection", collection)
+    return collection
+
+
+async def expire_lease(collection, job_id):
+    await collection.update_one({"_id": job_id}, {"$set": {"lease_until": datetime.utcnow() - timedelta(seconds=1)}})
+
+
+def test_claim_takes_highest_priority_then_oldest(collection):
+    async def run():
+        bulk = await jobs.enqueue("lesson_plan", {}, "a@b.c", jobs.PRIORITY_BULK)
+        first = await jobs.enqueue("lesson_plan", {}, "a@b.c")
+        second = await jobs.enqueue("assessment", {}, "a@b.c")
+        await jobs.enqueue("icebreaker", {}, "a@b.c")
+        claimed = [await jobs.claim("w", KINDS) for _ in range(4)]
+        assert [job and job["_id"] for job in claimed] == [first, second, bulk, None]
+        assert claimed[0]["status"] == "running" and claimed[0]["attempts"] == 1
+
+    asyncio.run(run())
+
+
+def test_concurrent_claims_take_each_job_once(collection):
+    async def run():
+        ids = {await jobs.enqueue("lesson_plan", {}, "a@b.c") for _ in range(5)}
+        claimed = await asyncio.gather(*(jobs.claim(f"w{i}", KINDS) for i in range(8)))
+        taken = [job["_id"] for job in claimed if job is not None]
+        assert sorted(taken) == sorted(ids)
+        assert claimed.count(None) == 3
+
+    asyncio.run(run())
+
+
+def test_running_job_with_a_live_lease_is_not_reclaimed(collection):
+    async def run():
+        await jobs.enqueue("lesson_plan", {}, "a@b.c")
+        assert await jobs.claim("w1", KINDS) is not None
+        assert await jobs.claim("w2", KINDS) is None
+
+    asyncio.run(run())
+
+
+def test_expired_lease_is_reclaimed_and_the_old_worker_loses_it(collection):
+    async def run():
+        job_id = await jobs.enqueue("lesson_plan", {}, "a@b.c")
+        await jobs.claim("w1", KINDS)
+        assert await jobs.renew_lease(job_id, "w1")
+        await expire_lease(collection, job_id)
+
+        job = await jobs.claim("w2", KINDS)
+        assert job["_id"] == job_id and job["worker"] == "w2" and job["attempts"] == 2
+        assert not await jobs.renew_lease(job_id, "w1")
+        # The first worker finishing late doesn't overwrite the new attempt
+        await jobs.finish(job_id, "w1", result={"text": "stale"})
+        assert (await collection.find_one({"_id": job_id}))["status"] == "running"
+        await jobs.finish(job_id, "w2", result={"text": "fresh"})
+        job = await collection.find_one({"_id": job_id})
+        assert job["status"] == "done" and job["result"] == {"text": "fresh"}
+        assert "lease_until" not in job and job["expires_at"] > datetime.utcnow()
+
+    asyncio.run(run())
+
+
+def test_renew_lease_pushes_the_lease_out(collection):
+    async def run():
+        job_id = await jobs.enqueue("lesson_plan", {}, "a@b.c")
+        await jobs.claim("w1", KINDS)
+        await expire_lease(collection, job_id)
+        assert await jobs.renew_lease(job_id, "w1")
+        assert await jobs.claim("w2", KINDS) is None
+
+    asyncio.run(run())
+
+
+def test_abandoned_job_fails_after_its_last_attempt(collection):
+    async def run():
+        job_id = await jobs.enqueue("lesson_plan", {}, "a@b.c")
+        for attempt in range(JOB_MAX_ATTEMPTS):
+            job = await jobs.claim(f"w{attempt}", KINDS)
+            assert job["attempts"] == attempt + 1
+            # Not abandoned while a lease is live
+            assert await jobs.fail_abandoned() == 0
+            await expire_lease(collection, job_id)
+        assert await jobs.claim("w", KINDS) is None
+        assert await jobs.fail_abandoned() == 1
+        job = await collection.find_one({"_id": job_id})
+        assert job["status"] == "failed" and job["error"]["status_code"] == 500
+        assert await jobs.fail_abandoned() == 0
+
+    asyncio.run(run())
+
+
+def test_requeue_runs_a_finished_job_again(collection):
+    async def run():
+        job_id = await jobs.enqueue("lesson_plan", {}, "a@b.c")
+        # Not finished yet
+        assert not await jobs.requeue(job_id, "a@b.c")
+        await jobs.claim("w1", KINDS)
+        await jobs.finish(job_id, "w1", error={"status_code": 500, "detail": "boom"})
+        assert not await jobs.requeue(job_id, "other@b.c")
+        assert await jobs.requeue(job_id, "a@b.c")
+        job = await collection.find_one({"_id": job_id})
+        assert job["status"] == "queued" and job["attempts"] == 0 and "error" not in job
+        job = await jobs.claim("w2", KINDS)
+        assert job["_id"] == job_id and job["attempts"] == 1
+
+    asyncio.run(run())
+
+
+def test_get_job_is_scoped_to_its_owner(collection):
+    async def run():
+        job_id = await jobs.enqueue("lesson_plan", {"topic": "t"}, "a@b.c")
+        assert (await jobs.get_job(job_id, "a@b.c"))["status"] == "queued"
+        with pytest.raises(HTTPException) as error:
+            await jobs.get_job(job_id, "other@b.c")
+        assert error.value.status_code == 404
+
+    asyncio.run(run())
+
+
+def test_worker_records_results_and_errors(collection, monkeypatch):
+    from pydantic import BaseModel
+    from app import worker
+
+    class Params(BaseModel):
+        topic: str
+
+    def produce(params):
+        if params.topic == "missing":
+            raise HTTPException(status_code=404, detail="nothing")
+        if params.topic == "broken":
+            raise RuntimeError("boom")
+        return {"topic": params.topic}
+
+    monkeypatch.setattr(worker, "HANDLERS", {"lesson_plan": (Params, produce)})
+
+    async def run():
+        ids = [await jobs.enqueue("lesson_plan", {"topic": topic}, "a@b.c") for topic in ("fractions", "missing", "broken")]
+        for _ in ids:
+            await worker.run_job(await jobs.claim("w1", worker.HANDLERS), "w1")
+        done, missing, broken = [await collection.find_one({"_id": job_id}) for job_id in ids]
+        assert done["status"] == "done" and done["result"] == {"topic": "fractions"}
+        assert missing["status"] == "failed" and missing["error"] == {"status_code": 404, "detail": "nothing"}
+        assert broken["status"] == "failed" and broken["error"] == {"status_code": 500, "detail": "boom"}
+
+    asyncio.run(run())
@@ -0,0 +1,175 @@
+"""
+Disconnecting clients stop the LLM stream of their generation.
+
+The app is served with uvicorn, with its middleware, against a stub
+OpenAI server that streams one chunk every 50 ms, and a generation route
+(generation cache, coalescing, chat_completion, without retrieval) is
+driven over raw sockets so clients can hang up mid-request.
+"""
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from fastapi import Request
+from pydantic import BaseModel
+from app.metrics import CLIENT_DISCONNECTS, GENERATIONS_CANCELLED
+from app.services import generation_cache, llm
+from app.services.generation_cache import REUSE_NONE, cached_generation
+
+CHUNK_SECONDS = 0.05
+
+
+class StubOpenAI(BaseHTTPRequestHandler):
+    """ Streams max_tokens chunks and notes whether the client hung up first """
+
+    protocol_version = "HTTP/1.1"
+    streams = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        stream = {"chunks": 0, "total": body["max_tokens"], "closed_early": False, "ended": None}
+        self.streams.append(stream)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        base = {"id": "stub", "object": "chat.completion.chunk", "created": 0, "model": body["model"]}
+        try:
+            for _ in range(stream["total"]):
+                time.sleep(CHUNK_SECONDS)
+                self._send({**base, "choices": [{"index": 0, "delta": {"content": "word "}, "finish_reason": None}]})
+                stream["chunks"] += 1
+            usage = {"prompt_tokens": 10, "completion_tokens": stream["total"], "total_tokens": 10 + stream["total"]}
+            self._send({**base, "choices": [], "usage": usage})
+            self._send("[DONE]")
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            stream["closed_early"] = True
+        stream["ended"] = time.monotonic()
+
+    def _send(self, event):
+        data = f"data: {event if isinstance(event, str) else json.dumps(event)}\n\n".encode()
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+
+class CheckRequest(BaseModel):
+    name: str
+    chunks: int
+
+
+def produce(request):
+    return {"text": llm.chat_completion(
+        "lesson_plan", model="stub", max_tokens=request.chunks,
+        messages=[{"role": "user", "content": request.name}],
+    )}
+
+
+async def check_generate(http_request: Request, request: CheckRequest):
+    return await cached_generation("lesson_plan", request, produce, reuse=REUSE_NONE, http_request=http_request)
+
+
+@pytest.fixture
+def port(monkeypatch, mock_collection):
+    import uvicorn
+    from openai import OpenAI
+    from app.main import app
+
+    stub = ThreadingHTTPServer(("127.0.0.1", 0), StubOpenAI)
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+    StubOpenAI.streams.clear()
+    monkeypatch.setattr(llm, "_client", OpenAI(api_key="stub", base_url=f"http://127.0.0.1:{stub.server_address[1]}/v1"))
+    monkeypatch.setattr(generation_cache, "generation_cache_collection", mock_collection("generation_cache"))
+    monkeypatch.setattr(generation_cache, "generation_cache", generation_cache.GenerationCache())
+
+    app.add_api_route("/_check/generate", check_generate, methods=["POST"])
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, lifespan="off", log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    try:
+        assert wait_for(lambda: server.started, 10)
+        yield port
+    finally:
+        server.should_exit = True
+        thread.join(5)
+        app.router.routes = [route for route in app.router.routes if getattr(route, "path", None) != "/_check/generate"]
+        stub.shutdown()
+
+
+def send(port, name, chunks):
+    """ Send a check request on a new connection and return the socket """
+    body = json.dumps({"name": name, "chunks": chunks}).encode()
+    sock = socket.create_connection(("127.0.0.1", port))
+    sock.sendall(
+        b"POST /_check/generate HTTP/1.1\r\nHost: check\r\nContent-Type: application/json\r\n"
+        b"Content-Length: %d\r\nConnection: close\r\n\r\n%s" % (len(body), body)
+    )
+    return sock
+
+
+def wait_for(condition, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return condition()
+
+
+def cancelled():
+    return GENERATIONS_CANCELLED.labels(endpoint="lesson_plan", stage="llm_stream")._value.get()
+
+
+def disconnects():
+    return CLIENT_DISCONNECTS.labels(endpoint="lesson_plan")._value.get()
+
+
+def test_disconnect_closes_the_upstream_stream(port):
+    streams = StubOpenAI.streams
+    cancelled_before, disconnects_before = cancelled(), disconnects()
+    sock = send(port, "single", 200)
+    assert wait_for(lambda: streams and streams[-1]["chunks"] >= 5, 5)
+    stream = streams[-1]
+    closed_at = time.monotonic()
+    sock.close()
+
+    assert wait_for(lambda: stream["ended"] is not None, 2)
+    assert stream["closed_early"] and stream["chunks"] < stream["total"]
+    assert stream["ended"] - closed_at < 1
+    assert cancelled() == cancelled_before + 1
+    assert disconnects() == disconnects_before + 1
+
+
+def test_shared_stream_runs_until_the_last_client_leaves(port):
+    streams = StubOpenAI.streams
+    first, second = send(port, "coalesced", 200), send(port, "coalesced", 200)
+    assert wait_for(lambda: streams and streams[-1]["chunks"] >= 5, 5)
+    time.sleep(0.3)
+    stream = streams[-1]
+    first.close()
+    time.sleep(0.5)
+    assert len(streams) == 1 and stream["ended"] is None
+
+    second.close()
+    assert wait_for(lambda: stream["ended"] is not None, 2)
+    assert stream["closed_early"]
+
+
+def test_waiting_client_gets_the_whole_completion(port):
+    sock = send(port, "complete", 10)
+    sock.settimeout(10)
+    response = b""
+    while chunk := sock.recv(65536):
+        response += chunk
+    sock.close()
+    assert response.startswith(b"HTTP/1.1 200")
+    assert response.count(b"word") == 10
+    assert StubOpenAI.streams[-1]["closed_early"] is False
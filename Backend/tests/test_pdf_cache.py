@@ -0,0 +1,117 @@
+import os
+import pytest
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+from app.services.pdf_cache import PDFCache, cache_key, etag_for, etag_matches
+
+
+class Doc(BaseModel):
+    title: str
+
+
+def key(n):
+    return f"{n:02d}" + "0" * 62
+
+
+def age(cache, k, seconds_ago):
+    path = cache._path(k)
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime - seconds_ago))
+
+
+def test_cache_key_depends_on_kind_and_content():
+    assert cache_key("lesson", Doc(title="a")) == cache_key("lesson", Doc(title="a"))
+    assert cache_key("lesson", Doc(title="a")) != cache_key("quiz", Doc(title="a"))
+    assert cache_key("lesson", Doc(title="a")) != cache_key("lesson", Doc(title="b"))
+
+
+def test_etag_matches():
+    etag = etag_for("abc")
+    assert etag.startswith('W/')
+    assert etag_matches('"abc"', etag)
+    assert etag_matches('W/"abc"', etag)
+    assert etag_matches('"x", "abc"', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"x"', etag)
+    assert not etag_matches(None, etag)
+
+
+def test_memory_tier_evicts_least_recently_used(tmp_path):
+    cache = PDFCache(str(tmp_path), memory_bytes=40, disk_bytes=0)
+    for n in range(3):
+        cache.put(key(n), bytes(10))
+    # Touch the oldest, so the second one is evicted next
+    assert cache.get(key(0)) is not None
+    cache.put(key(3), bytes(10))
+    cache.put(key(4), bytes(10))
+    assert list(cache._memory) == [key(2), key(0), key(3), key(4)]
+    assert cache._memory_used == 40
+
+
+def test_memory_tier_skips_documents_over_a_quarter_of_it(tmp_path):
+    cache = PDFCache(str(tmp_path), memory_bytes=40, disk_bytes=0)
+    cache.put(key(0), bytes(11))
+    assert cache.get(key(0)) is None
+
+
+def test_disk_tier_evicts_least_recently_used(tmp_path):
+    cache = PDFCache(str(tmp_path), memory_bytes=0, disk_bytes=100)
+    for n in range(4):
+        cache.put(key(n), bytes(20))
+        age(cache, key(n), 100 - n)
+    # A hit makes the oldest the most recently used
+    assert cache.get(key(0)) == bytes(20)
+    cache.put(key(4), bytes(30))
+    # 110 bytes over the 100 limit: evicted down to 90, oldest first
+    assert not os.path.exists(cache._path(key(1)))
+    assert all(os.path.exists(cache._path(key(n))) for n in (0, 2, 3, 4))
+    assert cache._disk_used == 90
+
+
+def test_overwriting_a_disk_entry_counts_it_once(tmp_path):
+    cache = PDFCache(str(tmp_path), memory_bytes=0, disk_bytes=100)
+    cache.put(key(0), bytes(30))
+    for _ in range(5):
+        cache.put(key(0), bytes(40))
+    assert cache._disk_used == 40
+    assert os.path.exists(cache._path(key(0)))
+
+
+@pytest.fixture
+def client(monkeypatch):
+    from app.main import app
+    from app.auth import require_user
+    from app.routers import pdf_routes
+
+    renders = []
+
+    async def fake_render(kind, data, render, key=None):
+        # The route passes down the key it computed for the ETag
+        assert key == cache_key(kind, data)
+        renders.append(kind)
+        return b"%PDF-1.4 test"
+
+    monkeypatch.setattr(pdf_routes, "render_pdf", fake_render)
+    app.dependency_overrides[require_user] = lambda: {"email": "a@b.c"}
+    try:
+        yield TestClient(app), renders
+    finally:
+        app.dependency_overrides.pop(require_user)
+
+
+def test_pdf_route_answers_304_for_a_matching_etag(client):
+    client, renders = client
+    body = {"exec_skills": [], "lessonPlan": {"title": "T", "sections": []}}
+    response = client.post("/pdf/generate-lesson-pdf", json=body)
+    assert response.status_code == 200 and response.content == b"%PDF-1.4 test"
+    etag = response.headers["etag"]
+
+    response = client.post("/pdf/generate-lesson-pdf", json=body, headers={"If-None-Match": etag})
+    assert response.status_code == 304 and response.content == b""
+    assert response.headers["etag"] == etag
+    # Neither looked up nor rendered again
+    assert renders == ["lesson"]
+
+    changed = {**body, "lessonPlan": {"title": "Other", "sections": []}}
+    response = client.post("/pdf/generate-lesson-pdf", json=changed, headers={"If-None-Match": etag})
+    assert response.status_code == 200 and response.headers["etag"] != etag
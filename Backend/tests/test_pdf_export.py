@@ -0,0 +1,58 @@
+import asyncio
+import io
+import zipfile
+from app.routers.pdf_routes import QuizVersionsPDF, content_disposition
+from app.services.pdf_export_service import safe_filename, stream_zip
+from app.services.pdf_quiz_versions_service import generate_quiz_versions
+
+HOSTILE = '../../etc/"passwd"\r\nX-Injected: 1\\..'
+
+
+def test_safe_filename():
+    assert safe_filename("Fractions: Part 1/2") == "Fractions- Part 1-2"
+    assert safe_filename("..") == "-"
+    assert safe_filename("../secret") == "-secret"
+    name = safe_filename(HOSTILE)
+    assert not any(c in name for c in '/\\"\r\n')
+    assert not name.startswith(".")
+
+
+def test_content_disposition_cannot_break_the_header():
+    header = content_disposition(f"{HOSTILE}.pdf")
+    assert "\r" not in header and "\n" not in header
+    assert header.count('"') == 2
+    header.encode("latin-1")
+
+
+def test_content_disposition_keeps_non_latin_titles():
+    header = content_disposition("Дроби – 3.pdf")
+    header.encode("latin-1")
+    assert "filename*=UTF-8''%D0%94%D1%80%D0%BE%D0%B1%D0%B8" in header
+
+
+def zip_names(chunks):
+    return zipfile.ZipFile(io.BytesIO(b"".join(chunks))).namelist()
+
+
+def test_zip_entries_stay_inside_the_archive():
+    async def entries():
+        for name in ["../evil.pdf", "a/../../b.pdf", "/abs.pdf", "same.pdf", "same.pdf"]:
+            yield name, b"%PDF"
+
+    async def run():
+        return [chunk async for chunk in stream_zip(entries())]
+
+    names = zip_names(asyncio.run(run()))
+    assert names == ["-/evil.pdf", "a/-/-/b.pdf", "-/abs.pdf", "same.pdf", "same_2.pdf"]
+    assert not any(part in ("..", ".") for name in names for part in name.split("/"))
+
+
+def test_quiz_versions_zip_names_are_sanitized():
+    data = QuizVersionsPDF(
+        exec_skills=[],
+        assessment={"title": "../../x\r\n", "content": "### Question 1\nWhat?"},
+        versions=2, seed=1, format="zip",
+    )
+    names = zipfile.ZipFile(io.BytesIO(generate_quiz_versions(data))).namelist()
+    assert len(names) == 3
+    assert not any("/" in name or "\\" in name or "\n" in name or name.startswith(".") for name in names)
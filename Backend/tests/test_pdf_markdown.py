@@ -0,0 +1,51 @@
+from app.services.pdf_markdown import inline_markup, split_questions
+
+
+def test_bold_and_italic():
+    assert inline_markup("**bold** and *italic*") == "<b>bold</b> and <i>italic</i>"
+
+
+def test_bold_italic():
+    assert inline_markup("***both***") == "<b><i>both</i></b>"
+    assert inline_markup("a ***key term*** here") == "a <b><i>key term</i></b> here"
+
+
+def test_italic_nested_in_bold():
+    assert inline_markup("**see *this* one**") == "<b>see <i>this</i> one</b>"
+
+
+def test_multiplication_is_not_emphasis():
+    assert inline_markup("3*4=12 and 5*6") == "3*4=12 and 5*6"
+    assert inline_markup("3 * 4 = 12") == "3 * 4 = 12"
+
+
+def test_emphasis_next_to_punctuation():
+    assert inline_markup("(*note*), **Answer:** B") == "(<i>note</i>), <b>Answer:</b> B"
+
+
+def test_reserved_characters_escaped():
+    assert inline_markup("**a < b & c**") == "<b>a &lt; b &amp; c</b>"
+
+
+def test_split_questions_keeps_intro():
+    text = "Read the passage below.\n\nThe water cycle...\n\n### Question 1\nWhat is evaporation?\n### Question 2: Why?\nExplain."
+    intro, questions = split_questions(text)
+    assert intro == "Read the passage below.\n\nThe water cycle..."
+    assert questions == [(1, "What is evaporation?"), (2, "Why?\nExplain.")]
+
+
+def test_split_questions_without_intro():
+    intro, questions = split_questions("**Question 1:** First\n\nQuestion 2: Second")
+    assert intro == ""
+    assert questions == [(1, "First"), (2, "Second")]
+
+
+def test_split_numbered_fallback_keeps_intro():
+    intro, questions = split_questions("Answer all questions.\n1. First\n2. Second")
+    assert intro == "Answer all questions."
+    assert questions == [(1, "First"), (2, "Second")]
+
+
+def test_split_unnumbered_text_is_one_question():
+    assert split_questions("Just one prompt") == ("", [(1, "Just one prompt")])
+    assert split_questions("") == ("", [])
@@ -0,0 +1,53 @@
+import asyncio
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app import profiler
+from app.profiler import ProfileStore, Sampler
+
+
+def test_sampler_records_the_most_concurrent_requests():
+    sampler = Sampler(interval=0.01, window=5)
+    first = sampler.begin()
+    second = sampler.begin()
+    assert sampler.end(second) == 2
+    third = sampler.begin()
+    assert sampler.end(first) == 2
+    assert sampler.end(third) == 2
+    alone = sampler.begin()
+    assert sampler.end(alone) == 1
+
+
+def test_profile_store_keeps_the_newest(tmp_path):
+    store = ProfileStore(str(tmp_path), max_files=2)
+    for n in range(3):
+        store.save({"id": f"p{n}", "created": 1000.0 + n, "stacks": {"a;b": 1}})
+    assert [profile["id"] for profile in store.list()] == ["p2", "p1"]
+    assert store.load("p0") is None
+    assert store.load("p2")["stacks"] == {"a;b": 1}
+
+
+@pytest.fixture
+def app(monkeypatch, tmp_path):
+    monkeypatch.setattr(profiler, "ENABLED", True)
+    monkeypatch.setattr(profiler, "PROFILE_SAMPLE_RATE", 1.0)
+    monkeypatch.setattr(profiler, "sampler", Sampler(interval=0.005, window=5))
+    monkeypatch.setattr(profiler, "profile_store", ProfileStore(str(tmp_path)))
+    app = FastAPI()
+    app.middleware("http")(profiler.profile_requests)
+
+    @app.get("/work")
+    async def work():
+        await asyncio.sleep(0.05)
+        return {"ok": True}
+
+    return app
+
+
+def test_profiles_are_labelled_process_wide(app):
+    response = TestClient(app).get("/work")
+    assert response.json() == {"ok": True}
+    [summary] = profiler.profile_store.list()
+    assert summary["scope"] == "process"
+    assert summary["concurrent_requests"] == 1
+    assert summary["path"] == "/work" and summary["status"] == 200
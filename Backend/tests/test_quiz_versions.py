@@ -0,0 +1,112 @@
+import pytest
+from reportlab.platypus import Table
+from app.routers.pdf_routes import QuizVersionsPDF
+from app.services.pdf_common import get_pdf_styles
+from app.services.pdf_quiz_versions_service import (
+    OPTION_LETTERS, _answer_index, build_answer_key_story, generate_quiz_versions, measure_questions, plan_versions,
+)
+
+OPTIONS = ["An even number", "A prime number", "B vitamins", "None of these"]
+
+
+@pytest.mark.parametrize("answer, expected", [
+    ("B", 1),
+    ("(b)", 1),
+    ("C.", 2),
+    ("B) A prime number", 1),
+    ("A prime number", 1),
+    ("a prime  **number**", 1),
+    ("B vitamins", 2),
+    ("A) A prime number", 1),
+    ("Z", None),
+    ("Something else", None),
+    ("", None),
+])
+def test_answer_index(answer, expected):
+    assert _answer_index(answer, OPTIONS) == expected
+
+
+def quiz(**fields):
+    return QuizVersionsPDF(**{
+        "exec_skills": [],
+        "assessment": {
+            "title": "Numbers",
+            "content": "",
+            "questions": [
+                {"text": "Which is 7?", "options": ["A) An even number", "B) A prime number", "C) Zero"],
+                 "answer": "A prime number", "type": "Multiple Choice"},
+                {"text": "Pick the even one", "options": ["A) 3", "B) 5", "C) 8", "D) 9"], "answer": "C",
+                 "strategy": "Cross out the odd ones"},
+                {"text": "Explain zero", "answer": "Nothing", "explanation": "Zero is nothing"},
+            ],
+        },
+        "seed": 7,
+        "versions": 3,
+        **fields,
+    })
+
+
+def key_letters(story):
+    """ Answer letters per version, in the order printed on the key """
+    grids = [flowable for flowable in story if isinstance(flowable, Table)]
+    return [[row[i + 1] for row in grid._cellvalues for i in range(0, len(row), 2) if row[i]] for grid in grids]
+
+
+def test_answer_key_follows_each_versions_shuffle():
+    data = quiz()
+    styles = get_pdf_styles(None)
+    measured = measure_questions(data.assessment, styles)
+    plans = plan_versions(measured, data.versions, data.seed)
+    letters = key_letters(build_answer_key_story(data, styles, measured, plans, data.seed))
+
+    correct = {0: "A prime number", 1: "8"}
+    assert len(letters) == 3
+    for (_, question_order, option_orders), version_letters in zip(plans, letters):
+        for position, original in enumerate(question_order):
+            letter = version_letters[position]
+            if original in correct:
+                option = option_orders[original][OPTION_LETTERS.index(letter)]
+                assert measured[original].answer == option
+                assert data.assessment.questions[original].options[option].endswith(correct[original])
+            else:
+                assert letter == "*"
+
+
+def test_first_version_keeps_the_original_order():
+    data = quiz()
+    styles = get_pdf_styles(None)
+    measured = measure_questions(data.assessment, styles)
+    plans = plan_versions(measured, data.versions, data.seed)
+    assert plans[0][1] == [0, 1, 2]
+    assert key_letters(build_answer_key_story(data, styles, measured, plans, data.seed))[0] == ["B", "C", "*"]
+
+
+def test_same_seed_same_versions():
+    data = quiz()
+    styles = get_pdf_styles(None)
+    measured = measure_questions(data.assessment, styles)
+    assert plan_versions(measured, 3, 7) == plan_versions(measured, 3, 7)
+
+
+def test_structured_question_type_and_strategy_are_used():
+    measured = measure_questions(quiz().assessment, get_pdf_styles(None))
+    assert measured[0].question_type == "Multiple Choice"
+    assert measured[1].trailing
+
+
+def test_markdown_questions_answer_key():
+    data = quiz(assessment={
+        "title": "Numbers",
+        "content": "Answer every question.\n\n### Question 1\nWhich is 7?\n- A) An even number\n- B) A prime number\n"
+                   "**Answer:** A prime number\n\n### Question 2\nPick 8\nA) 3\nB) 8\nAnswer: B\n",
+    }, versions=1)
+    styles = get_pdf_styles(None)
+    measured = measure_questions(data.assessment, styles)
+    assert [question.answer for question in measured] == [1, 1]
+    plans = plan_versions(measured, 1, 1)
+    assert key_letters(build_answer_key_story(data, styles, measured, plans, 1)) == [["B", "B"]]
+
+
+def test_generate_quiz_versions_pdf_and_zip():
+    assert generate_quiz_versions(quiz()).startswith(b"%PDF")
+    assert generate_quiz_versions(quiz(format="zip")).startswith(b"PK")
@@ -0,0 +1,178 @@
+import asyncio
+from datetime import datetime
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+from app import rate_limit
+from app.rate_limit import (
+    MemoryRateLimitBackend,
+    MongoRateLimitBackend,
+    parse_limit,
+    check_limit,
+    uncount_limit,
+    enforce_limit,
+    client_ip,
+    _sliding_count,
+)
+
+
+@pytest.fixture(autouse=True)
+def memory_backend(monkeypatch):
+    backend = MemoryRateLimitBackend()
+    monkeypatch.setattr(rate_limit, "_backend", backend)
+    return backend
+
+
+def make_request(client="10.0.0.1", forwarded=None):
+    headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+    return Request({"type": "http", "headers": headers, "client": (client, 1234)})
+
+
+def test_parse_limit():
+    assert parse_limit("20/3600") == (20, 3600)
+    assert parse_limit("5") == (5, 60)
+    assert parse_limit("") is None
+
+
+def test_sliding_count_weights_previous_window_by_overlap():
+    # A quarter into the current window, three quarters of the previous one still count
+    assert _sliding_count(previous=8, current=2, window=60, now=615) == 8 * 0.75 + 2
+    assert _sliding_count(previous=8, current=2, window=60, now=600) == 10
+    assert _sliding_count(previous=0, current=3, window=60, now=659) == 3
+
+
+def test_memory_backend_rolls_windows():
+    backend = MemoryRateLimitBackend()
+
+    async def run():
+        assert await backend.hit("k:60", 60, 100) == (0, 1)
+        assert await backend.hit("k:60", 60, 110) == (0, 2)
+        # Next window: the last one becomes previous
+        assert await backend.hit("k:60", 60, 130) == (2, 1)
+        # A window was skipped: nothing carries over
+        assert await backend.hit("k:60", 60, 250) == (0, 1)
+        assert await backend.hit("k:60", 60, 251, cost=5) == (0, 6)
+
+    asyncio.run(run())
+
+
+def test_memory_backend_uncount_only_touches_the_current_window():
+    backend = MemoryRateLimitBackend()
+
+    async def run():
+        await backend.hit("k:60", 60, 100, cost=3)
+        await backend.uncount("k:60", 60, 110)
+        assert await backend.hit("k:60", 60, 115) == (0, 3)
+        # After the window rolled, taking back has nothing to undo
+        await backend.uncount("k:60", 60, 50)
+        assert await backend.hit("k:60", 60, 119) == (0, 4)
+
+    asyncio.run(run())
+
+
+def test_check_limit_allows_up_to_the_limit():
+    async def run():
+        results = [await check_limit("s", "u", (3, 60), now=120 + i) for i in range(4)]
+        assert [allowed for allowed, _, _, _ in results] == [True, True, True, False]
+        assert [remaining for _, _, remaining, _ in results] == [2, 1, 0, 0]
+        # Reset is the time left in the fixed window
+        assert results[0][3] == 60
+        assert results[3][3] == 57
+
+    asyncio.run(run())
+
+
+def test_check_limit_counts_the_previous_window():
+    async def run():
+        for _ in range(4):
+            await check_limit("s", "u", (4, 60), now=110)
+        # Half of the previous window's 4 still count halfway into the next one
+        allowed, _, remaining, _ = await check_limit("s", "u", (4, 60), now=150)
+        assert allowed and remaining == 1
+        allowed, _, _, _ = await check_limit("s", "u", (4, 60), now=150, cost=2)
+        assert not allowed
+
+    asyncio.run(run())
+
+
+def test_uncount_limit_takes_back_a_request():
+    async def run():
+        await check_limit("s", "u", (1, 60), now=100)
+        assert not (await check_limit("s", "u", (1, 60), now=101))[0]
+        await uncount_limit("s", "u", (1, 60), 101)
+        await uncount_limit("s", "u", (1, 60), 101)
+        assert (await check_limit("s", "u", (1, 60), now=102))[0]
+
+    asyncio.run(run())
+
+
+def test_enforce_limit_rejects_without_counting(monkeypatch):
+    monkeypatch.setitem(rate_limit.LIMITS, "test", ((2, 60), (3, 60)))
+
+    async def run():
+        for _ in range(2):
+            await enforce_limit(make_request(), "test", "a@b.c")
+        for _ in range(5):
+            with pytest.raises(HTTPException) as error:
+                await enforce_limit(make_request(), "test", "a@b.c")
+            assert error.value.status_code == 429
+            assert int(error.value.headers["Retry-After"]) > 0
+        # Rejected requests didn't use the IP budget: another user still fits
+        await enforce_limit(make_request(), "test", "d@e.f")
+        with pytest.raises(HTTPException):
+            await enforce_limit(make_request(), "test", "g@h.i")
+
+    asyncio.run(run())
+
+
+def test_enforce_limit_charges_cost(monkeypatch):
+    monkeypatch.setitem(rate_limit.LIMITS, "test", ((10, 3600), None))
+
+    async def run():
+        request = make_request()
+        await enforce_limit(request, "test", "a@b.c", cost=6)
+        assert request.state.rate_limit_headers["X-RateLimit-Remaining"] == "4"
+        with pytest.raises(HTTPException):
+            await enforce_limit(make_request(), "test", "a@b.c", cost=5)
+        await enforce_limit(make_request(), "test", "a@b.c", cost=4)
+
+    asyncio.run(run())
+
+
+def test_enforce_limit_reports_the_tighter_budget(monkeypatch):
+    monkeypatch.setitem(rate_limit.LIMITS, "test", ((5, 60), (2, 60)))
+
+    async def run():
+        request = make_request()
+        await enforce_limit(request, "test", "a@b.c")
+        assert request.state.rate_limit_headers["X-RateLimit-Limit"] == "2"
+        assert request.state.rate_limit_headers["X-RateLimit-Remaining"] == "1"
+
+    asyncio.run(run())
+
+
+def test_client_ip_ignores_forwarded_for_unless_trusted(monkeypatch):
+    request = make_request(client="10.0.0.1", forwarded="1.1.1.1, 203.0.113.7")
+    monkeypatch.setattr(rate_limit, "RATE_LIMIT_TRUST_PROXY", False)
+    assert client_ip(request) == "10.0.0.1"
+    monkeypatch.setattr(rate_limit, "RATE_LIMIT_TRUST_PROXY", True)
+    # The entry the proxy appended, not the one the client made up
+    assert client_ip(request) == "203.0.113.7"
+    assert client_ip(make_request(client="10.0.0.1")) == "10.0.0.1"
+
+
+def test_mongo_backend_upserts_windows(mock_collection):
+    backend = MongoRateLimitBackend()
+    backend.collection = mock_collection("rate_limits")
+
+    async def run():
+        assert await backend.hit("k:60", 60, 100) == (0, 1)
+        assert await backend.hit("k:60", 60, 110, cost=2) == (0, 3)
+        assert await backend.hit("k:60", 60, 130) == (3, 1)
+        await backend.uncount("k:60", 60, 131)
+        assert await backend.hit("k:60", 60, 140) == (3, 1)
+        document = await backend.collection.find_one({"_id": "k:60:120"})
+        # Kept until it can no longer be the previous window
+        assert document["expires_at"] == datetime.utcfromtimestamp(120 + 2 * 60)
+
+    asyncio.run(run())
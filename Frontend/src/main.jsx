@@ -2,6 +2,32 @@ import { StrictMode } from 'react'
 import { createRoot } from 'react-dom/client'
 import './index.css'
 import App from './App.jsx'
+import axios from 'axios'
+
+// Send the access token from login with every API request
+axios.interceptors.request.use((config) => {
+  const storedUser = localStorage.getItem('user')
+  const token = storedUser ? JSON.parse(storedUser).token : null
+  if (token) {
+    config.headers.Authorization = `Bearer ${token}`
+  }
+  return config
+})
+
+// Access tokens expire after an hour and aren't refreshed:
+// once the API rejects the stored token, drop it and sign in again. Failed
+// sign-ins also answer 401 and are left to the login page.
+axios.interceptors.response.use(
+  (response) => response,
+  (error) => {
+    const isAuthRoute = error.config?.url?.includes('/auth/')
+    if (error.response?.status === 401 && !isAuthRoute && localStorage.getItem('user')) {
+      localStorage.removeItem('user')
+      window.location.assign('/login?expired=1')
+    }
+    return Promise.reject(error)
+  }
+)
 
 createRoot(document.getElementById('root')).render(
   <StrictMode>
@@ -15,6 +15,11 @@ const Login = () => {
     const urlParams = new URLSearchParams(location.search)
     const code = urlParams.get('code')
 
+    // Sent here by the 401 handler in main.jsx
+    if (urlParams.get('expired')) {
+      setError('Your session has expired. Please sign in again.')
+    }
+
     if (code) {
       setIsLoading(true)
 
@@ -27,7 +32,10 @@ const Login = () => {
         )
         .then((response) => {
           if (response.data.user) {
-            localStorage.setItem('user', JSON.stringify(response.data.user))
+            localStorage.setItem(
+              'user',
+              JSON.stringify({ ...response.data.user, token: response.data.token })
+            )
             navigate('/dashboard')
           } else {
             setError('Failed to get user data')
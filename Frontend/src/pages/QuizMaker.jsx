@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react'
+import React, { useState, useEffect, useRef } from 'react'
 import Select from 'react-select' // Import React Select
 import QuizMakerOutput from '../components/QuizMakerOutput'
 import dropdownData from '../data/dropdownData.json'
@@ -29,6 +29,12 @@ export default function QuizMaker() {
   const [availableTopics, setAvailableTopics] = useState([])
   const [availableSubtopics, setAvailableSubtopics] = useState([])
 
+  // Id of this form session, sent with prefetches and the submit so the
+  // backend can match the submit to what it prefetched
+  const [prefetchSession] = useState(() => Math.random().toString(36).slice(2))
+  // Body of the last submit; submitting the same form again asks for a new generation
+  const lastSubmitted = useRef(null)
+
   // Update available grades when main subject changes
   useEffect(() => {
     if (selected.mainSubject) {
@@ -136,6 +142,43 @@ export default function QuizMaker() {
     }
   }
 
+  const buildRequestBody = () => {
+    // Request body for the form's current selections
+    const requestBody = {
+      exec_skills: selected.exec_skills,
+      subject: selected.mainSubject,
+      topic: selected.topic,
+    }
+
+    // Handle grade differently for Science vs Mathematics
+    if (selected.mainSubject === 'Science') {
+      // For Science, find the selected topic and use its grade property
+      const selectedTopic = dropdownData.scienceTopics.find(topic => topic.value === selected.topic);
+      requestBody.grade = selectedTopic ? selectedTopic.grade : selected.grade;
+    } else {
+      // For Mathematics, use the selected grade directly
+      requestBody.grade = selected.grade;
+      // Only include subtopic for Mathematics
+      requestBody.subtopic = selected.subtopic;
+    }
+    return requestBody
+  }
+
+  // Once the lesson is chosen, let the backend start retrieval while the
+  // rest of the form is filled in; a newer prefetch replaces the older one
+  useEffect(() => {
+    if (!selected.mainSubject || !selected.grade || !selected.topic) return
+    if (selected.mainSubject === 'Maths' && !selected.subtopic) return
+    const timer = setTimeout(() => {
+      axios.post(
+        `${import.meta.env.VITE_BACKEND_URL}/prefetch/assessment`,
+        buildRequestBody(),
+        { headers: { 'X-Prefetch-Session': prefetchSession } }
+      ).catch(() => {}) // Only an optimization; the submit works without it
+    }, 400)
+    return () => clearTimeout(timer)
+  }, [selected.mainSubject, selected.grade, selected.topic, selected.subtopic, selected.exec_skills])
+
   // Handle form submission
   const handleSubmit = async () => {
     // Validate form data
@@ -158,24 +201,9 @@ export default function QuizMaker() {
     setError(null)
 
     try {
-      // Prepare request body
-      const requestBody = {
-        exec_skills: selected.exec_skills,
-        subject: selected.mainSubject,
-        topic: selected.topic,
-      }
-      
-      // Handle grade differently for Science vs Mathematics
-      if (selected.mainSubject === 'Science') {
-        // For Science, find the selected topic and use its grade property
-        const selectedTopic = dropdownData.scienceTopics.find(topic => topic.value === selected.topic);
-        requestBody.grade = selectedTopic ? selectedTopic.grade : selected.grade;
-      } else {
-        // For Mathematics, use the selected grade directly
-        requestBody.grade = selected.grade;
-        // Only include subtopic for Mathematics
-        requestBody.subtopic = selected.subtopic;
-      }
+      const requestBody = buildRequestBody()
+      const resubmit = JSON.stringify(requestBody) === lastSubmitted.current
+      lastSubmitted.current = JSON.stringify(requestBody)
 
       // Make API call to the assessment endpoint using axios
       const response = await axios.post(
@@ -184,6 +212,9 @@ export default function QuizMaker() {
         {
           headers: {
             'Content-Type': 'application/json',
+            'X-Prefetch-Session': prefetchSession,
+            // Otherwise a pre-warmed response for the same form may be returned
+            ...(resubmit && { 'Cache-Control': 'no-cache' }),
           }
         }
       );